@@ -0,0 +1,55 @@
+"""
+Codificación de los cuerpos HTTP de la API: JSON con orjson si está instalado (con
+la biblioteca estándar si no) y msgpack opcional (paquete msgpack).
+"""
+import json
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Tipos de contenido aceptados para cuerpos msgpack
+MSGPACK_CONTENT_TYPES = ("application/msgpack", "application/x-msgpack")
+
+def _numpy_scalar(value):
+    """Convierte escalares de NumPy a tipos de Python para json.dumps"""
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Tipo no serializable a JSON: {type(value).__name__}")
+
+def json_loads(data):
+    """Decodifica JSON; los errores son json.JSONDecodeError (también con orjson)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_dumps(data):
+    """Codifica a JSON (bytes); acepta escalares de NumPy"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, separators=(",", ":"), default=_numpy_scalar).encode("utf-8")
+
+def is_msgpack(content_type):
+    """Indica si el Content-Type corresponde a un cuerpo msgpack"""
+    return (content_type or "").split(";", 1)[0].strip().lower() in MSGPACK_CONTENT_TYPES
+
+def msgpack_loads(data):
+    """Decodifica msgpack; RuntimeError si el paquete no está instalado"""
+    if msgpack is None:
+        raise RuntimeError("El paquete msgpack no está instalado")
+    return msgpack.unpackb(data)
+
+class FastJSONResponse(Response):
+    """Respuesta JSON codificada con json_dumps (orjson si está disponible)"""
+
+    media_type = "application/json"
+
+    def render(self, content):
+        return json_dumps(content)
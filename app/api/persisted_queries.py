@@ -0,0 +1,208 @@
+"""
+Consultas GraphQL persistidas automáticas (APQ, el protocolo de Apollo) y caché de
+documentos ya parseados y validados, indexada por el sha256 del texto de la consulta.
+
+- El cliente envía extensions.persistedQuery = {"version": 1, "sha256Hash": ...}
+  sin la consulta. Si el hash está en la caché se ejecuta su documento.
+- Si no está, se responde con el error PersistedQueryNotFound y el cliente reenvía
+  la consulta junto con el hash; se verifica el hash y la consulta queda registrada.
+- Las consultas enviadas como texto también usan la caché: una consulta repetida no
+  se vuelve a parsear ni a validar.
+"""
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from graphql import GraphQLError
+from strawberry.extensions import SchemaExtension
+from strawberry.fastapi import GraphQLRouter
+from strawberry.http import GraphQLRequestData
+from strawberry.http.exceptions import HTTPException
+from strawberry.types import ExecutionResult
+from app.api.encoding import json_loads, json_dumps
+from app.config.settings import settings
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Versión del protocolo de consultas persistidas soportada
+PERSISTED_QUERY_VERSION = 1
+
+class PersistedQueryNotFound(Exception):
+    """El hash de la consulta persistida no está en la caché"""
+
+class _CachedDocument:
+    """Texto de la consulta, documento parseado y errores de validación (None si falta validar)"""
+
+    __slots__ = ("query", "document", "errors")
+
+    def __init__(self, query):
+        self.query = query
+        self.document = None
+        self.errors = None
+
+class GraphQLDocumentCache:
+    """
+    Caché LRU de documentos GraphQL indexada por el sha256 (hex) del texto de la consulta.
+
+    La validación no depende de las variables, así que el resultado se guarda junto al
+    documento. Solo se usa desde el event loop, por eso no lleva bloqueo.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.persisted_not_found = 0
+
+    @staticmethod
+    def query_hash(query):
+        return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+    def get(self, query_hash):
+        """Devuelve la entrada de la consulta o None, contando aciertos y fallos"""
+        entry = self._entries.get(query_hash)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(query_hash)
+        self.hits += 1
+        return entry
+
+    def query(self, query_hash):
+        """Texto de una consulta persistida; PersistedQueryNotFound si no está registrada"""
+        entry = self._entries.get(query_hash)
+        if entry is None:
+            self.persisted_not_found += 1
+            raise PersistedQueryNotFound(query_hash)
+        return entry.query
+
+    def register(self, query_hash, query):
+        """Registra una consulta (el documento se completa al parsearla por primera vez)"""
+        entry = self._entries.get(query_hash)
+        if entry is not None or self.max_size <= 0:
+            return entry
+        entry = self._entries[query_hash] = _CachedDocument(query)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def discard(self, query_hash):
+        self._entries.pop(query_hash, None)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "persisted_not_found": self.persisted_not_found,
+        }
+
+# Caché compartida por la extensión del esquema y el router
+document_cache = GraphQLDocumentCache(max_size=settings.GRAPHQL_DOCUMENT_CACHE_SIZE)
+
+class CachedDocumentExtension(SchemaExtension):
+    """
+    Toma el documento parseado y el resultado de la validación de document_cache; si
+    la consulta no está, los calcula Strawberry y se guardan para la próxima vez.
+    """
+
+    def on_parse(self):
+        context = self.execution_context
+        self._query_hash = document_cache.query_hash(context.query)
+        self._entry = document_cache.get(self._query_hash)
+        if self._entry is not None and self._entry.document is not None:
+            context.graphql_document = self._entry.document
+        yield
+        if context.graphql_document is None:
+            # La consulta no se pudo parsear: no se conserva
+            document_cache.discard(self._query_hash)
+            self._entry = None
+        elif self._entry is None:
+            self._entry = document_cache.register(self._query_hash, context.query)
+        if self._entry is not None and self._entry.document is None:
+            self._entry.document = context.graphql_document
+
+    def on_validate(self):
+        context = self.execution_context
+        entry = self._entry
+        if entry is not None and entry.errors is not None:
+            context.errors = list(entry.errors)
+        yield
+        if entry is not None and entry.errors is None:
+            entry.errors = list(context.errors or ())
+
+class PersistedQueryRouter(GraphQLRouter):
+    """
+    GraphQLRouter con consultas persistidas automáticas. Los cuerpos JSON se leen y las
+    respuestas se escriben con orjson cuando está instalado.
+    """
+
+    def parse_json(self, data):
+        try:
+            return json_loads(data)
+        except json.JSONDecodeError as e:
+            raise HTTPException(400, "Unable to parse request body as JSON") from e
+
+    def encode_json(self, response_data):
+        return json_dumps(response_data)
+
+    def should_render_graphiql(self, request):
+        # Un GET con consulta persistida (sin el parámetro query) no pide GraphiQL
+        return "extensions" not in request.query_params and super().should_render_graphiql(request)
+
+    async def parse_http_body(self, request):
+        content_type = request.content_type or ""
+        if "application/json" in content_type:
+            data = self.parse_json(await request.get_body())
+        elif request.method == "GET":
+            data = self.parse_query_params(request.query_params)
+            if isinstance(data.get("extensions"), str):
+                data["extensions"] = self.parse_json(data["extensions"])
+        else:
+            return await super().parse_http_body(request)
+
+        query = data.get("query")
+        extensions = data.get("extensions")
+        persisted = extensions.get("persistedQuery") if isinstance(extensions, dict) else None
+        if persisted:
+            query = resolve_persisted_query(persisted, query)
+
+        return GraphQLRequestData(
+            query=query,
+            variables=data.get("variables"),
+            operation_name=data.get("operationName"),
+        )
+
+    async def execute_operation(self, request, context, root_value):
+        try:
+            return await super().execute_operation(request, context, root_value)
+        except PersistedQueryNotFound:
+            # El cliente debe reenviar la consulta completa junto con el hash
+            error = GraphQLError("PersistedQueryNotFound", extensions={"code": "PERSISTED_QUERY_NOT_FOUND"})
+            return ExecutionResult(data=None, errors=[error])
+
+def resolve_persisted_query(persisted, query):
+    """Texto de la consulta persistida: desde la caché o, si viene en la solicitud, verificado y registrado"""
+    if not isinstance(persisted, dict) or persisted.get("version") != PERSISTED_QUERY_VERSION:
+        raise HTTPException(400, "Versión de consulta persistida no soportada")
+    query_hash = persisted.get("sha256Hash")
+    if not isinstance(query_hash, str):
+        raise HTTPException(400, "Falta el sha256Hash de la consulta persistida")
+    query_hash = query_hash.lower()
+
+    if query is None:
+        return document_cache.query(query_hash)
+
+    if document_cache.query_hash(query) != query_hash:
+        raise HTTPException(400, "El sha256Hash no corresponde a la consulta")
+    if document_cache.register(query_hash, query) is not None and logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Consulta persistida registrada: {query_hash}")
+    return query
@@ -0,0 +1,142 @@
+"""
+Endpoints REST de scoring para llamadas internas: la misma predicción que las
+mutaciones GraphQL, sin parsear, validar ni resolver una consulta.
+
+- POST /score: las 11 características como arreglo JSON plano, en el orden de
+  ScorePredictionService.selected_features.
+- POST /score/batch: arreglo plano con n × 11 valores (o lista de filas de 11).
+
+Con Content-Type application/msgpack (o application/x-msgpack) el cuerpo es el
+mismo arreglo codificado en msgpack. Las respuestas tienen los campos de
+ScorePredictionResult (en snake_case) y se codifican con orjson si está instalado.
+"""
+import logging
+import time
+import numpy as np
+from fastapi import APIRouter, Request
+from app.api.encoding import FastJSONResponse, json_loads, is_msgpack, msgpack_loads
+from app.ml.services.feature_record import FeatureRecord
+from app.ml.services.score_executor import ScoringOverloadedError
+from app.monitoring.metrics import REST_SCORE_SECONDS
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Series de la duración de cada endpoint
+REST_SCORE = REST_SCORE_SECONDS.labels("/score")
+REST_SCORE_BATCH = REST_SCORE_SECONDS.labels("/score/batch")
+
+class InvalidScoreBody(ValueError):
+    """El cuerpo de la solicitud no es un arreglo de características válido"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+def decode_body(body, content_type):
+    """Decodifica el cuerpo JSON o msgpack; InvalidScoreBody si no se puede"""
+    if is_msgpack(content_type):
+        try:
+            return msgpack_loads(body)
+        except RuntimeError as e:
+            raise InvalidScoreBody(str(e), status_code=415) from e
+        except Exception as e:
+            raise InvalidScoreBody(f"Cuerpo msgpack inválido: {str(e) or type(e).__name__}") from e
+    try:
+        return json_loads(body)
+    except ValueError as e:
+        raise InvalidScoreBody(f"Cuerpo JSON inválido: {str(e)}") from e
+
+def feature_record(values, width):
+    """Registro de características desde un arreglo plano de `width` números"""
+    if not isinstance(values, list) or len(values) != width:
+        raise InvalidScoreBody(f"Se esperaba un arreglo de {width} características")
+    for value in values:
+        if not isinstance(value, (int, float)):
+            raise InvalidScoreBody(f"Valor de característica no numérico: {value!r}")
+    return FeatureRecord(*values)
+
+def feature_matrix(values, width):
+    """Matriz (n × width) desde un arreglo plano de n × width números o una lista de filas"""
+    if not isinstance(values, list):
+        raise InvalidScoreBody("Se esperaba un arreglo de características")
+    if not values:
+        return np.empty((0, width), dtype=np.float64)
+    try:
+        matrix = np.array(values, dtype=np.float64)
+    except (TypeError, ValueError) as e:
+        raise InvalidScoreBody(f"Arreglo de características inválido: {str(e)}") from e
+    if matrix.ndim > 2 or matrix.size % width or (matrix.ndim == 2 and matrix.shape[1] != width):
+        raise InvalidScoreBody(f"El lote debe tener {width} características por solicitante")
+    # NumPy convierte null en NaN
+    if not np.isfinite(matrix).all():
+        raise InvalidScoreBody("El lote contiene valores nulos o no finitos")
+    return matrix.reshape(-1, width)
+
+def result_payload(result):
+    """Campos de ScorePredictionResult a partir del diccionario devuelto por el servicio"""
+    score = result.get("score")
+    return {
+        "score": float(score) if score is not None else 50.0,
+        "confidence": result.get("confidence", 0.0),
+        "category": result.get("category", "N/A"),
+        "risk_level": result.get("risk_level", "N/A"),
+        "explanation": result.get("explanation", []),
+        "error": result.get("error"),
+        "input_features": result.get("input_features"),
+    }
+
+def error_response(status_code, message):
+    return FastJSONResponse({"detail": message}, status_code=status_code)
+
+def build_score_router(score_service, score_history):
+    """Router con /score y /score/batch sobre el servicio de scoring y el historial dados"""
+    router = APIRouter(tags=["Scoring"])
+    width = len(score_service.selected_features)
+
+    async def read_body(request):
+        return decode_body(await request.body(), request.headers.get("content-type"))
+
+    @router.post("/score", response_class=FastJSONResponse)
+    async def score(request: Request):
+        """Predice el score de un solicitante (arreglo JSON o msgpack de 11 características)"""
+        started = time.perf_counter()
+        try:
+            record = feature_record(await read_body(request), width)
+            result = await score_service.predict_score_async(record)
+            await score_history.record(result, "rest_score", model_version=score_service.model_version)
+            return FastJSONResponse(result_payload(result))
+        except InvalidScoreBody as e:
+            return error_response(e.status_code, str(e))
+        except ScoringOverloadedError as e:
+            logger.warning(f"Predicción rechazada: {str(e)}")
+            return error_response(503, str(e))
+        except Exception as e:
+            logger.error(f"Error al predecir score: {str(e)}")
+            return error_response(500, f"Error en el servicio: {str(e)}")
+        finally:
+            REST_SCORE.observe(time.perf_counter() - started)
+
+    @router.post("/score/batch", response_class=FastJSONResponse)
+    async def score_batch(request: Request):
+        """Predice el score de varios solicitantes (arreglo plano de n × 11 características)"""
+        started = time.perf_counter()
+        try:
+            matrix = feature_matrix(await read_body(request), width)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Prediciendo score en lote (REST) para {matrix.shape[0]} solicitantes")
+            results = await score_service.predict_batch_async(matrix)
+            await score_history.record_many(results, "rest_score_batch", model_version=score_service.model_version)
+            return FastJSONResponse([result_payload(result) for result in results])
+        except InvalidScoreBody as e:
+            return error_response(e.status_code, str(e))
+        except ScoringOverloadedError as e:
+            logger.warning(f"Predicción rechazada: {str(e)}")
+            return error_response(503, str(e))
+        except Exception as e:
+            logger.error(f"Error al predecir score: {str(e)}")
+            return error_response(500, f"Error en el servicio: {str(e)}")
+        finally:
+            REST_SCORE_BATCH.observe(time.perf_counter() - started)
+
+    return router
@@ -1,8 +1,10 @@
 import motor.motor_asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
+from beanie import init_beanie
 import os
 from dotenv import load_dotenv
 import logging
+from app.monitoring.metrics import MongoPoolListener
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -32,7 +34,8 @@ async def init_mongodb():
             serverSelectionTimeoutMS=5000,
             connectTimeoutMS=10000,
             retryWrites=True,
-            w="majority"
+            w="majority",
+            event_listeners=[MongoPoolListener()],
         )
         _mongo_db = _mongo_client[MONGO_DB]
         
@@ -40,11 +43,30 @@ async def init_mongodb():
         await _mongo_client.admin.command('ping')
         logger.info(f"Conexión a MongoDB inicializada exitosamente para la base de datos '{MONGO_DB}'")
         
+        # Registrar los documentos Beanie (crea los índices declarados en cada uno)
+        await init_document_models(_mongo_db)
+        
         return _mongo_db
     except Exception as e:
         logger.error(f"Error al inicializar MongoDB: {str(e)}")
         raise
 
+async def init_document_models(mongo_db):
+    """Inicializa Beanie con los documentos del servicio y asegura sus índices"""
+    from app.db.models.loan import LoanDocument
+    from app.db.models.monthly_payment import MonthlyPaymentDocument
+    from app.db.models.offer import OfferDocument
+    from app.db.models.solicitude import SolicitudeDocument
+    from app.db.models.user import UserDocument
+    from app.db.indexes import ensure_indexes
+    
+    await init_beanie(
+        database=mongo_db,
+        document_models=[LoanDocument, MonthlyPaymentDocument, OfferDocument, SolicitudeDocument, UserDocument],
+    )
+    # Colecciones sin documento Beanie (borrower_features, system_info)
+    await ensure_indexes(mongo_db, ["borrower_features", "system_info"])
+
 def get_mongo_db():
     """Devuelve la base de datos MongoDB inicializada"""
     global _mongo_db
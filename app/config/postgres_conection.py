@@ -1,23 +1,27 @@
-from sqlalchemy import create_engine, MetaData, Table, Column
+import sqlalchemy
+from sqlalchemy import create_engine, MetaData, Table, Column, select, text, inspect
 from sqlalchemy.ext.automap import automap_base
 from sqlalchemy.orm import sessionmaker
 import os
-from dotenv import load_dotenv
+import hashlib
+import logging
+import pickle
+import threading
+import time
+from app.config.settings import settings
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-# Configuración desde variables de entorno
-POSTGRES_USER = os.getenv("POSTGRES_USER")
-POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
-POSTGRES_HOST = os.getenv("POSTGRES_HOST", "localhost")
-POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
-POSTGRES_DB = os.getenv("POSTGRES_DB")
-
-# Construir la URL de conexión
-SQLALCHEMY_DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
-
-# Crear el motor de SQLAlchemy
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Crear el motor de SQLAlchemy (único pool de conexiones del servicio)
+engine = create_engine(
+    settings.postgres_url,
+    connect_args={"connect_timeout": settings.POSTGRES_CONNECT_TIMEOUT_SECONDS},
+    pool_size=settings.POSTGRES_POOL_SIZE,
+    max_overflow=settings.POSTGRES_MAX_OVERFLOW,
+    pool_timeout=settings.POSTGRES_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.POSTGRES_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=True,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 metadata = MetaData()
 
@@ -25,14 +29,111 @@ metadata = MetaData()
 TABLES_TO_SYNC = ["user", "solicitude", "offer", "loan", "monthly_payment"]
 
 # Crear un objeto Base automáticamente mapeado
-Base = automap_base()
+Base = automap_base(metadata=metadata)
+
+# Instantánea local del esquema reflejado (se invalida al cambiar la versión)
+SCHEMA_SNAPSHOT_VERSION = 1
+
+# Huella del esquema: una sola consulta barata sobre information_schema
+SCHEMA_FINGERPRINT_QUERY = text("""
+    SELECT md5(coalesce(string_agg(
+        concat_ws(':', table_name, column_name, data_type, is_nullable,
+                  character_maximum_length, numeric_precision, numeric_scale, column_default),
+        ',' ORDER BY table_name, ordinal_position), ''))
+    FROM information_schema.columns
+    WHERE table_schema = current_schema() AND table_name = ANY(:tables)
+""")
+
+_schema_fingerprint = None
+_schema_lock = threading.RLock()
+
+def get_schema_fingerprint():
+    """Huella de las columnas de TABLES_TO_SYNC; cambia si cambia su esquema"""
+    with engine.connect() as connection:
+        if engine.dialect.name == "postgresql":
+            return connection.execute(SCHEMA_FINGERPRINT_QUERY, {"tables": TABLES_TO_SYNC}).scalar()
+        # Otros motores (pruebas locales): huella a partir del inspector
+        inspector = inspect(connection)
+        columns = [
+            (table_name, column["name"], str(column["type"]), column["nullable"])
+            for table_name in sorted(TABLES_TO_SYNC) if inspector.has_table(table_name)
+            for column in inspector.get_columns(table_name)
+        ]
+        return hashlib.md5(repr(columns).encode()).hexdigest()
+
+def _snapshot_key():
+    """Identifica la base de datos y la versión de SQLAlchemy a la que corresponde la instantánea"""
+    return {
+        "version": SCHEMA_SNAPSHOT_VERSION,
+        "sqlalchemy": sqlalchemy.__version__,
+        "url": engine.url.render_as_string(hide_password=True),
+        "tables": sorted(TABLES_TO_SYNC),
+    }
+
+def _use_schema(reflected, fingerprint):
+    """Reemplaza las tablas de `metadata` por las de `reflected` y rehace el automapeo"""
+    global Base, _schema_fingerprint
+    metadata.clear()
+    for table in reflected.tables.values():
+        table.to_metadata(metadata)
+    Base = automap_base(metadata=metadata)
+    Base.prepare()
+    _schema_fingerprint = fingerprint
+
+def _load_schema_snapshot():
+    """Carga la instantánea local del esquema; devuelve False si no existe o no corresponde"""
+    try:
+        with open(settings.SCHEMA_SNAPSHOT_PATH, "rb") as snapshot_file:
+            snapshot = pickle.load(snapshot_file)
+    except FileNotFoundError:
+        return False
+    except Exception as e:
+        logger.warning(f"No se pudo leer la instantánea del esquema: {str(e)}")
+        return False
+
+    if snapshot.get("key") != _snapshot_key():
+        logger.info("La instantánea del esquema no corresponde a esta base de datos, se ignora")
+        return False
+    _use_schema(snapshot["metadata"], snapshot["fingerprint"])
+    logger.info(f"Esquema cargado desde la instantánea {settings.SCHEMA_SNAPSHOT_PATH}")
+    return True
+
+def _save_schema_snapshot(reflected, fingerprint):
+    """Guarda la instantánea del esquema (escritura atómica)"""
+    try:
+        directory = os.path.dirname(settings.SCHEMA_SNAPSHOT_PATH) or "."
+        os.makedirs(directory, exist_ok=True)
+        temporary_path = f"{settings.SCHEMA_SNAPSHOT_PATH}.tmp"
+        with open(temporary_path, "wb") as snapshot_file:
+            pickle.dump({"key": _snapshot_key(), "fingerprint": fingerprint, "metadata": reflected}, snapshot_file)
+        os.replace(temporary_path, settings.SCHEMA_SNAPSHOT_PATH)
+    except Exception as e:
+        logger.warning(f"No se pudo guardar la instantánea del esquema: {str(e)}")
+
+def init_postgres_models(check_fingerprint=True):
+    """
+    Inicializa los modelos reflejados de PostgreSQL.
+
+    El esquema de TABLES_TO_SYNC se carga de la instantánea local si existe; solo se
+    vuelve a reflejar (y se reescribe la instantánea) cuando la huella del esquema
+    cambió. Con `check_fingerprint=False` y una instantánea válida no hay consultas.
+    """
+    with _schema_lock:
+        if not metadata.tables:
+            _load_schema_snapshot()
 
-def init_postgres_models():
-    """Inicializa los modelos reflejados de PostgreSQL"""
-    # Reflejar solo las tablas específicas que queremos
-    metadata.reflect(engine, only=TABLES_TO_SYNC)
-    Base.prepare(engine, reflect=True)
-    return {table_name: getattr(Base.classes, table_name) for table_name in TABLES_TO_SYNC if hasattr(Base.classes, table_name)}
+        if check_fingerprint or not metadata.tables:
+            fingerprint = get_schema_fingerprint()
+            if fingerprint != _schema_fingerprint:
+                started = time.perf_counter()
+                # Reflejar solo las tablas específicas que queremos
+                reflected = MetaData()
+                reflected.reflect(engine, only=lambda table_name, _: table_name in TABLES_TO_SYNC)
+                _use_schema(reflected, fingerprint)
+                _save_schema_snapshot(reflected, fingerprint)
+                logger.info(f"Esquema de PostgreSQL reflejado en {time.perf_counter() - started:.2f}s")
+
+        return {table_name: getattr(Base.classes, table_name) for table_name in TABLES_TO_SYNC if hasattr(Base.classes, table_name)}
 
 def get_postgres_session():
     """Proporciona una sesión de base de datos PostgreSQL"""
@@ -41,38 +142,70 @@ def get_postgres_session():
         yield db
     finally:
         db.close()
+
 def get_table_data(table_name):
     """Obtiene todos los registros de una tabla específica"""
-    try:
-        # Iniciar sesión
-        with SessionLocal() as session:
-            # Consultar la tabla
-            if table_name not in metadata.tables:
-                metadata.reflect(bind=engine, only=[table_name])
-            
-            if table_name not in metadata.tables:
-                logger.warning(f"La tabla {table_name} no existe en la base de datos")
-                return []
-                
-            table = metadata.tables[table_name]
-            result = session.query(table).all()
-            
-            # Convertir a diccionarios
-            records = [dict(row._mapping) for row in result]
-            return records
-            
-    except Exception as e:
-        logger.error(f"Error al obtener datos de la tabla {table_name}: {str(e)}")
-        return []
-def get_table_data(table_name):
-    """Obtiene todos los registros de una tabla específica"""
+    return [record for chunk in iter_table_chunks(table_name) for record in chunk]
+
+def iter_table_chunks(table_name, chunk_size=1000, watermark_column=None, since=None):
+    """
+    Lee una tabla en bloques de `chunk_size` registros usando un cursor del lado del servidor,
+    de modo que la memoria usada no crece con el tamaño de la tabla.
+
+    Si se indica `watermark_column`, solo se leen los registros con esa columna mayor
+    o igual a `since` (mayor estricto si es la clave primaria), ordenados por ella.
+    """
+    table = get_table(table_name)
+    query = select(table)
+    if watermark_column is not None:
+        column = table.columns[watermark_column]
+        query = query.order_by(column)
+        if since is not None:
+            # Con la clave primaria no hay empates posibles; con fechas se repite el borde
+            query = query.where(column > since if watermark_column == get_primary_key(table_name) else column >= since)
+
+    with SessionLocal() as session:
+        result = session.execute(query.execution_options(stream_results=True, yield_per=chunk_size))
+        for partition in result.partitions():
+            yield [dict(row._mapping) for row in partition]
+
+# Columnas candidatas para la marca de agua incremental, en orden de preferencia
+WATERMARK_COLUMNS = ["updated_at", "created_at", "id"]
+
+# Columnas que cambian cuando se modifica una fila (created_at o id solo detectan filas nuevas)
+CHANGE_TRACKING_COLUMNS = ["updated_at"]
+
+def get_table(table_name):
+    """Devuelve la tabla reflejada, cargando el esquema si todavía no está en metadata"""
     if table_name not in TABLES_TO_SYNC:
         raise ValueError(f"La tabla {table_name} no está en la lista de tablas a sincronizar")
-    
+    if table_name not in metadata.tables:
+        init_postgres_models(check_fingerprint=False)
+    if table_name not in metadata.tables:
+        raise ValueError(f"La tabla {table_name} no existe en PostgreSQL")
+    return metadata.tables[table_name]
+
+def get_primary_key(table_name):
+    """Nombre de la columna de clave primaria de una tabla (por defecto 'id')"""
+    table = get_table(table_name)
+    pk_columns = list(table.primary_key.columns)
+    return pk_columns[0].name if pk_columns else "id"
+
+def get_watermark_column(table_name):
+    """Columna usada como marca de agua para detectar cambios en una tabla"""
+    table = get_table(table_name)
+    for column_name in WATERMARK_COLUMNS:
+        if column_name in table.columns:
+            return column_name
+    return get_primary_key(table_name)
+
+def has_change_tracking(table_name):
+    """Indica si la marca de agua de la tabla detecta también las filas modificadas"""
+    return get_watermark_column(table_name) in CHANGE_TRACKING_COLUMNS
+
+def get_existing_ids(table_name, ids):
+    """Devuelve las claves primarias de `ids` que todavía existen en la tabla"""
+    table = get_table(table_name)
+    pk_column = table.columns[get_primary_key(table_name)]
     with SessionLocal() as session:
-        # Usar Table directamente desde metadata
-        table = metadata.tables[table_name]
-        result = session.query(table).all()
-        # Convertir a diccionarios
-        records = [dict(row._mapping) for row in result]
-        return records
\ No newline at end of file
+        return {row[0] for row in session.execute(select(pk_column).where(pk_column.in_(list(ids))))}
@@ -11,6 +11,9 @@ class Settings(BaseSettings):
     API_HOST: str = os.getenv("API_HOST", "0.0.0.0")
     API_PORT: int = int(os.getenv("API_PORT", "8000"))
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    # Documentos GraphQL parseados y validados en caché, incluidas las consultas
+    # persistidas (GRAPHQL_DOCUMENT_CACHE_SIZE=0 la deshabilita)
+    GRAPHQL_DOCUMENT_CACHE_SIZE: int = int(os.getenv("GRAPHQL_DOCUMENT_CACHE_SIZE", "256"))
     
     # PostgreSQL
     POSTGRES_USER: str = os.getenv("POSTGRES_USER", "postgres")
@@ -18,6 +21,15 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str = os.getenv("POSTGRES_HOST", "localhost")
     POSTGRES_PORT: str = os.getenv("POSTGRES_PORT", "5432")
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "loanData")
+    # Pool de conexiones compartido por todos los accesos a PostgreSQL
+    POSTGRES_POOL_SIZE: int = int(os.getenv("POSTGRES_POOL_SIZE", "5"))
+    POSTGRES_MAX_OVERFLOW: int = int(os.getenv("POSTGRES_MAX_OVERFLOW", "10"))
+    POSTGRES_POOL_TIMEOUT_SECONDS: float = float(os.getenv("POSTGRES_POOL_TIMEOUT_SECONDS", "30"))
+    POSTGRES_POOL_RECYCLE_SECONDS: int = int(os.getenv("POSTGRES_POOL_RECYCLE_SECONDS", "1800"))
+    # Segundos máximos para establecer una conexión nueva con PostgreSQL
+    POSTGRES_CONNECT_TIMEOUT_SECONDS: int = int(os.getenv("POSTGRES_CONNECT_TIMEOUT_SECONDS", "10"))
+    # Instantánea local del esquema reflejado de las tablas sincronizadas
+    SCHEMA_SNAPSHOT_PATH: str = os.getenv("SCHEMA_SNAPSHOT_PATH", ".cache/pg_schema_snapshot.pickle")
     
      # MongoDB
     MONGO_URI: str = os.getenv("MONGO_URI", "mongodb://localhost:27017")
@@ -34,7 +46,67 @@ class Settings(BaseSettings):
     USER_EVENTS_QUEUE: str = os.getenv("USER_EVENTS_QUEUE", "user_events")
     LOAN_EVENTS_QUEUE: str = os.getenv("LOAN_EVENTS_QUEUE", "loan_events")
     PAYMENT_EVENTS_QUEUE: str = os.getenv("PAYMENT_EVENTS_QUEUE", "payment_events")
+    # Consumidor de eventos: mensajes sin confirmar por canal y lotes de escritura
+    ENABLE_EVENT_CONSUMER: bool = os.getenv("ENABLE_EVENT_CONSUMER", "false").lower() == "true"
+    RABBITMQ_PREFETCH: int = int(os.getenv("RABBITMQ_PREFETCH", "200"))
+    EVENT_BATCH_SIZE: int = int(os.getenv("EVENT_BATCH_SIZE", "100"))
+    EVENT_BATCH_MAX_WAIT_MS: float = float(os.getenv("EVENT_BATCH_MAX_WAIT_MS", "200"))
+    EVENT_RECONNECT_SECONDS: float = float(os.getenv("EVENT_RECONNECT_SECONDS", "5"))
     
+    # Modelo de scoring: "synthetic" (algoritmo sintético) o "model" (red neuronal entrenada)
+    SCORE_MODEL_MODE: str = os.getenv("SCORE_MODEL_MODE", "synthetic")
+    # Cargar el modelo en segundo plano al iniciar (si no, se carga en la primera predicción)
+    SCORE_MODEL_PRELOAD: bool = os.getenv("SCORE_MODEL_PRELOAD", "true").lower() == "true"
+    # Micro-batching de inferencias concurrentes
+    SCORE_BATCH_MAX_SIZE: int = int(os.getenv("SCORE_BATCH_MAX_SIZE", "64"))
+    SCORE_BATCH_MAX_WAIT_MS: float = float(os.getenv("SCORE_BATCH_MAX_WAIT_MS", "5"))
+    # Caché de resultados (SCORE_CACHE_SIZE=0 la deshabilita)
+    SCORE_CACHE_SIZE: int = int(os.getenv("SCORE_CACHE_SIZE", "10000"))
+    SCORE_CACHE_TTL_SECONDS: float = float(os.getenv("SCORE_CACHE_TTL_SECONDS", "300"))
+    # Cada cuántos segundos verificar si cambiaron los artefactos del modelo
+    SCORE_ARTIFACT_CHECK_SECONDS: float = float(os.getenv("SCORE_ARTIFACT_CHECK_SECONDS", "30"))
+    # Executor del scoring: "thread" o "process" (cada proceso carga su propio modelo)
+    SCORE_EXECUTOR: str = os.getenv("SCORE_EXECUTOR", "thread")
+    SCORE_EXECUTOR_WORKERS: int = int(os.getenv("SCORE_EXECUTOR_WORKERS", "4"))
+    # Predicciones en curso como máximo; por encima se responde "sobrecargado"
+    SCORE_MAX_PENDING: int = int(os.getenv("SCORE_MAX_PENDING", "256"))
+    # Historial de predicciones (escritura diferida por lotes en MongoDB)
+    SCORE_HISTORY_ENABLED: bool = os.getenv("SCORE_HISTORY_ENABLED", "true").lower() == "true"
+    SCORE_HISTORY_BUFFER_SIZE: int = int(os.getenv("SCORE_HISTORY_BUFFER_SIZE", "10000"))
+    SCORE_HISTORY_BATCH_SIZE: int = int(os.getenv("SCORE_HISTORY_BATCH_SIZE", "500"))
+    SCORE_HISTORY_FLUSH_MS: float = float(os.getenv("SCORE_HISTORY_FLUSH_MS", "1000"))
+    # Espera máxima para encolar cuando el búfer está lleno (después se descarta)
+    SCORE_HISTORY_PUT_TIMEOUT_MS: float = float(os.getenv("SCORE_HISTORY_PUT_TIMEOUT_MS", "50"))
+
+    # Sincronización: "incremental" (marca de agua + upserts) o "full" (copia completa)
+    SYNC_MODE: str = os.getenv("SYNC_MODE", "incremental")
+    # Registros por bloque al leer PostgreSQL y escribir en MongoDB
+    SYNC_CHUNK_SIZE: int = int(os.getenv("SYNC_CHUNK_SIZE", "1000"))
+    # Guardar las columnas numéricas (montos) como Decimal128 en lugar de float
+    SYNC_MONEY_AS_DECIMAL128: bool = os.getenv("SYNC_MONEY_AS_DECIMAL128", "false").lower() == "true"
+    # Tablas sincronizadas en paralelo como máximo
+    SYNC_CONCURRENCY: int = int(os.getenv("SYNC_CONCURRENCY", "3"))
+    # Cada cuántas sincronizaciones incrementales se eliminan los registros borrados
+    SYNC_RECONCILE_EVERY: int = int(os.getenv("SYNC_RECONCILE_EVERY", "24"))
+    # Cada cuántas sincronizaciones incrementales se comparan completas las tablas sin
+    # updated_at para copiar sus filas modificadas. Entre comparaciones esas filas pueden
+    # quedar desactualizadas en MongoDB; 1 las compara siempre (leyendo toda la tabla)
+    SYNC_REFRESH_EVERY: int = int(os.getenv("SYNC_REFRESH_EVERY", "24"))
+    # Tablas que la sincronización completa extrae con COPY por rangos de clave primaria
+    SYNC_COPY_TABLES: str = os.getenv("SYNC_COPY_TABLES", "loan,monthly_payment")
+    # Rangos (conexiones) leídos en paralelo por tabla
+    SYNC_COPY_WORKERS: int = int(os.getenv("SYNC_COPY_WORKERS", "4"))
+    # Servicio de sincronización continua: intervalo (o expresión cron) y retardo aleatorio
+    SYNC_INTERVAL_MINUTES: int = int(os.getenv("SYNC_INTERVAL_MINUTES", "60"))
+    SYNC_CRON: str = os.getenv("SYNC_CRON", "")
+    SYNC_JITTER_SECONDS: float = float(os.getenv("SYNC_JITTER_SECONDS", "30"))
+    # Duración del lease que impide sincronizaciones simultáneas entre réplicas
+    SYNC_LEASE_SECONDS: int = int(os.getenv("SYNC_LEASE_SECONDS", "300"))
+    # Primera espera tras un fallo (se duplica en cada fallo consecutivo)
+    SYNC_RETRY_SECONDS: float = float(os.getenv("SYNC_RETRY_SECONDS", "30"))
+
+    # Leer las características de la colección materializada borrower_features
+    FEATURE_STORE_MATERIALIZED: bool = os.getenv("FEATURE_STORE_MATERIALIZED", "true").lower() == "true"
 
     ENABLE_INITIAL_SYNC: bool = os.getenv("ENABLE_INITIAL_SYNC", "true").lower() == "true"
     # Database URL
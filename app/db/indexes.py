@@ -0,0 +1,72 @@
+import logging
+from pymongo import ASCENDING, IndexModel
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+def _unique_id_index():
+    """Índice único sobre el id de PostgreSQL"""
+    return IndexModel([("id", ASCENDING)], unique=True, name="id_unique")
+
+# Índices de las colecciones sincronizadas. Los compuestos siguen los $lookup de la
+# cadena user → solicitude → offer → loan → monthly_payment del feature store.
+SYNC_INDEXES = {
+    "user": [
+        _unique_id_index(),
+    ],
+    "solicitude": [
+        _unique_id_index(),
+        IndexModel([("borrower_id", ASCENDING), ("id", ASCENDING)], name="borrower_id_id"),
+    ],
+    "offer": [
+        _unique_id_index(),
+        IndexModel([("id_solicitude", ASCENDING), ("id", ASCENDING)], name="id_solicitude_id"),
+    ],
+    "loan": [
+        _unique_id_index(),
+        IndexModel([("id_offer", ASCENDING), ("id", ASCENDING)], name="id_offer_id"),
+    ],
+    "monthly_payment": [
+        _unique_id_index(),
+        IndexModel([("id_loan", ASCENDING), ("id", ASCENDING)], name="id_loan_id"),
+    ],
+    "borrower_features": [
+        IndexModel([("borrower_id", ASCENDING)], unique=True, name="borrower_id_unique"),
+    ],
+    "scores": [
+        IndexModel([("borrower_id", ASCENDING)], unique=True, name="borrower_id_unique"),
+    ],
+    "score_history": [
+        IndexModel([("borrower_id", ASCENDING), ("created_at", ASCENDING)], name="borrower_id_created_at"),
+        IndexModel([("created_at", ASCENDING)], name="created_at"),
+    ],
+    "system_info": [
+        IndexModel([("sync_watermark", ASCENDING)], name="sync_watermark"),
+    ],
+}
+
+async def ensure_indexes_on(collection, collection_name):
+    """
+    Crea en `collection` los índices declarados para `collection_name`
+    (útil para construirlos en una colección temporal antes de renombrarla)
+    """
+    indexes = SYNC_INDEXES.get(collection_name)
+    if indexes:
+        await collection.create_indexes(indexes)
+
+async def ensure_indexes(mongo_db, collections=None):
+    """
+    Crea (si no existen) los índices declarados para las colecciones indicadas,
+    o para todas. Los errores se registran sin interrumpir el resto.
+    """
+    ensured = []
+    for collection_name in collections or SYNC_INDEXES:
+        indexes = SYNC_INDEXES.get(collection_name)
+        if not indexes:
+            continue
+        try:
+            await mongo_db[collection_name].create_indexes(indexes)
+            ensured.append(collection_name)
+        except Exception as e:
+            logger.error(f"Error al crear índices en {collection_name}: {str(e)}")
+    return ensured
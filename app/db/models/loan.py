@@ -4,6 +4,7 @@ from datetime import datetime,timezone
 from typing import Optional
 from pydantic import Field, validator
 from bson import ObjectId
+from app.db.indexes import SYNC_INDEXES
 
 
 class LoanDocument(Document):
@@ -19,9 +20,9 @@ class LoanDocument(Document):
     current_status:    str                  # "al_dia" | "en_mora" | "mora_grave"
     late_payment_count:int                  = 0
 
-    last_status_update:datetime             = Field(default_factory=datetime.now(timezone.utc))
-    created_at:         datetime            = Field(default_factory=datetime.now(timezone.utc))
-    updated_at:         datetime            = Field(default_factory=datetime.now(timezone.utc))
+    last_status_update:datetime             = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at:         datetime            = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at:         datetime            = Field(default_factory=lambda: datetime.now(timezone.utc))
 
     # --- validación / conversión extra ---------------------------------
     @validator("start_date", "end_date", "last_status_update", pre=True)
@@ -33,3 +34,4 @@ class LoanDocument(Document):
 
     class Settings:
         name = "loan"          # nombre exacto de la colección
+        indexes = SYNC_INDEXES["loan"]
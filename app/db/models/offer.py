@@ -2,6 +2,7 @@ from beanie import Document
 from typing import Optional
 from datetime import datetime,timezone
 from pydantic import Field
+from app.db.indexes import SYNC_INDEXES
 
 class OfferDocument(Document):
     id: int
@@ -17,4 +18,5 @@ class OfferDocument(Document):
 
     class Settings:
         name = "offer"  # Nombre de la colección en MongoDB
+        indexes = SYNC_INDEXES["offer"]
         use_state_management = True
\ No newline at end of file
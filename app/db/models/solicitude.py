@@ -2,6 +2,7 @@ from beanie import Document
 from typing import Optional
 from datetime import datetime, timezone
 from pydantic import BaseModel, Field
+from app.db.indexes import SYNC_INDEXES
 
 class SolicitudeDocument(Document):
     id: int 
@@ -11,4 +12,5 @@ class SolicitudeDocument(Document):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     
     class Settings:
-        name = "solicitude"  # Nombre de la colección en MongoDB
\ No newline at end of file
+        name = "solicitude"  # Nombre de la colección en MongoDB
+        indexes = SYNC_INDEXES["solicitude"]
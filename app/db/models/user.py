@@ -2,6 +2,7 @@ from beanie import Document
 from pydantic import Field  # Importar Field desde pydantic, no desde beanie
 from datetime import datetime
 from typing import Optional, List
+from app.db.indexes import SYNC_INDEXES
 class UserDocument(Document):
     id: int = Field(..., description="ID del usuario (mismo que en ERP)")
     name: str
@@ -16,4 +17,5 @@ class UserDocument(Document):
     # Configuración del documento
     class Settings:
         name = "user"  # Nombre de la colección en MongoDB
+        indexes = SYNC_INDEXES["user"]
         use_state_management = True
\ No newline at end of file
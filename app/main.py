@@ -1,22 +1,39 @@
 import logging
 import asyncio
 import os
+import time
+from typing import Optional
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 import strawberry
-from strawberry.fastapi import GraphQLRouter
 import uvicorn
 from dotenv import load_dotenv
 
 # Importaciones para la sincronización
 from app.config.database import init_mongodb, get_mongo_db
 from app.config.postgres_conection import init_postgres_models
-from app.sync.data_sync import sync_table_to_mongodb
+from app.sync.data_sync import sync_all_tables, TABLES_TO_SYNC
+from app.sync.event_consumer import RabbitMQEventConsumer
+from app.sync.sync_lease import SyncLease
 from app.config.settings import settings
 
 # Importaciones para el modelo ML
 from app.ml.services.score_service import ScorePredictionService
-from app.ml.schemas.score_schemas import ScorePredictionInput, ScorePredictionResult, InputFeatures
+from app.ml.services.feature_store import BorrowerFeatureStore
+from app.ml.services.feature_record import FeatureRecord
+from app.ml.services.score_history import ScoreHistoryWriter
+from app.ml.services.score_executor import ScoringOverloadedError
+from app.monitoring.metrics import REGISTRY, GRAPHQL_RESOLVE_SECONDS, register_service_metrics
+from app.api.persisted_queries import CachedDocumentExtension, PersistedQueryRouter, document_cache
+from app.api.score_routes import build_score_router
+from app.ml.schemas.score_schemas import (
+    ScorePredictionInput,
+    ScorePredictionResult,
+    ScoreBatchColumnsInput,
+    InputFeatures,
+)
+import numpy as np
 
 # Cargar variables de entorno
 load_dotenv()
@@ -28,8 +45,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Inicializar servicio de predicción
+# Inicializar servicio de predicción (los artefactos se cargan de forma diferida)
 score_service = ScorePredictionService()
+feature_store = BorrowerFeatureStore()
+score_history = ScoreHistoryWriter(
+    max_buffer=settings.SCORE_HISTORY_BUFFER_SIZE,
+    batch_size=settings.SCORE_HISTORY_BATCH_SIZE,
+    flush_interval_ms=settings.SCORE_HISTORY_FLUSH_MS,
+    put_timeout_ms=settings.SCORE_HISTORY_PUT_TIMEOUT_MS,
+)
+event_consumer = None
+
+# Caché, executor, historial y caché de documentos GraphQL se leen al consultar /metrics
+register_service_metrics(score_service, score_history, document_cache)
+
+# Series de la duración de cada mutación GraphQL
+RESOLVE_PREDICT_SCORE = GRAPHQL_RESOLVE_SECONDS.labels("predictScore")
+RESOLVE_PREDICT_SCORE_BATCH = GRAPHQL_RESOLVE_SECONDS.labels("predictScoreBatch")
+RESOLVE_PREDICT_SCORE_FOR_BORROWER = GRAPHQL_RESOLVE_SECONDS.labels("predictScoreForBorrower")
 
 # Inicializar aplicación FastAPI
 app = FastAPI(
@@ -56,12 +89,54 @@ async def root():
         "environment": settings.API_ENV,
     }
 
+# Liveness: el proceso responde
+@app.get("/health/live", tags=["Health"])
+async def health_live():
+    return {"status": "alive"}
+
+# Readiness: el modelo de scoring está cargado y listo para predecir
+@app.get("/health/ready", tags=["Health"])
+async def health_ready():
+    if not score_service.is_loaded:
+        return JSONResponse(status_code=503, content={"status": "loading"})
+    return {"status": "ready", "mock_mode": score_service.mock_mode, "backend": score_service.backend}
+
+# Contadores de la caché de scores
+@app.get("/ml/cache", tags=["ML"])
+async def score_cache_stats():
+    return {"model_version": score_service.model_version, **score_service.cache.stats()}
+
+@app.get("/ml/executor", tags=["ML"])
+async def score_executor_stats():
+    return score_service.executor.stats()
+
+@app.get("/ml/history", tags=["ML"])
+async def score_history_stats():
+    return score_history.stats()
+
+# Contadores de la caché de documentos GraphQL (consultas persistidas incluidas)
+@app.get("/graphql/cache", tags=["GraphQL"])
+async def graphql_document_cache_stats():
+    return document_cache.stats()
+
+# Métricas en formato de texto de Prometheus
+@app.get("/metrics", tags=["Monitoring"])
+async def metrics():
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 # Endpoint para forzar la sincronización
 @app.post("/sync", tags=["Sync"])
 async def trigger_sync():
     try:
         logger.info("Iniciando sincronización manual de datos")
-        await sync_all_data()
+        result = await sync_all_data()
+        if result is None:
+            return JSONResponse(
+                status_code=409,
+                content={"status": "skipped", "message": "Otra réplica está sincronizando (lease tomado)"},
+            )
+        if not result:
+            return {"status": "error", "message": "La sincronización terminó con errores"}
         return {"status": "success", "message": "Sincronización completada"}
     except Exception as e:
         logger.error(f"Error durante la sincronización: {str(e)}")
@@ -87,47 +162,102 @@ async def sync_status():
 
 # Función de sincronización
 async def sync_all_data():
-    """Realiza la sincronización de todas las tablas configuradas"""
+    """
+    Realiza la sincronización de todas las tablas configuradas. Devuelve True si tuvo
+    éxito, False si falló y None si se omitió porque otra réplica tiene el lease.
+    """
     try:
         logger.info("Iniciando sincronización de datos...")
         
-        # Inicializar modelos y conexiones
-        init_postgres_models()
         mongo_db = get_mongo_db()
         
-        # Lista de tablas a sincronizar
-        tables_to_sync = ["user", "solicitude", "offer", "loan", "monthly_payment"]
-        
-        # Sincronizar cada tabla
-        synced_tables = []
-        for table_name in tables_to_sync:
-            logger.info(f"Sincronizando tabla {table_name}...")
-            if await sync_table_to_mongodb(table_name, mongo_db):
-                synced_tables.append(table_name)
-                logger.info(f"Tabla {table_name} sincronizada exitosamente")
-            else:
-                logger.warning(f"Falló la sincronización de la tabla {table_name}")
-        
-        # Actualizar el estado de sincronización
-        await mongo_db.system_info.update_one(
-            {"initialization": "completed"},
-            {
-                "$set": {
-                    "synced_with_postgres": True,
-                    "last_sync": asyncio.get_event_loop().time(),
-                    "synced_tables": synced_tables
-                }
-            },
-            upsert=True
-        )
-        
-        logger.info(f"Sincronización completada. {len(synced_tables)}/{len(tables_to_sync)} tablas sincronizadas.")
-        return True
+        # Solo una réplica sincroniza a la vez
+        async with SyncLease(mongo_db, ttl_seconds=settings.SYNC_LEASE_SECONDS) as acquired:
+            if not acquired:
+                logger.info("Otra réplica está sincronizando, se omite esta sincronización")
+                return None
+            
+            # Inicializar modelos y conexiones (la reflexión es bloqueante: se hace en un hilo)
+            await asyncio.to_thread(init_postgres_models)
+            
+            # Sincronizar las tablas en paralelo con un límite de concurrencia
+            results = await sync_all_tables(TABLES_TO_SYNC, mongo_db)
+            return all(result["success"] for result in results.values())
     
     except Exception as e:
         logger.error(f"Error en la sincronización: {str(e)}")
         return False
 
+def build_prediction_result(result):
+    """Convierte el diccionario devuelto por el servicio en un ScorePredictionResult"""
+    # Crear objeto InputFeatures desde las características devueltas
+    features = result.get("input_features")
+    input_features = InputFeatures(**features) if features is not None else None
+    
+    return ScorePredictionResult(
+        score=float(result.get("score", 50.0)),
+        confidence=result.get("confidence", 0.0),
+        category=result.get("category", "N/A"),
+        risk_level=result.get("risk_level", "N/A"),
+        explanation=result.get("explanation", []),
+        error=result.get("error"),
+        input_features=input_features
+    )
+
+def overloaded_result(error):
+    """Respuesta inmediata cuando el servicio de scoring rechaza la predicción por carga"""
+    return ScorePredictionResult(
+        score=50.0,
+        confidence=0.0,
+        category="Sobrecargado",
+        risk_level="No determinado",
+        explanation=[],
+        error=str(error),
+        input_features=None
+    )
+
+def error_result(error):
+    """Respuesta por defecto cuando la predicción falla"""
+    return ScorePredictionResult(
+        score=50.0,
+        confidence=0.0,
+        category="Error",
+        risk_level="No determinado",
+        explanation=["Error en el servicio de predicción"],
+        error=f"Error en el servicio: {str(error)}",
+        input_features=None
+    )
+
+def requested_rows(inputs, columns):
+    """Cantidad de solicitantes de un lote (por filas o por columnas)"""
+    if inputs is not None:
+        return len(inputs)
+    return len(getattr(columns, score_service.selected_features[0]))
+
+async def predict_batch_results(inputs, columns):
+    """Arma la matriz de características del lote y la puntúa en el executor"""
+    features = score_service.selected_features
+    if (inputs is None) == (columns is None):
+        raise ValueError("Se debe indicar exactamente uno de 'inputs' o 'columns'")
+    
+    if inputs is not None:
+        matrix = np.array(
+            [[getattr(item, name) for name in features] for item in inputs],
+            dtype=np.float64,
+        ).reshape(len(inputs), len(features))
+    else:
+        column_values = [getattr(columns, name) for name in features]
+        if len({len(values) for values in column_values}) > 1:
+            raise ValueError("Todas las columnas deben tener la misma longitud")
+        matrix = np.array(column_values, dtype=np.float64).T.reshape(-1, len(features))
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Prediciendo score en lote para {matrix.shape[0]} solicitantes")
+    # El cálculo se hace en el executor de scoring; si está saturado falla de inmediato
+    results = await score_service.predict_batch_async(matrix)
+    await score_history.record_many(results, "predict_score_batch", model_version=score_service.model_version)
+    return [build_prediction_result(result) for result in results]
+
 # Implementación GraphQL con queries y mutations
 @strawberry.type
 class Query:
@@ -142,85 +272,122 @@ class Query:
 @strawberry.type
 class Mutation:
     @strawberry.mutation
-    def predict_score(self, input_data: ScorePredictionInput) -> ScorePredictionResult:
+    async def predict_score(self, input_data: ScorePredictionInput) -> ScorePredictionResult:
         """Predice el score crediticio basado en los datos de entrada"""
+        started = time.perf_counter()
         try:
-            # Convertir input a diccionario
-            input_dict = {
-                'adress_verified': input_data.adress_verified,
-                'identity_verified': input_data.identity_verified,
-                'loan_count': input_data.loan_count,
-                'late_payment_count': input_data.late_payment_count,
-                'avg_days_late': input_data.avg_days_late,
-                'total_penalty': input_data.total_penalty,
-                'payment_completion_ratio': input_data.payment_completion_ratio,
-                'has_no_late_payments': input_data.has_no_late_payments,
-                'has_penalty': input_data.has_penalty,
-                'loans_al_dia_ratio': input_data.loans_al_dia_ratio,
-                'days_late_per_loan': input_data.days_late_per_loan
-            }
+            # Convertir input a registro de características
+            record = FeatureRecord(
+                adress_verified=input_data.adress_verified,
+                identity_verified=input_data.identity_verified,
+                loan_count=input_data.loan_count,
+                late_payment_count=input_data.late_payment_count,
+                avg_days_late=input_data.avg_days_late,
+                total_penalty=input_data.total_penalty,
+                payment_completion_ratio=input_data.payment_completion_ratio,
+                has_no_late_payments=input_data.has_no_late_payments,
+                has_penalty=input_data.has_penalty,
+                loans_al_dia_ratio=input_data.loans_al_dia_ratio,
+                days_late_per_loan=input_data.days_late_per_loan,
+            )
             
             # Log para debug
-            logger.info(f"Prediciendo score con datos: {input_dict}")
+            debug = logger.isEnabledFor(logging.DEBUG)
+            if debug:
+                logger.debug(f"Prediciendo score con datos: {record}")
             
             # Llamar al servicio de predicción
-            result = score_service.predict_score(input_dict)
+            result = await score_service.predict_score_async(record)
             
             # Log del resultado
-            logger.info(f"Resultado de predicción: {result}")
+            if debug:
+                logger.debug(f"Resultado de predicción: {result}")
             
             # Verificar si hay score en el resultado
             if "score" not in result or result["score"] is None:
                 logger.warning("El modelo no retornó un score. Usando valor por defecto.")
                 result["score"] = 50.0
             
-            # Crear objeto InputFeatures desde el diccionario
-            input_features = None
-            if "input_features" in result and result["input_features"]:
-                input_features = InputFeatures(
-                    adress_verified=result["input_features"].get("adress_verified", 0),
-                    identity_verified=result["input_features"].get("identity_verified", 0),
-                    loan_count=result["input_features"].get("loan_count", 0),
-                    late_payment_count=result["input_features"].get("late_payment_count", 0),
-                    avg_days_late=result["input_features"].get("avg_days_late", 0.0),
-                    total_penalty=result["input_features"].get("total_penalty", 0.0),
-                    payment_completion_ratio=result["input_features"].get("payment_completion_ratio", 0.0),
-                    has_no_late_payments=result["input_features"].get("has_no_late_payments", 0),
-                    has_penalty=result["input_features"].get("has_penalty", 0),
-                    loans_al_dia_ratio=result["input_features"].get("loans_al_dia_ratio", 0.0),
-                    days_late_per_loan=result["input_features"].get("days_late_per_loan", 0.0)
-                )
+            # Guardar en el historial (escritura diferida, no bloquea la respuesta)
+            await score_history.record(result, "predict_score", model_version=score_service.model_version)
             
             # Devolver resultado enriquecido con categoría y explicación
-            return ScorePredictionResult(
-                score=float(result.get("score", 50.0)),
-                confidence=result.get("confidence", 0.0),
-                category=result.get("category", "N/A"),
-                risk_level=result.get("risk_level", "N/A"),
-                explanation=result.get("explanation", []),
-                error=result.get("error"),
-                input_features=input_features
-            )
+            return build_prediction_result(result)
+        except ScoringOverloadedError as e:
+            logger.warning(f"Predicción rechazada: {str(e)}")
+            return overloaded_result(e)
         except Exception as e:
             logger.error(f"Error al predecir score: {str(e)}")
             # Devolver un valor por defecto
-            return ScorePredictionResult(
-                score=50.0,
-                confidence=0.0,
-                category="Error",
-                risk_level="No determinado",
-                explanation=["Error en el servicio de predicción"],
-                error=f"Error en el servicio: {str(e)}",
-                input_features=None
+            return error_result(e)
+        finally:
+            RESOLVE_PREDICT_SCORE.observe(time.perf_counter() - started)
+
+    @strawberry.mutation
+    async def predict_score_batch(
+        self,
+        inputs: Optional[list[ScorePredictionInput]] = None,
+        columns: Optional[ScoreBatchColumnsInput] = None,
+    ) -> list[ScorePredictionResult]:
+        """
+        Predice el score crediticio de varios solicitantes en una sola llamada.
+        Acepta una lista de entradas o una entrada columnar (una lista por característica)
+        """
+        started = time.perf_counter()
+        try:
+            return await predict_batch_results(inputs, columns)
+        except ScoringOverloadedError as e:
+            logger.warning(f"Predicción en lote rechazada: {str(e)}")
+            return [overloaded_result(e) for _ in range(requested_rows(inputs, columns))]
+        except Exception as e:
+            logger.error(f"Error al predecir score en lote: {str(e)}")
+            return [error_result(e)]
+        finally:
+            RESOLVE_PREDICT_SCORE_BATCH.observe(time.perf_counter() - started)
+
+    @strawberry.mutation
+    async def predict_score_for_borrower(self, borrower_id: int) -> ScorePredictionResult:
+        """Predice el score de un prestatario calculando sus características desde los datos sincronizados"""
+        started = time.perf_counter()
+        try:
+            features = await feature_store.get_features(borrower_id)
+            if features is None:
+                return ScorePredictionResult(
+                    score=50.0,
+                    confidence=0.0,
+                    category="N/A",
+                    risk_level="No determinado",
+                    explanation=[],
+                    error=f"No se encontró el prestatario {borrower_id}",
+                    input_features=None
+                )
+            
+            result = await score_service.predict_score_async(FeatureRecord.from_mapping(features))
+            await score_history.record(
+                result, "predict_score_for_borrower", borrower_id=borrower_id, model_version=score_service.model_version
             )
+            return build_prediction_result(result)
+        except ScoringOverloadedError as e:
+            logger.warning(f"Predicción rechazada: {str(e)}")
+            return overloaded_result(e)
+        except Exception as e:
+            logger.error(f"Error al predecir score del prestatario {borrower_id}: {str(e)}")
+            return error_result(e)
+        finally:
+            RESOLVE_PREDICT_SCORE_FOR_BORROWER.observe(time.perf_counter() - started)
 
 
 # Evento de inicio de la aplicación
 @app.on_event("startup")
 async def startup_db_clients():
+    global event_consumer
+    # Cargar el modelo en segundo plano; /health/ready indica cuándo terminó
+    if settings.SCORE_MODEL_PRELOAD:
+        asyncio.create_task(score_service.load_in_background())
+    
     try:
-        # Inicializar PostgreSQL
-        init_postgres_models()
+        # Inicializar PostgreSQL (desde la instantánea del esquema si existe)
+        init_postgres_models(check_fingerprint=False)
         
         # Inicializar MongoDB (con await)
         await init_mongodb()
@@ -232,16 +399,40 @@ async def startup_db_clients():
             asyncio.create_task(sync_all_data())
         else:
             logger.info("Sincronización inicial deshabilitada")
+
+        # Historial de predicciones
+        if settings.SCORE_HISTORY_ENABLED:
+            await score_history.start(get_mongo_db())
+
+        # Consumir los eventos de RabbitMQ para mantener el espejo actualizado
+        if settings.ENABLE_EVENT_CONSUMER:
+            event_consumer = RabbitMQEventConsumer(get_mongo_db())
+            await event_consumer.start()
     except Exception as e:
         logger.error(f"Error al inicializar servicios: {str(e)}")
 
+# Evento de cierre de la aplicación
+@app.on_event("shutdown")
+async def shutdown_background_writers():
+    # Aplicar y confirmar los eventos pendientes antes de cerrar
+    if event_consumer is not None:
+        await event_consumer.stop()
+    # Escribir las predicciones que quedan en el búfer del historial
+    await score_history.stop()
+    # Liberar los hilos / procesos de scoring
+    score_service.executor.shutdown()
+
 # Crear schema de GraphQL incluyendo Query y Mutation
-schema = strawberry.Schema(query=Query, mutation=Mutation)
-graphql_app = GraphQLRouter(schema)
+# (los documentos parseados y validados se reutilizan desde document_cache)
+schema = strawberry.Schema(query=Query, mutation=Mutation, extensions=[CachedDocumentExtension])
+graphql_app = PersistedQueryRouter(schema)
 
 # Agregar GraphQL a la aplicación
 app.include_router(graphql_app, prefix="/graphql")
 
+# Endpoints REST de scoring (/score y /score/batch) para llamadas internas
+app.include_router(build_score_router(score_service, score_history))
+
 # Iniciar aplicación con Uvicorn si se ejecuta directamente
 if __name__ == "__main__":
     uvicorn.run(
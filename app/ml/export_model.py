@@ -0,0 +1,105 @@
+"""
+Exporta el modelo Keras y el scaler a un artefacto NumPy (.npz) liviano.
+
+Uso:
+    python -m app.ml.export_model [--model-dir app/ml/models/borrower]
+
+Requiere TensorFlow solo al momento de exportar; en ejecución el servicio
+carga el .npz con app.ml.services.numpy_runtime.
+"""
+import argparse
+import json
+import logging
+from pathlib import Path
+import numpy as np
+from app.ml.services.numpy_runtime import file_sha256
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_DIR = Path(__file__).parent / "models" / "borrower"
+MODEL_FILENAME = "modelo_scoring_crediticio.h5"
+SCALER_FILENAME = "scaler_scoring_crediticio.pkl"
+FEATURES_FILENAME = "features_scoring_crediticio.json"
+EXPORT_FILENAME = "modelo_scoring_crediticio.npz"
+
+def extract_dense_layers(model):
+    """
+    Convierte las capas del modelo en una lista de (kernel, bias, activación).
+
+    Las BatchNormalization (en inferencia son una transformación afín por columna)
+    se pliegan dentro de la capa densa siguiente y los Dropout se omiten.
+    """
+    layers = []
+    pending_scale = None
+    pending_shift = None
+
+    for layer in model.layers:
+        kind = layer.__class__.__name__
+        if kind in ("InputLayer", "Dropout"):
+            continue
+
+        if kind == "BatchNormalization":
+            gamma, beta, moving_mean, moving_variance = layer.get_weights()
+            scale = gamma / np.sqrt(moving_variance + layer.epsilon)
+            shift = beta - moving_mean * scale
+            # Si ya había una normalización pendiente, se componen
+            if pending_scale is not None:
+                shift = pending_shift * scale + shift
+                scale = pending_scale * scale
+            pending_scale, pending_shift = scale, shift
+            continue
+
+        if kind != "Dense":
+            raise ValueError(f"Capa no soportada para exportar: {kind} ({layer.name})")
+
+        kernel, bias = layer.get_weights()
+        if pending_scale is not None:
+            # (x * s + t) @ W + b == x @ (s[:, None] * W) + (t @ W + b)
+            bias = pending_shift @ kernel + bias
+            kernel = pending_scale[:, None] * kernel
+            pending_scale = pending_shift = None
+
+        layers.append((kernel.astype(np.float32), bias.astype(np.float32), layer.get_config()["activation"]))
+
+    if pending_scale is not None:
+        raise ValueError("El modelo termina en BatchNormalization; no se puede plegar")
+    return layers
+
+def export_model(model_dir=DEFAULT_MODEL_DIR, output_path=None):
+    """Genera el artefacto .npz a partir del modelo .h5, el scaler y la lista de características"""
+    import joblib
+    import tensorflow as tf
+
+    model_dir = Path(model_dir)
+    model_path = model_dir / MODEL_FILENAME
+    output_path = Path(output_path) if output_path else model_dir / EXPORT_FILENAME
+
+    model = tf.keras.models.load_model(model_path, compile=False)
+    scaler = joblib.load(model_dir / SCALER_FILENAME)
+    with open(model_dir / FEATURES_FILENAME) as f:
+        features = json.load(f)
+
+    layers = extract_dense_layers(model)
+    arrays = {
+        "features": np.array(features),
+        "scaler_scale": np.asarray(scaler.scale_, dtype=np.float32),
+        "scaler_min": np.asarray(scaler.min_, dtype=np.float32),
+        "activations": np.array([activation for _, _, activation in layers]),
+        "source_sha256": np.array(file_sha256(model_path)),
+    }
+    for i, (kernel, bias, _) in enumerate(layers):
+        arrays[f"kernel_{i}"] = kernel
+        arrays[f"bias_{i}"] = bias
+
+    np.savez(output_path, **arrays)
+    logger.info(f"Modelo exportado a {output_path} ({len(layers)} capas densas)")
+    return output_path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta el modelo de scoring a un artefacto NumPy")
+    parser.add_argument("--model-dir", default=str(DEFAULT_MODEL_DIR), help="Directorio con el modelo .h5 y el scaler")
+    parser.add_argument("--output", default=None, help="Ruta del artefacto .npz de salida")
+    args = parser.parse_args()
+    export_model(args.model_dir, args.output)
@@ -0,0 +1,291 @@
+"""
+Recalcula el score de todos los prestatarios y lo guarda en la colección `scores`.
+
+Recorre los prestatarios (colección `user`) en bloques grandes junto con sus
+características materializadas (borrower_features), las convierte en columnas
+NumPy, las puntúa con la ruta vectorizada (predict_scores_batch) y escribe los
+resultados con upserts en bloque. Los prestatarios sin documento materializado se
+calculan con la agregación del feature store; los que tienen características
+incompletas no se puntúan y se informan. El rango de borrower_id se reparte entre
+un pool de procesos y cada rango guarda su avance, de modo que una ejecución
+interrumpida puede reanudarse.
+
+Uso:
+    python -m app.ml.jobs.rescore [--workers 4] [--chunk-size 20000] [--mode model]
+    python -m app.ml.jobs.rescore --resume [--run-id RUN_ID]
+"""
+import argparse
+import datetime
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from pymongo import MongoClient, UpdateOne
+from app.config.settings import settings
+from app.db.indexes import SYNC_INDEXES
+from app.ml.services.feature_store import FEATURES_COLLECTION, borrower_features_pipeline
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Colección con el último score de cada prestatario
+SCORES_COLLECTION = "scores"
+
+# Colección con el estado y los puntos de control de cada ejecución
+RUNS_COLLECTION = "rescore_runs"
+
+# Rangos por proceso: más rangos que procesos reparte mejor la carga
+RANGES_PER_WORKER = 4
+
+# Máximo de borrower_id con características incompletas que se guardan por rango
+REPORTED_IDS_LIMIT = 100
+
+def get_mongo_database():
+    """Cliente síncrono de MongoDB (uno por proceso)"""
+    return MongoClient(settings.MONGO_URI)[settings.MONGO_DB]
+
+def split_borrower_ranges(mongo_db, parts):
+    """Divide el rango de id de los prestatarios (colección `user`) en hasta `parts` rangos [low, high)"""
+    collection = mongo_db.user
+    first = collection.find_one({}, {"id": 1}, sort=[("id", 1)])
+    last = collection.find_one({}, {"id": 1}, sort=[("id", -1)])
+    if first is None:
+        return []
+    low, high = first["id"], last["id"]
+    step = max(1, -(-(high - low + 1) // parts))
+    return [[start, min(start + step, high + 1)] for start in range(low, high + 1, step)]
+
+def split_incomplete(documents, feature_names):
+    """Separa los documentos con todas las características de los que tienen alguna ausente o nula"""
+    complete, incomplete = [], []
+    for document in documents:
+        if all(document.get(name) is not None for name in feature_names):
+            complete.append(document)
+        else:
+            incomplete.append(document)
+    return complete, incomplete
+
+def features_to_columns(documents, feature_names):
+    """Convierte los documentos de características (completos) en una matriz (N, 11) armada por columnas"""
+    count = len(documents)
+    columns = [
+        np.fromiter((document[name] for document in documents), dtype=np.float64, count=count)
+        for name in feature_names
+    ]
+    return np.column_stack(columns)
+
+class MaterializedFeatures:
+    """
+    Documentos de borrower_features de un rango, leídos con un solo cursor en orden de
+    borrower_id a medida que avanzan los bloques de prestatarios (leídos en el mismo orden)
+    """
+
+    def __init__(self, collection, start, high, projection, batch_size):
+        self._cursor = collection.find(
+            {"borrower_id": {"$gte": start, "$lt": high}},
+            projection,
+            sort=[("borrower_id", 1)],
+            batch_size=batch_size,
+        )
+        self._ahead = None
+
+    def read_until(self, last_id):
+        """Documentos (por borrower_id) hasta `last_id` inclusive que todavía no se leyeron"""
+        current = {}
+        while True:
+            document, self._ahead = self._ahead, None
+            if document is None:
+                document = next(self._cursor, None)
+                if document is None:
+                    return current
+            if document["borrower_id"] > last_id:
+                self._ahead = document
+                return current
+            current[document["borrower_id"]] = document
+
+# Estado de cada proceso del pool (se crea una vez por proceso en _init_worker)
+_worker = {}
+
+def _init_worker(mode):
+    from app.ml.services.score_service import ScorePredictionService
+
+    _worker["mongo_db"] = get_mongo_database()
+    _worker["service"] = ScorePredictionService(mode=mode)
+    _worker["service"].ensure_loaded()
+
+def score_range(run_id, low, high, chunk_size):
+    """
+    Puntúa los prestatarios con id en [low, high) desde su último punto de control.
+    Devuelve (filas puntuadas, segundos)
+    """
+    mongo_db = _worker["mongo_db"]
+    service = _worker["service"]
+    feature_names = service.selected_features
+    checkpoint_id = f"{run_id}:{low}"
+    runs = mongo_db[RUNS_COLLECTION]
+
+    checkpoint = runs.find_one({"_id": checkpoint_id}) or {}
+    if checkpoint.get("done"):
+        return 0, 0.0
+    start = checkpoint.get("last_borrower_id", low - 1) + 1
+
+    started = time.perf_counter()
+    rows = 0
+    users = mongo_db.user.find(
+        {"id": {"$gte": start, "$lt": high}},
+        {"_id": 0, "id": 1},
+        sort=[("id", 1)],
+        batch_size=chunk_size,
+    )
+    features = MaterializedFeatures(
+        mongo_db[FEATURES_COLLECTION], start, high,
+        {"_id": 0, "borrower_id": 1, **{name: 1 for name in feature_names}},
+        chunk_size,
+    )
+    borrower_ids = []
+    for user in users:
+        borrower_ids.append(user["id"])
+        if len(borrower_ids) == chunk_size:
+            rows += _score_chunk(mongo_db, service, run_id, checkpoint_id, borrower_ids, features)
+            borrower_ids = []
+    if borrower_ids:
+        rows += _score_chunk(mongo_db, service, run_id, checkpoint_id, borrower_ids, features)
+
+    runs.update_one({"_id": checkpoint_id}, {"$set": {"run_id": run_id, "done": True}}, upsert=True)
+    return rows, time.perf_counter() - started
+
+def _score_chunk(mongo_db, service, run_id, checkpoint_id, borrower_ids, features):
+    """Puntúa un bloque de prestatarios, guarda los scores y avanza el punto de control"""
+    feature_names = service.selected_features
+    materialized = features.read_until(borrower_ids[-1])
+    documents = [materialized[borrower_id] for borrower_id in borrower_ids if borrower_id in materialized]
+
+    # Prestatarios sin características materializadas: se calculan con la agregación
+    missing = [borrower_id for borrower_id in borrower_ids if borrower_id not in materialized]
+    if missing:
+        documents.extend(mongo_db.user.aggregate(borrower_features_pipeline({"id": {"$in": missing}})))
+
+    documents, incomplete = split_incomplete(documents, feature_names)
+    incomplete_ids = [document["borrower_id"] for document in incomplete]
+    if incomplete_ids:
+        logger.warning(
+            f"{len(incomplete_ids)} prestatarios con características incompletas no se puntuaron "
+            f"(por ejemplo {incomplete_ids[:5]})"
+        )
+
+    if documents:
+        features_matrix = features_to_columns(documents, feature_names)
+        batch = service.predict_scores_batch(features_matrix)
+        scored_at = datetime.datetime.utcnow()
+
+        operations = [
+            UpdateOne(
+                {"borrower_id": document["borrower_id"]},
+                {"$set": {
+                    "score": float(score),
+                    "category": category,
+                    "risk_level": risk_level,
+                    "explanation_flags": int(flags),
+                    "model_version": service.model_version,
+                    "is_simulated": service.mock_mode,
+                    "run_id": run_id,
+                    "scored_at": scored_at,
+                }},
+                upsert=True,
+            )
+            for document, score, category, risk_level, flags in zip(
+                documents, batch["scores"], batch["categories"], batch["risk_levels"], batch["explanation_flags"]
+            )
+        ]
+        mongo_db[SCORES_COLLECTION].bulk_write(operations, ordered=False)
+
+    update = {
+        "$set": {"run_id": run_id, "last_borrower_id": borrower_ids[-1]},
+        "$inc": {"rows": len(documents), "computed": len(missing), "incomplete": len(incomplete_ids)},
+    }
+    if incomplete_ids:
+        update["$push"] = {"incomplete_ids": {"$each": incomplete_ids, "$slice": REPORTED_IDS_LIMIT}}
+    mongo_db[RUNS_COLLECTION].update_one({"_id": checkpoint_id}, update, upsert=True)
+    return len(documents)
+
+def find_run(mongo_db, run_id=None):
+    """Ejecución a reanudar: la indicada o la última sin terminar"""
+    runs = mongo_db[RUNS_COLLECTION]
+    if run_id:
+        return runs.find_one({"_id": run_id, "ranges": {"$exists": True}})
+    return runs.find_one({"ranges": {"$exists": True}, "finished_at": None}, sort=[("started_at", -1)])
+
+def rescore_all(workers=None, chunk_size=20000, mode=None, resume=False, run_id=None):
+    """Ejecuta (o reanuda) el recálculo completo y devuelve un resumen con filas/s"""
+    workers = workers or os.cpu_count() or 1
+    mode = mode or settings.SCORE_MODEL_MODE
+    mongo_db = get_mongo_database()
+    mongo_db[SCORES_COLLECTION].create_indexes(SYNC_INDEXES[SCORES_COLLECTION])
+
+    run = find_run(mongo_db, run_id) if resume else None
+    if resume and run is None:
+        logger.warning("No hay una ejecución para reanudar; se inicia una nueva")
+    if run is None:
+        run = {
+            "_id": run_id or datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%S"),
+            "ranges": split_borrower_ranges(mongo_db, workers * RANGES_PER_WORKER),
+            "mode": mode,
+            "started_at": datetime.datetime.utcnow(),
+            "finished_at": None,
+        }
+        mongo_db[RUNS_COLLECTION].insert_one(run)
+    logger.info(f"Ejecución {run['_id']}: {len(run['ranges'])} rangos en {workers} procesos")
+
+    started = time.perf_counter()
+    rows = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(run["mode"],)) as pool:
+        futures = [pool.submit(score_range, run["_id"], low, high, chunk_size) for low, high in run["ranges"]]
+        for future in as_completed(futures):
+            range_rows, _ = future.result()
+            rows += range_rows
+            elapsed = time.perf_counter() - started
+            logger.info(f"{rows} prestatarios puntuados ({rows / elapsed:,.0f} filas/s)")
+
+    elapsed = time.perf_counter() - started
+    # Totales de toda la ejecución (incluidos los rangos puntuados antes de reanudar)
+    totals = {"computed": 0, "incomplete": 0, "incomplete_ids": []}
+    for checkpoint in mongo_db[RUNS_COLLECTION].find({"run_id": run["_id"]}):
+        totals["computed"] += checkpoint.get("computed", 0)
+        totals["incomplete"] += checkpoint.get("incomplete", 0)
+        totals["incomplete_ids"].extend(checkpoint.get("incomplete_ids", []))
+    totals["incomplete_ids"] = sorted(totals["incomplete_ids"])[:REPORTED_IDS_LIMIT]
+    mongo_db[RUNS_COLLECTION].update_one(
+        {"_id": run["_id"]},
+        {"$set": {"finished_at": datetime.datetime.utcnow(), "seconds": round(elapsed, 3), **totals}},
+    )
+    summary = {
+        "run_id": run["_id"],
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": rows / elapsed if elapsed else 0.0,
+        **totals,
+    }
+    logger.info(
+        f"Recálculo {run['_id']} completado: {rows} prestatarios en {elapsed:.1f}s "
+        f"({summary['rows_per_second']:,.0f} filas/s)"
+    )
+    if totals["computed"]:
+        logger.info(f"{totals['computed']} prestatarios sin características materializadas se calcularon al vuelo")
+    if totals["incomplete"]:
+        logger.warning(
+            f"{totals['incomplete']} prestatarios con características incompletas quedaron sin puntuar "
+            f"(ver incomplete_ids en {RUNS_COLLECTION})"
+        )
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcula el score de todos los prestatarios")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos del pool (por defecto, uno por CPU)")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="Prestatarios por bloque")
+    parser.add_argument("--mode", choices=["synthetic", "model"], default=None, help="Modo del servicio de scoring")
+    parser.add_argument("--resume", action="store_true", help="Reanudar la última ejecución sin terminar (o --run-id)")
+    parser.add_argument("--run-id", default=None, help="Identificador de la ejecución")
+    args = parser.parse_args()
+    rescore_all(args.workers, args.chunk_size, args.mode, args.resume, args.run_id)
@@ -30,6 +30,21 @@ class ScorePredictionInput:
     loans_al_dia_ratio: float
     days_late_per_loan: float
 
+@strawberry.input
+class ScoreBatchColumnsInput:
+    """Entrada columnar: una lista por característica, todas de la misma longitud"""
+    adress_verified: list[int]
+    identity_verified: list[int]
+    loan_count: list[int]
+    late_payment_count: list[int]
+    avg_days_late: list[float]
+    total_penalty: list[float]
+    payment_completion_ratio: list[float]
+    has_no_late_payments: list[int]
+    has_penalty: list[int]
+    loans_al_dia_ratio: list[float]
+    days_late_per_loan: list[float]
+
 @strawberry.type
 class ScorePredictionResult:
     score: float
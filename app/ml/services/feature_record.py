@@ -0,0 +1,115 @@
+class FeatureRecord:
+    """
+    Características de un solicitante con disposición fija (__slots__), en el orden
+    de ScorePredictionService.selected_features.
+
+    Reemplaza a los diccionarios copiados en cada predicción: se crea una vez a partir
+    de la entrada y se comparte entre el cálculo, la explicación y el resultado. Ofrece
+    get()/items() para usarse donde antes se esperaba un diccionario.
+    """
+
+    __slots__ = (
+        "adress_verified",
+        "identity_verified",
+        "loan_count",
+        "late_payment_count",
+        "avg_days_late",
+        "total_penalty",
+        "payment_completion_ratio",
+        "has_no_late_payments",
+        "has_penalty",
+        "loans_al_dia_ratio",
+        "days_late_per_loan",
+    )
+
+    def __init__(
+        self,
+        adress_verified=0,
+        identity_verified=0,
+        loan_count=0,
+        late_payment_count=0,
+        avg_days_late=0,
+        total_penalty=0,
+        payment_completion_ratio=0,
+        has_no_late_payments=0,
+        has_penalty=0,
+        loans_al_dia_ratio=0,
+        days_late_per_loan=0,
+    ):
+        self.adress_verified = adress_verified
+        self.identity_verified = identity_verified
+        self.loan_count = loan_count
+        self.late_payment_count = late_payment_count
+        self.avg_days_late = avg_days_late
+        self.total_penalty = total_penalty
+        self.payment_completion_ratio = payment_completion_ratio
+        self.has_no_late_payments = has_no_late_payments
+        self.has_penalty = has_penalty
+        self.loans_al_dia_ratio = loans_al_dia_ratio
+        self.days_late_per_loan = days_late_per_loan
+
+    @classmethod
+    def from_mapping(cls, data):
+        """Crea el registro desde un diccionario; las características ausentes valen 0"""
+        if isinstance(data, cls):
+            return data
+        get = data.get
+        return cls(
+            get("adress_verified", 0),
+            get("identity_verified", 0),
+            get("loan_count", 0),
+            get("late_payment_count", 0),
+            get("avg_days_late", 0),
+            get("total_penalty", 0),
+            get("payment_completion_ratio", 0),
+            get("has_no_late_payments", 0),
+            get("has_penalty", 0),
+            get("loans_al_dia_ratio", 0),
+            get("days_late_per_loan", 0),
+        )
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    def items(self):
+        return ((name, getattr(self, name)) for name in self.__slots__)
+
+    def as_row(self):
+        """Valores en el orden de las columnas del modelo"""
+        return (
+            self.adress_verified,
+            self.identity_verified,
+            self.loan_count,
+            self.late_payment_count,
+            self.avg_days_late,
+            self.total_penalty,
+            self.payment_completion_ratio,
+            self.has_no_late_payments,
+            self.has_penalty,
+            self.loans_al_dia_ratio,
+            self.days_late_per_loan,
+        )
+
+    def as_dict(self):
+        """Diccionario con las características (para el historial y las respuestas)"""
+        return {
+            "adress_verified": self.adress_verified,
+            "identity_verified": self.identity_verified,
+            "loan_count": self.loan_count,
+            "late_payment_count": self.late_payment_count,
+            "avg_days_late": self.avg_days_late,
+            "total_penalty": self.total_penalty,
+            "payment_completion_ratio": self.payment_completion_ratio,
+            "has_no_late_payments": self.has_no_late_payments,
+            "has_penalty": self.has_penalty,
+            "loans_al_dia_ratio": self.loans_al_dia_ratio,
+            "days_late_per_loan": self.days_late_per_loan,
+        }
+
+    def __eq__(self, other):
+        if not isinstance(other, FeatureRecord):
+            return NotImplemented
+        return self.as_row() == other.as_row()
+
+    def __repr__(self):
+        return f"FeatureRecord({', '.join(f'{name}={value!r}' for name, value in self.items())})"
@@ -0,0 +1,234 @@
+import logging
+from app.config.database import get_mongo_db
+from app.config.settings import settings
+from app.db.indexes import ensure_indexes
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Estados de cuota que cuentan como pagadas para payment_completion_ratio
+PAID_PAYMENT_STATUSES = ["pagado", "completado"]
+
+# Estado de préstamo que cuenta para loans_al_dia_ratio
+LOAN_STATUS_AL_DIA = "al_dia"
+
+# Valores de una bandera que cuentan como falsos, igual que bool() en Python (un campo
+# faltante cuenta como None); 1, "true" o True cuentan como verdaderos
+FALSY_FLAG_VALUES = [False, None, 0, ""]
+
+# Colección con las características materializadas por prestatario
+FEATURES_COLLECTION = "borrower_features"
+
+# Cada tabla apunta a su padre en la cadena user ← solicitude ← offer ← loan ← monthly_payment
+PARENT_LINKS = {
+    "monthly_payment": ("id_loan", "loan"),
+    "loan": ("id_offer", "offer"),
+    "offer": ("id_solicitude", "solicitude"),
+    "solicitude": ("borrower_id", "user"),
+}
+
+# Campos que hay que conservar de un registro modificado para ubicar a su prestatario
+BORROWER_LINK_FIELDS = {"user": "id", **{table: link for table, (link, _) in PARENT_LINKS.items()}}
+
+# Tamaño máximo de las listas $in al refrescar prestatarios
+REFRESH_BATCH_SIZE = 1000
+
+def _safe_ratio(numerator, denominator):
+    """Expresión de agregación numerator / denominator, o 0 si el denominador es 0"""
+    return {"$cond": [{"$gt": [denominator, 0]}, {"$divide": [numerator, denominator]}, 0]}
+
+def _as_flag(condition):
+    """Expresión de agregación que vale 1 si se cumple la condición y 0 si no"""
+    return {"$cond": [condition, 1, 0]}
+
+def _truthy(field):
+    """Expresión de agregación verdadera si el campo es verdadero para Python"""
+    return {"$not": [{"$in": [{"$ifNull": [field, None]}, FALSY_FLAG_VALUES]}]}
+
+def borrower_features_pipeline(match):
+    """
+    Pipeline de agregación que calcula las 11 características de scoring por prestatario.
+
+    Parte de la colección `user` (filtrada por `match`) y recorre la cadena
+    user → solicitude → offer → loan → monthly_payment con $lookup anidados,
+    de modo que los joins se resuelven dentro de MongoDB en una sola consulta.
+    Definiciones:
+      - late_payment_count: cuotas con days_late > 0
+      - avg_days_late: promedio de days_late de las cuotas atrasadas
+      - payment_completion_ratio: cuotas pagadas / cuotas totales
+      - loans_al_dia_ratio: préstamos "al_dia" / préstamos totales
+      - days_late_per_loan: suma de days_late / préstamos totales
+      - adress_verified / identity_verified: 1 si el valor es verdadero (True, 1, "true")
+    """
+    return [
+        {"$match": match},
+        {"$lookup": {
+            "from": "solicitude",
+            "localField": "id",
+            "foreignField": "borrower_id",
+            "as": "loans",
+            "pipeline": [
+                {"$lookup": {
+                    "from": "offer",
+                    "localField": "id",
+                    "foreignField": "id_solicitude",
+                    "as": "offers",
+                    "pipeline": [
+                        {"$lookup": {
+                            "from": "loan",
+                            "localField": "id",
+                            "foreignField": "id_offer",
+                            "as": "loans",
+                            "pipeline": [
+                                {"$lookup": {
+                                    "from": "monthly_payment",
+                                    "localField": "id",
+                                    "foreignField": "id_loan",
+                                    "as": "payments",
+                                    "pipeline": [
+                                        {"$project": {"_id": 0, "days_late": 1, "penalty_amount": 1, "payment_status": 1}},
+                                    ],
+                                }},
+                                {"$project": {"_id": 0, "current_status": 1, "payments": 1}},
+                            ],
+                        }},
+                        {"$project": {"_id": 0, "loans": 1}},
+                    ],
+                }},
+                {"$unwind": "$offers"},
+                {"$unwind": "$offers.loans"},
+                {"$replaceRoot": {"newRoot": "$offers.loans"}},
+            ],
+        }},
+        # Aplanar las cuotas de todos los préstamos
+        {"$addFields": {
+            "payments": {"$reduce": {
+                "input": "$loans.payments",
+                "initialValue": [],
+                "in": {"$concatArrays": ["$$value", "$$this"]},
+            }},
+        }},
+        {"$addFields": {
+            "loan_count": {"$size": "$loans"},
+            "payment_count": {"$size": "$payments"},
+            "late_payments": {"$filter": {"input": "$payments", "cond": {"$gt": ["$$this.days_late", 0]}}},
+            "paid_payment_count": {"$size": {"$filter": {
+                "input": "$payments",
+                "cond": {"$in": ["$$this.payment_status", PAID_PAYMENT_STATUSES]},
+            }}},
+            "loans_al_dia": {"$size": {"$filter": {
+                "input": "$loans",
+                "cond": {"$eq": ["$$this.current_status", LOAN_STATUS_AL_DIA]},
+            }}},
+            # $toDouble admite montos guardados como float o Decimal128
+            "total_days_late": {"$toDouble": {"$sum": "$payments.days_late"}},
+            "total_penalty": {"$toDouble": {"$sum": "$payments.penalty_amount"}},
+        }},
+        {"$addFields": {"late_payment_count": {"$size": "$late_payments"}}},
+        {"$project": {
+            "_id": 0,
+            "borrower_id": "$id",
+            "adress_verified": _as_flag(_truthy("$adress_verified")),
+            "identity_verified": _as_flag(_truthy("$identity_verified")),
+            "loan_count": 1,
+            "late_payment_count": 1,
+            "avg_days_late": _safe_ratio({"$toDouble": {"$sum": "$late_payments.days_late"}}, "$late_payment_count"),
+            "total_penalty": 1,
+            "payment_completion_ratio": _safe_ratio("$paid_payment_count", "$payment_count"),
+            "has_no_late_payments": _as_flag({"$eq": ["$late_payment_count", 0]}),
+            "has_penalty": _as_flag({"$gt": ["$total_penalty", 0]}),
+            "loans_al_dia_ratio": _safe_ratio("$loans_al_dia", "$loan_count"),
+            "days_late_per_loan": _safe_ratio("$total_days_late", "$loan_count"),
+        }},
+    ]
+
+async def resolve_borrower_ids(mongo_db, table_name, records):
+    """
+    Devuelve los ids de los prestatarios afectados por registros modificados de una tabla,
+    subiendo por la cadena monthly_payment → loan → offer → solicitude → user
+    """
+    link_field = BORROWER_LINK_FIELDS[table_name]
+    ids = {record.get(link_field) for record in records} - {None}
+    while table_name != "user" and ids:
+        _, parent_table = PARENT_LINKS[table_name]
+        table_name = parent_table
+        if table_name == "user":
+            break
+        parent_link, _ = PARENT_LINKS[table_name]
+        cursor = mongo_db[table_name].find({"id": {"$in": list(ids)}}, {parent_link: 1, "_id": 0})
+        ids = {doc.get(parent_link) async for doc in cursor} - {None}
+    return ids
+
+async def previous_borrower_links(mongo_db, table_name, records, pk_column="id"):
+    """
+    Documentos guardados (solo el campo que los vincula con su padre) de los registros
+    indicados, leídos antes de reemplazarlos o eliminarlos: si un registro cambió de
+    padre, el prestatario anterior también tiene que recalcularse
+    """
+    link_field = BORROWER_LINK_FIELDS[table_name]
+    ids = [record.get(pk_column) for record in records]
+    cursor = mongo_db[table_name].find({pk_column: {"$in": ids}}, {link_field: 1, "_id": 0})
+    return [doc async for doc in cursor]
+
+async def refresh_borrower_features(mongo_db, borrower_ids=None):
+    """
+    Recalcula y guarda en `borrower_features` las características de los prestatarios
+    indicados (todos si `borrower_ids` es None), con $merge dentro de MongoDB
+    """
+    collection = mongo_db[FEATURES_COLLECTION]
+    # $merge requiere un índice único sobre el campo de unión
+    await ensure_indexes(mongo_db, [FEATURES_COLLECTION])
+    merge_stages = [
+        {"$addFields": {"updated_at": "$$NOW"}},
+        {"$merge": {"into": FEATURES_COLLECTION, "on": "borrower_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+
+    if borrower_ids is None:
+        await mongo_db.user.aggregate(borrower_features_pipeline({}) + merge_stages).to_list(length=None)
+        existing = set(await mongo_db.user.distinct("id"))
+        stale = set(await collection.distinct("borrower_id")) - existing
+        if stale:
+            await collection.delete_many({"borrower_id": {"$in": list(stale)}})
+        logger.info("Características de todos los prestatarios recalculadas")
+        return
+
+    borrower_ids = list(borrower_ids)
+    for start in range(0, len(borrower_ids), REFRESH_BATCH_SIZE):
+        batch = borrower_ids[start:start + REFRESH_BATCH_SIZE]
+        pipeline = borrower_features_pipeline({"id": {"$in": batch}}) + merge_stages
+        await mongo_db.user.aggregate(pipeline).to_list(length=None)
+
+        # Prestatarios eliminados: quitar sus características materializadas
+        existing = {doc["id"] async for doc in mongo_db.user.find({"id": {"$in": batch}}, {"id": 1, "_id": 0})}
+        removed = set(batch) - existing
+        if removed:
+            await collection.delete_many({"borrower_id": {"$in": list(removed)}})
+
+    logger.info(f"Características recalculadas para {len(borrower_ids)} prestatarios")
+
+class BorrowerFeatureStore:
+    """Obtiene las características de scoring de un prestatario desde los datos sincronizados"""
+
+    def __init__(self, mongo_db=None):
+        self._mongo_db = mongo_db
+
+    @property
+    def mongo_db(self):
+        return self._mongo_db if self._mongo_db is not None else get_mongo_db()
+
+    async def get_features(self, borrower_id):
+        """
+        Devuelve las características de un prestatario; None si no existe.
+        Lee primero la colección materializada y, si no está ahí, las calcula
+        """
+        if settings.FEATURE_STORE_MATERIALIZED:
+            document = await self.mongo_db[FEATURES_COLLECTION].find_one({"borrower_id": borrower_id}, {"_id": 0})
+            if document is not None:
+                return document
+
+        cursor = self.mongo_db.user.aggregate(borrower_features_pipeline({"id": borrower_id}))
+        documents = await cursor.to_list(length=1)
+        if not documents:
+            logger.warning(f"No se encontró el prestatario {borrower_id}")
+            return None
+        return documents[0]
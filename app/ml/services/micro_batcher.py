@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import numpy as np
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """
+    Agrupa solicitudes concurrentes en un único lote para hacer una sola pasada del modelo.
+
+    Cada llamada a `submit` encola una fila de características y espera su resultado.
+    Un worker en segundo plano junta filas hasta llenar `max_batch_size` o hasta que
+    pasen `max_wait_ms` desde la primera fila del lote, y entonces ejecuta
+    `process_batch(matriz)`, que debe devolver un resultado por fila (si no, fallan
+    todas las solicitudes del lote). Si
+    `process_batch` es una corrutina se espera directamente; si no, se ejecuta
+    en el executor por defecto del event loop.
+    """
+
+    def __init__(self, process_batch, max_batch_size=64, max_wait_ms=5.0):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None
+        self._worker = None
+
+    async def submit(self, row):
+        """Encola una fila y espera el resultado de su lote"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return await future
+
+    def _ensure_worker(self):
+        """Arranca el worker en el event loop actual la primera vez que se usa"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def _collect_batch(self):
+        """Espera la primera fila y junta las siguientes hasta el tamaño o tiempo máximo"""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            rows = [row for row, _ in batch]
+            futures = [future for _, future in batch]
+
+            try:
+                # La pasada del modelo es CPU; se ejecuta fuera del event loop
+                if asyncio.iscoroutinefunction(self.process_batch):
+                    results = await self.process_batch(np.stack(rows))
+                else:
+                    results = await loop.run_in_executor(None, self.process_batch, np.stack(rows))
+                if len(results) != len(rows):
+                    # Sin un resultado por fila no se puede saber a quién corresponde cada uno
+                    raise ValueError(f"process_batch devolvió {len(results)} resultados para {len(rows)} filas")
+            except Exception as e:
+                logger.error(f"Error procesando lote de {len(rows)} filas: {str(e)}")
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for future, result in zip(futures, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def close(self):
+        """Detiene el worker en segundo plano"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
@@ -0,0 +1,61 @@
+import hashlib
+import numpy as np
+
+# Activaciones soportadas por el runtime
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "sigmoid": lambda x: 1 / (1 + np.exp(-x)),
+    "tanh": np.tanh,
+}
+
+def file_sha256(path):
+    """Calcula el hash SHA-256 de un archivo"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class NumpyScoringModel:
+    """
+    Runtime de inferencia en NumPy puro para el modelo de scoring exportado.
+
+    El artefacto (.npz) contiene el scaler MinMax y una secuencia de capas densas
+    (con las BatchNormalization ya plegadas), de modo que la inferencia es solo
+    una serie de productos matriciales y no requiere TensorFlow.
+    """
+
+    def __init__(self, layers, scaler_scale, scaler_min, features, source_sha256=None):
+        self.layers = layers
+        self.scaler_scale = scaler_scale
+        self.scaler_min = scaler_min
+        self.features = features
+        self.source_sha256 = source_sha256
+
+    @classmethod
+    def load(cls, path):
+        """Carga un artefacto generado por app.ml.export_model"""
+        with np.load(path, allow_pickle=False) as data:
+            activations = [str(name) for name in data["activations"]]
+            layers = [
+                (data[f"kernel_{i}"], data[f"bias_{i}"], ACTIVATIONS[activation])
+                for i, activation in enumerate(activations)
+            ]
+            return cls(
+                layers=layers,
+                scaler_scale=data["scaler_scale"],
+                scaler_min=data["scaler_min"],
+                features=[str(name) for name in data["features"]],
+                source_sha256=str(data["source_sha256"]) if "source_sha256" in data else None,
+            )
+
+    def predict(self, features):
+        """
+        Calcula la salida del modelo para una matriz (N, n_features) sin escalar,
+        con las columnas en el orden de `self.features`
+        """
+        x = np.asarray(features, dtype=np.float32) * self.scaler_scale + self.scaler_min
+        for kernel, bias, activation in self.layers:
+            x = activation(x @ kernel + bias)
+        return x.reshape(-1)
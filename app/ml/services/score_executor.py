@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+class ScoringOverloadedError(RuntimeError):
+    """Hay demasiadas predicciones en curso; el llamador debe reintentar más tarde"""
+
+# Servicio de scoring propio de cada proceso del pool (se crea en _init_worker)
+_worker_service = None
+
+def _init_worker(mode):
+    """Carga el modelo una vez por proceso"""
+    global _worker_service
+    from app.ml.services.score_service import ScorePredictionService
+
+    _worker_service = ScorePredictionService(mode=mode)
+    _worker_service.ensure_loaded()
+
+def _worker_predict_score(input_data):
+    return _worker_service._predict_score_uncached(input_data)
+
+def _worker_predict_rows(features):
+    return _worker_service._predict_rows(features)
+
+class ScoreExecutor:
+    """
+    Ejecuta el scoring fuera del event loop, en un pool de hilos ("thread") o de
+    procesos ("process").
+
+    Con hilos se usa el mismo servicio (y modelo) del proceso; con procesos cada worker
+    carga su propio modelo al iniciar, y el pool se recrea si cambia la versión del
+    modelo. Como mucho hay `max_pending` trabajos en curso o en espera; por encima de
+    ese límite se rechaza de inmediato con ScoringOverloadedError.
+    """
+
+    def __init__(self, service, kind="thread", workers=4, max_pending=256):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Tipo de executor desconocido: {kind}")
+        self.service = service
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self.model_version = None
+        self._pool = None
+
+    def _get_pool(self):
+        if self.kind == "process" and self._pool is not None and self.model_version != self.service.model_version:
+            # El modelo se recargó: los workers deben cargar la versión nueva
+            logger.info("Cambió la versión del modelo, se reinicia el pool de procesos de scoring")
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.service.mode,),
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scoring")
+            self.model_version = self.service.model_version
+        return self._pool
+
+    def admit(self):
+        """Reserva un lugar para un trabajo o rechaza si se alcanzó el límite"""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ScoringOverloadedError("Servicio de scoring sobrecargado, reintente más tarde")
+        self.pending += 1
+
+    def release(self):
+        self.pending -= 1
+
+    async def _run(self, thread_function, process_function, argument):
+        loop = asyncio.get_running_loop()
+        function = process_function if self.kind == "process" else thread_function
+        return await loop.run_in_executor(self._get_pool(), function, argument)
+
+    async def predict_score(self, input_data):
+        """Predicción de una fila (sin caché) en el pool"""
+        return await self._run(self.service._predict_score_uncached, _worker_predict_score, input_data)
+
+    async def predict_rows(self, features):
+        """Scores, categorías y explicaciones de una matriz (N, 11) en el pool"""
+        return await self._run(self.service._predict_rows, _worker_predict_rows, features)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def stats(self):
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+        }
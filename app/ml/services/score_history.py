@@ -0,0 +1,150 @@
+import asyncio
+import datetime
+import logging
+from app.db.indexes import ensure_indexes
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Colección con el historial de predicciones
+HISTORY_COLLECTION = "score_history"
+
+class ScoreHistoryWriter:
+    """
+    Guarda el historial de predicciones en MongoDB con escritura diferida (write-behind).
+
+    Las predicciones se encolan en memoria y una tarea de fondo las escribe con
+    insert_many cuando se juntan `batch_size` documentos o pasa `flush_interval_ms`.
+    La cola está acotada: si se llena, quien registra espera como máximo
+    `put_timeout_ms` y después el documento se descarta (y se cuenta). Al detenerse
+    se escribe todo lo pendiente.
+    """
+
+    def __init__(self, max_buffer=10000, batch_size=500, flush_interval_ms=1000, put_timeout_ms=50):
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.put_timeout = put_timeout_ms / 1000
+        self.collection = None
+        self._queue = None
+        self._task = None
+        self._inflight = None
+        self._leftover = []
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    async def start(self, mongo_db):
+        """Empieza a escribir en `mongo_db`"""
+        if self.running:
+            return
+        self.collection = mongo_db[HISTORY_COLLECTION]
+        await ensure_indexes(mongo_db, [HISTORY_COLLECTION])
+        self._queue = asyncio.Queue(maxsize=self.max_buffer)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info("Historial de predicciones habilitado")
+
+    async def stop(self):
+        """Escribe lo pendiente y detiene la tarea de fondo"""
+        if not self.running:
+            return
+        # wait_for puede absorber una cancelación que llega justo cuando termina la espera
+        # (Python < 3.12), así que se cancela hasta que la tarea termine de verdad
+        while not self._task.done():
+            self._task.cancel()
+            await asyncio.wait({self._task}, timeout=0.1)
+        self._task = None
+        if self._inflight is not None:
+            await self._inflight
+        await self._flush_pending()
+        logger.info(f"Historial de predicciones detenido ({self.written} escritas, {self.dropped} descartadas)")
+
+    def build_document(self, result, source, borrower_id=None, model_version=None):
+        """Documento de historial de una predicción"""
+        return {
+            "borrower_id": borrower_id,
+            "source": source,
+            "features": result.get("input_features"),
+            "score": result.get("score"),
+            "category": result.get("category"),
+            "risk_level": result.get("risk_level"),
+            "is_simulated": result.get("is_simulated"),
+            "model_version": model_version,
+            "created_at": datetime.datetime.utcnow(),
+        }
+
+    async def record(self, result, source, borrower_id=None, model_version=None):
+        """Encola una predicción; no espera a la escritura en MongoDB"""
+        await self.record_many([result], source, [borrower_id], model_version)
+
+    async def record_many(self, results, source, borrower_ids=None, model_version=None):
+        """Encola varias predicciones (por ejemplo, las de un lote)"""
+        if not self.running:
+            return
+        borrower_ids = borrower_ids or [None] * len(results)
+        for result, borrower_id in zip(results, borrower_ids):
+            if result.get("error"):
+                continue
+            document = self.build_document(result, source, borrower_id, model_version)
+            try:
+                self._queue.put_nowait(document)
+            except asyncio.QueueFull:
+                # Contrapresión: esperar un poco a que se libere lugar antes de descartar
+                try:
+                    await asyncio.wait_for(self._queue.put(document), timeout=self.put_timeout)
+                except asyncio.TimeoutError:
+                    self.dropped += 1
+
+    async def _run(self):
+        batch = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = asyncio.get_running_loop().time() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    timeout = deadline - asyncio.get_running_loop().time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+                    except asyncio.TimeoutError:
+                        break
+                # La escritura en curso no se interrumpe si se detiene el servicio
+                writing, batch = batch, []
+                self._inflight = asyncio.ensure_future(self._write(writing))
+                await asyncio.shield(self._inflight)
+        finally:
+            # Lo ya extraído de la cola y no escrito se guarda para el vaciado final
+            self._leftover = batch
+
+    async def _flush_pending(self):
+        batch, self._leftover = self._leftover, []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+            if len(batch) == self.batch_size:
+                await self._write(batch)
+                batch = []
+        if batch:
+            await self._write(batch)
+
+    async def _write(self, batch):
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Error al guardar {len(batch)} predicciones en el historial: {str(e)}")
+
+    def stats(self):
+        """Contadores del historial"""
+        return {
+            "running": self.running,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
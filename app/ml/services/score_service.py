@@ -1,22 +1,145 @@
 import os
+import sys
 import json
-import pickle
+import asyncio
+import bisect
+import threading
+import time
 import numpy as np
 from pathlib import Path
 import logging
 import warnings
-import tensorflow as tf
+from app.config.settings import settings
+from app.ml.services.feature_record import FeatureRecord
+from app.ml.services.micro_batcher import MicroBatcher
+from app.ml.services.score_cache import ScoreCache
+from app.ml.services.score_executor import ScoreExecutor
+from app.monitoring.metrics import SCORE_STEP_SECONDS
 
 # Configurar logging
 logger = logging.getLogger(__name__)
 
+# Directorio de artefactos del modelo de prestatarios
+MODEL_DIR = Path(__file__).parent.parent / "models" / "borrower"
+MODEL_ARTIFACTS = [
+    "modelo_scoring_crediticio.h5",
+    "modelo_scoring_crediticio.npz",
+    "scaler_scoring_crediticio.pkl",
+    "features_scoring_crediticio.json",
+]
+
+# Bits de los factores que aparecen en la explicación (mismo orden que generate_explanation)
+FACTOR_IDENTITY_VERIFIED = 1 << 0
+FACTOR_ADRESS_VERIFIED = 1 << 1
+FACTOR_NO_LATE_PAYMENTS = 1 << 2
+FACTOR_HIGH_COMPLETION = 1 << 3
+FACTOR_LATE_PAYMENTS = 1 << 4
+FACTOR_DAYS_LATE = 1 << 5
+FACTOR_PENALTIES = 1 << 6
+FACTOR_NO_HISTORY = 1 << 7
+
+# Factores cuyo texto incluye valores de la entrada
+NUMERIC_FACTORS = FACTOR_LATE_PAYMENTS | FACTOR_DAYS_LATE | FACTOR_PENALTIES
+
+# Textos de cada factor; {0}, {1} y {2} son pagos tardíos, días de retraso y penalidades
+POSITIVE_FACTOR_TEXTS = [
+    (FACTOR_IDENTITY_VERIFIED, "Identidad verificada"),
+    (FACTOR_ADRESS_VERIFIED, "Dirección verificada"),
+    (FACTOR_NO_LATE_PAYMENTS, "Sin pagos tardíos"),
+    (FACTOR_HIGH_COMPLETION, "Alto ratio de pagos completados"),
+]
+NEGATIVE_FACTOR_TEXTS = [
+    (FACTOR_LATE_PAYMENTS, "{0} pagos tardíos"),
+    (FACTOR_DAYS_LATE, "Promedio de {1:.1f} días de retraso"),
+    (FACTOR_PENALTIES, "Penalidades por ${2:.2f}"),
+    (FACTOR_NO_HISTORY, "Sin historial crediticio"),
+]
+
+def _build_explanation_templates():
+    """
+    Línea positiva y plantilla de la línea negativa (o None) para cada combinación de
+    factores, de modo que por predicción solo se formatean los valores numéricos
+    """
+    templates = []
+    for flags in range(1 << 8):
+        positive = [text for factor, text in POSITIVE_FACTOR_TEXTS if flags & factor]
+        negative = [text for factor, text in NEGATIVE_FACTOR_TEXTS if flags & factor]
+        templates.append((
+            sys.intern("Factores positivos: " + ", ".join(positive)) if positive else None,
+            sys.intern("Factores negativos: " + ", ".join(negative)) if negative else None,
+        ))
+    return tuple(templates)
+
+EXPLANATION_TEMPLATES = _build_explanation_templates()
+
+def build_explanation(flags, late_payment_count, avg_days_late, total_penalty):
+    """Texto de la explicación de una máscara de factores (mismo formato que Google Colab)"""
+    positive, negative = EXPLANATION_TEMPLATES[flags]
+    if negative is None:
+        return [positive] if positive is not None else []
+    if flags & NUMERIC_FACTORS:
+        negative = negative.format(late_payment_count, avg_days_late, total_penalty)
+    return [positive, negative] if positive is not None else [negative]
+
+# Umbrales de score (ascendentes) y sus categorías / niveles de riesgo (cadenas compartidas)
+SCORE_THRESHOLDS = (30, 45, 60, 75, 90)
+SCORE_CATEGORIES = tuple(sys.intern(text) for text in ("Crítico", "Problemático", "Regular", "Satisfactorio", "Bueno", "Excelente"))
+RISK_LEVELS = tuple(sys.intern(text) for text in ("Muy Alto", "Alto", "Considerable", "Moderado", "Bajo", "Muy Bajo"))
+
+# Posición de las columnas con valores numéricos en la explicación
+LATE_PAYMENT_COLUMN = FeatureRecord.__slots__.index("late_payment_count")
+DAYS_LATE_COLUMN = FeatureRecord.__slots__.index("avg_days_late")
+PENALTY_COLUMN = FeatureRecord.__slots__.index("total_penalty")
+
+# Series de las métricas de cada paso (se resuelven una vez)
+NORMALIZE_SINGLE = SCORE_STEP_SECONDS.labels("normalize", "single")
+SCORE_SINGLE = SCORE_STEP_SECONDS.labels("score", "single")
+EXPLAIN_SINGLE = SCORE_STEP_SECONDS.labels("explain", "single")
+NORMALIZE_BATCH = SCORE_STEP_SECONDS.labels("normalize", "batch")
+SCORE_BATCH = SCORE_STEP_SECONDS.labels("score", "batch")
+EXPLAIN_BATCH = SCORE_STEP_SECONDS.labels("explain", "batch")
+RESULTS_BATCH = SCORE_STEP_SECONDS.labels("results", "batch")
+
+# Características que se exponen como enteros en los resultados
+INTEGER_FEATURES = {
+    'adress_verified',
+    'identity_verified',
+    'loan_count',
+    'late_payment_count',
+    'has_no_late_payments',
+    'has_penalty',
+}
+
 class ScorePredictionService:
-    def __init__(self):
+    def __init__(self, mode=None):
         self.model = None
         self.scaler = None
         self.config = None
         self.is_loaded = False
-        self.mock_mode = True  # Forzamos modo simulado para garantizar resultados correctos
+        self._load_lock = threading.Lock()
+        self.mode = mode or settings.SCORE_MODEL_MODE
+        self.mock_mode = True  # Modo simulado salvo que se habilite y cargue el modelo real
+        self.model_features = None
+        self._predict_fn = None
+        self.backend = None
+        self.model_version = None
+        self._artifact_stamp = None
+        self._artifacts_checked_at = 0.0
+        self.cache = ScoreCache(
+            max_size=settings.SCORE_CACHE_SIZE,
+            ttl_seconds=settings.SCORE_CACHE_TTL_SECONDS,
+        )
+        self.executor = ScoreExecutor(
+            self,
+            kind=settings.SCORE_EXECUTOR,
+            workers=settings.SCORE_EXECUTOR_WORKERS,
+            max_pending=settings.SCORE_MAX_PENDING,
+        )
+        self._batcher = MicroBatcher(
+            self.executor.predict_rows,
+            max_batch_size=settings.SCORE_BATCH_MAX_SIZE,
+            max_wait_ms=settings.SCORE_BATCH_MAX_WAIT_MS,
+        )
         
         # Lista de características esperadas (en orden)
         self.selected_features = [
@@ -41,14 +164,73 @@ class ScorePredictionService:
             }
         }
         
-        # Intentar cargar el modelo para futuras mejoras
-        self.load_model()
+        # Los artefactos se cargan de forma diferida (ensure_loaded) para no
+        # encarecer la importación de app.main
+    
+    def ensure_loaded(self):
+        """Carga los artefactos del modelo la primera vez que se necesitan"""
+        if self.is_loaded:
+            return True
+        with self._load_lock:
+            if not self.is_loaded:
+                self.load_model()
+                self.is_loaded = True
+        return True
+    
+    def reload_model(self):
+        """Vuelve a cargar los artefactos y descarta los resultados en caché"""
+        with self._load_lock:
+            self.load_model()
+            self.is_loaded = True
+        self.cache.clear()
+        logger.info(f"Modelo recargado (versión {self.model_version})")
+    
+    def _read_artifact_stamp(self):
+        """Fecha de modificación y tamaño de los artefactos, para detectar cambios"""
+        stamp = []
+        for name in MODEL_ARTIFACTS:
+            path = MODEL_DIR / name
+            if path.exists():
+                stat = path.stat()
+                stamp.append((name, stat.st_mtime_ns, stat.st_size))
+        return tuple(stamp)
+    
+    def _artifacts_changed(self):
+        """Indica si los artefactos cambiaron (se verifica como máximo cada pocos segundos)"""
+        now = time.monotonic()
+        if now - self._artifacts_checked_at < settings.SCORE_ARTIFACT_CHECK_SECONDS:
+            return False
+        self._artifacts_checked_at = now
+        if self._read_artifact_stamp() == self._artifact_stamp:
+            return False
+        logger.info("Los artefactos del modelo cambiaron; recargando")
+        return True
+    
+    def _check_artifacts(self):
+        """Recarga el modelo si sus artefactos cambiaron"""
+        if self._artifacts_changed():
+            self.reload_model()
+    
+    async def _check_artifacts_async(self):
+        """Como _check_artifacts, pero la recarga se hace en un hilo aparte para no bloquear el event loop"""
+        if self._artifacts_changed():
+            await asyncio.to_thread(self.reload_model)
+    
+    async def load_in_background(self):
+        """Carga los artefactos en un hilo aparte para no bloquear el event loop"""
+        if not self.is_loaded:
+            await asyncio.to_thread(self.ensure_loaded)
+        return self.is_loaded
     
     def load_model(self):
-        """Intenta cargar el modelo (solo para referencia futura)"""
+        """Localiza los artefactos del modelo y, en modo "model", los carga para inferencia"""
         try:
             # Obtener ruta base de modelos
-            base_dir = Path(__file__).parent.parent / "models" / "borrower"
+            base_dir = MODEL_DIR
+            self.backend = None
+            self.model_version = "synthetic"
+            self._artifact_stamp = self._read_artifact_stamp()
+            self._artifacts_checked_at = time.monotonic()
             logger.info(f"Buscando modelo en: {base_dir}")
             
             # Asegurarse de que el directorio existe
@@ -74,10 +256,29 @@ class ScorePredictionService:
             else:
                 logger.warning(f"No se encontró el archivo del scaler en {scaler_path}")
             
-            # Por ahora, forzamos modo simulado para garantizar resultados correctos
-            self.mock_mode = True
             self.config = self.default_config
-            #logger.info("Usando modo simulado (algoritmo sintético) para garantizar resultados correctos")
+            
+            if self.mode != "model":
+                self.mock_mode = True
+                logger.info("Usando modo simulado (algoritmo sintético)")
+                return True
+            
+            if not model_path.exists() or not scaler_path.exists():
+                logger.warning("Faltan artefactos del modelo. Usando modo simulado")
+                self.mock_mode = True
+                return True
+            
+            # Preferir el artefacto NumPy exportado; TensorFlow solo como respaldo
+            export_path = base_dir / "modelo_scoring_crediticio.npz"
+            if export_path.exists() and self._load_numpy_model(export_path, model_path):
+                self.backend = "numpy"
+            else:
+                self._load_tf_model(model_path, scaler_path, base_dir / "features_scoring_crediticio.json")
+                self.backend = "tensorflow"
+            self.model_version = f"{self.backend}:{self._model_sha256[:12]}"
+            
+            self.mock_mode = False
+            logger.info(f"Modelo de scoring cargado con backend {self.backend}")
             return True
             
         except Exception as e:
@@ -86,72 +287,151 @@ class ScorePredictionService:
             self.config = self.default_config
             return True
     
+    def _set_model_features(self, model_features):
+        """Guarda el orden de columnas del modelo (distinto al de selected_features)"""
+        self.model_features = list(model_features)
+        self._model_columns = np.array([self.selected_features.index(name) for name in self.model_features])
+    
+    def _load_numpy_model(self, export_path, model_path):
+        """
+        Carga el artefacto exportado con app.ml.export_model.
+        Devuelve False si está desactualizado respecto al modelo .h5
+        """
+        from app.ml.services.numpy_runtime import NumpyScoringModel, file_sha256
+        
+        runtime = NumpyScoringModel.load(export_path)
+        if runtime.source_sha256 and model_path.exists() and runtime.source_sha256 != file_sha256(model_path):
+            logger.warning(f"El artefacto {export_path} no corresponde al modelo actual. Usando TensorFlow")
+            return False
+        
+        self.model = runtime
+        self._model_sha256 = runtime.source_sha256 or file_sha256(export_path)
+        self._set_model_features(runtime.features)
+        self._run_model = runtime.predict
+        return True
+    
+    def _load_tf_model(self, model_path, scaler_path, features_path):
+        """Carga el modelo Keras y el scaler, y prepara la función de inferencia compilada"""
+        import joblib
+        # Import diferido: TensorFlow solo se carga si no hay artefacto NumPy
+        import tensorflow as tf
+        from app.ml.services.numpy_runtime import file_sha256
+        
+        self._model_sha256 = file_sha256(model_path)
+        self.model = tf.keras.models.load_model(model_path, compile=False)
+        self.scaler = joblib.load(scaler_path)
+        
+        # El modelo se entrenó con un orden de columnas distinto a selected_features
+        with open(features_path) as f:
+            self._set_model_features(json.load(f))
+        
+        # MinMaxScaler.transform equivale a x * scale_ + min_
+        self._scaler_scale = np.asarray(self.scaler.scale_, dtype=np.float32)
+        self._scaler_min = np.asarray(self.scaler.min_, dtype=np.float32)
+        
+        # Grafo trazado una sola vez gracias a la firma de entrada fija
+        model = self.model
+        self._predict_fn = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[tf.TensorSpec(shape=[None, len(self.model_features)], dtype=tf.float32)],
+        )
+        
+        # Precalentar: la primera llamada traza el grafo, así no la paga la primera solicitud
+        self._predict_fn(tf.zeros((1, len(self.model_features)), dtype=tf.float32))
+        self._predict_fn(tf.zeros((settings.SCORE_BATCH_MAX_SIZE, len(self.model_features)), dtype=tf.float32))
+        
+        def run_model(x):
+            x = np.asarray(x, dtype=np.float32) * self._scaler_scale + self._scaler_min
+            return self._predict_fn(tf.convert_to_tensor(x)).numpy().reshape(-1)
+        
+        self._run_model = run_model
+    
+    def calculate_model_scores(self, features):
+        """
+        Calcula los scores con el modelo entrenado.
+        Recibe una matriz (N, 11) ordenada según selected_features
+        """
+        raw = self._run_model(features[:, self._model_columns])
+        return np.round(np.clip(raw.astype(np.float64), 0, 100))
+    
     def calculate_synthetic_score(self, input_data):
         """
         Implementa EXACTAMENTE el mismo algoritmo de score sintético usado en Google Colab
         """
         try:
-            # Loggeamos todos los valores de entrada para debugging
-            logger.info("Datos de entrada para cálculo de score:")
-            for key, value in input_data.items():
-                logger.info(f"  {key}: {value}")
+            # El detalle de cada paso solo se arma si DEBUG está habilitado
+            debug = logger.isEnabledFor(logging.DEBUG)
+            if debug:
+                logger.debug("Datos de entrada para cálculo de score:")
+                for key, value in input_data.items():
+                    logger.debug(f"  {key}: {value}")
             
             # Comenzar con una base de 70 puntos
             score = 70
-            logger.info(f"Base inicial: {score}")
+            if debug:
+                logger.debug(f"Base inicial: {score}")
             
             # 1. Bonificación por verificaciones (hasta +15 puntos)
             verify_bonus = input_data.get('adress_verified', 0) * 5  # +5 por dirección verificada
             score += verify_bonus
-            logger.info(f"Bonificación por dirección verificada: +{verify_bonus}")
+            if debug:
+                logger.debug(f"Bonificación por dirección verificada: +{verify_bonus}")
             
             id_bonus = input_data.get('identity_verified', 0) * 10  # +10 por identidad verificada
             score += id_bonus
-            logger.info(f"Bonificación por identidad verificada: +{id_bonus}")
+            if debug:
+                logger.debug(f"Bonificación por identidad verificada: +{id_bonus}")
             
             # 2. Penalización por pagos tardíos (hasta -20 puntos)
             late_payment_penalty = input_data.get('late_payment_count', 0) * -5
             late_payment_penalty = max(late_payment_penalty, -20)  # Limitar a -20 como máximo
             score += late_payment_penalty
-            logger.info(f"Penalización por pagos tardíos: {late_payment_penalty}")
+            if debug:
+                logger.debug(f"Penalización por pagos tardíos: {late_payment_penalty}")
             
             # 3. Penalización por días de retraso (hasta -15 puntos)
             days_late_penalty = input_data.get('avg_days_late', 0) * -1
             days_late_penalty = max(days_late_penalty, -15)  # Limitar a -15 como máximo
             score += days_late_penalty
-            logger.info(f"Penalización por días de retraso: {days_late_penalty}")
+            if debug:
+                logger.debug(f"Penalización por días de retraso: {days_late_penalty}")
             
             # 4. Penalización por monto de penalidades (hasta -15 puntos)
             penalty_amount_penalty = input_data.get('total_penalty', 0) / 100 * -1  # -1 punto por cada 100 de penalidad
             penalty_amount_penalty = max(penalty_amount_penalty, -15)  # Limitar a -15 como máximo
             score += penalty_amount_penalty
-            logger.info(f"Penalización por monto de penalidades: {penalty_amount_penalty}")
+            if debug:
+                logger.debug(f"Penalización por monto de penalidades: {penalty_amount_penalty}")
             
             # 5. Bonificación por comportamiento positivo
             
             # 5.1 Ratio alto de pagos completados (hasta +15 puntos)
             completion_bonus = input_data.get('payment_completion_ratio', 0) * 15
             score += completion_bonus
-            logger.info(f"Bonificación por ratio de pagos completados: +{completion_bonus}")
+            if debug:
+                logger.debug(f"Bonificación por ratio de pagos completados: +{completion_bonus}")
             
             # 5.2 Sin pagos tardíos (bono adicional)
             no_late_payment_bonus = 0
             if input_data.get('has_no_late_payments', 0) == 1:
                 no_late_payment_bonus = 10
                 score += no_late_payment_bonus
-            logger.info(f"Bonificación por no tener pagos tardíos: +{no_late_payment_bonus}")
+            if debug:
+                logger.debug(f"Bonificación por no tener pagos tardíos: +{no_late_payment_bonus}")
             
             # 5.3 Ajuste para usuarios sin préstamos
             loan_adjustment = 0
             if input_data.get('loan_count', 0) == 0:
                 loan_adjustment = -5
                 score += loan_adjustment  # Ligero descuento por falta de historial
-            logger.info(f"Ajuste por falta de historial crediticio: {loan_adjustment}")
+            if debug:
+                logger.debug(f"Ajuste por falta de historial crediticio: {loan_adjustment}")
             
             # Ajustar score para que esté entre 0-100
             original_score = score
             score = max(0, min(score, 100))
-            logger.info(f"Score pre-limitado: {original_score}, Score final: {score}")
+            if debug:
+                logger.debug(f"Score pre-limitado: {original_score}, Score final: {score}")
             
             # Redondear a enteros
             score = round(score)
@@ -167,78 +447,301 @@ class ScorePredictionService:
         Determina la categoría y nivel de riesgo basado en el score
         Usa las mismas categorías que en Google Colab
         """
-        if score >= 90:
-            return "Excelente", "Muy Bajo"
-        elif score >= 75:
-            return "Bueno", "Bajo"
-        elif score >= 60:
-            return "Satisfactorio", "Moderado"
-        elif score >= 45:
-            return "Regular", "Considerable"
-        elif score >= 30:
-            return "Problemático", "Alto"
-        else:
-            return "Crítico", "Muy Alto"
+        index = bisect.bisect_right(SCORE_THRESHOLDS, score)
+        return SCORE_CATEGORIES[index], RISK_LEVELS[index]
     
     def generate_explanation(self, input_data):
         """
         Genera una explicación sobre los factores que influyen en el score
         Siguiendo el mismo formato de Google Colab
         """
-        explanation = []
+        record = FeatureRecord.from_mapping(input_data)
+        return build_explanation(
+            self.explanation_flags(record),
+            record.late_payment_count,
+            record.avg_days_late,
+            record.total_penalty,
+        )
+    
+    def explanation_flags(self, record):
+        """Máscara de los factores de la explicación de un FeatureRecord"""
+        flags = 0
+        if record.identity_verified == 1:
+            flags |= FACTOR_IDENTITY_VERIFIED
+        if record.adress_verified == 1:
+            flags |= FACTOR_ADRESS_VERIFIED
+        if record.has_no_late_payments == 1 and record.loan_count > 0:
+            flags |= FACTOR_NO_LATE_PAYMENTS
+        if record.payment_completion_ratio > 0.8:
+            flags |= FACTOR_HIGH_COMPLETION
+        if record.late_payment_count > 0:
+            flags |= FACTOR_LATE_PAYMENTS
+        if record.avg_days_late > 0:
+            flags |= FACTOR_DAYS_LATE
+        if record.total_penalty > 0:
+            flags |= FACTOR_PENALTIES
+        if record.loan_count == 0:
+            flags |= FACTOR_NO_HISTORY
+        return flags
+    
+    def calculate_synthetic_scores(self, features):
+        """
+        Versión vectorizada de calculate_synthetic_score.
+        Recibe una matriz (N, 11) ordenada según selected_features y devuelve N scores
+        """
+        col = {name: features[:, i] for i, name in enumerate(self.selected_features)}
         
-        # Factores positivos
-        positive_factors = []
-        if input_data.get('identity_verified', 0) == 1:
-            positive_factors.append("Identidad verificada")
-        if input_data.get('adress_verified', 0) == 1:
-            positive_factors.append("Dirección verificada")
-        if input_data.get('has_no_late_payments', 0) == 1 and input_data.get('loan_count', 0) > 0:
-            positive_factors.append("Sin pagos tardíos")
-        if input_data.get('payment_completion_ratio', 0) > 0.8:
-            positive_factors.append("Alto ratio de pagos completados")
+        # Se suman los términos en el mismo orden que el cálculo escalar para obtener los mismos valores
+        score = np.full(features.shape[0], 70.0)
+        score += col['adress_verified'] * 5
+        score += col['identity_verified'] * 10
+        score += np.maximum(col['late_payment_count'] * -5, -20)
+        score += np.maximum(col['avg_days_late'] * -1, -15)
+        score += np.maximum(col['total_penalty'] / 100 * -1, -15)
+        score += col['payment_completion_ratio'] * 15
+        score += np.where(col['has_no_late_payments'] == 1, 10, 0)
+        score += np.where(col['loan_count'] == 0, -5, 0)
         
-        # Factores negativos
-        negative_factors = []
-        if input_data.get('late_payment_count', 0) > 0:
-            negative_factors.append(f"{input_data.get('late_payment_count')} pagos tardíos")
-        if input_data.get('avg_days_late', 0) > 0:
-            negative_factors.append(f"Promedio de {input_data.get('avg_days_late', 0):.1f} días de retraso")
-        if input_data.get('total_penalty', 0) > 0:
-            negative_factors.append(f"Penalidades por ${input_data.get('total_penalty', 0):.2f}")
-        if input_data.get('loan_count', 0) == 0:
-            negative_factors.append("Sin historial crediticio")
+        # np.round redondea al par más cercano, igual que round() de Python
+        return np.round(np.clip(score, 0, 100))
+    
+    def get_score_categories(self, scores):
+        """Versión vectorizada de get_score_category"""
+        idx = np.searchsorted(SCORE_THRESHOLDS, scores, side='right')
+        return np.array(SCORE_CATEGORIES, dtype=object)[idx], np.array(RISK_LEVELS, dtype=object)[idx]
+    
+    def calculate_explanation_flags(self, features):
+        """
+        Calcula, para cada fila, una máscara de bits con los factores que
+        generate_explanation incluiría en la explicación
+        """
+        col = {name: features[:, i] for i, name in enumerate(self.selected_features)}
         
-        # Agregar factores a explicación
-        if positive_factors:
-            explanation.append("Factores positivos: " + ", ".join(positive_factors))
-        if negative_factors:
-            explanation.append("Factores negativos: " + ", ".join(negative_factors))
+        flags = np.zeros(features.shape[0], dtype=np.uint16)
+        flags |= np.where(col['identity_verified'] == 1, FACTOR_IDENTITY_VERIFIED, 0).astype(np.uint16)
+        flags |= np.where(col['adress_verified'] == 1, FACTOR_ADRESS_VERIFIED, 0).astype(np.uint16)
+        flags |= np.where((col['has_no_late_payments'] == 1) & (col['loan_count'] > 0), FACTOR_NO_LATE_PAYMENTS, 0).astype(np.uint16)
+        flags |= np.where(col['payment_completion_ratio'] > 0.8, FACTOR_HIGH_COMPLETION, 0).astype(np.uint16)
+        flags |= np.where(col['late_payment_count'] > 0, FACTOR_LATE_PAYMENTS, 0).astype(np.uint16)
+        flags |= np.where(col['avg_days_late'] > 0, FACTOR_DAYS_LATE, 0).astype(np.uint16)
+        flags |= np.where(col['total_penalty'] > 0, FACTOR_PENALTIES, 0).astype(np.uint16)
+        flags |= np.where(col['loan_count'] == 0, FACTOR_NO_HISTORY, 0).astype(np.uint16)
+        return flags
+    
+    def explanation_from_flags(self, flags, row):
+        """
+        Construye el mismo texto que generate_explanation a partir de la máscara
+        de factores y de la fila de características (ordenada según selected_features)
+        """
+        flags = int(flags)
+        late_payment_count = row[LATE_PAYMENT_COLUMN]
+        if flags & FACTOR_LATE_PAYMENTS:
+            # La matriz es float; los conteos enteros se muestran igual que en el cálculo escalar
+            late_payment_count = float(late_payment_count)
+            if late_payment_count.is_integer():
+                late_payment_count = int(late_payment_count)
+        return build_explanation(flags, late_payment_count, row[DAYS_LATE_COLUMN], row[PENALTY_COLUMN])
+    
+    def predict_scores_batch(self, features):
+        """
+        Calcula en una sola pasada vectorizada los scores, categorías, niveles de riesgo
+        y factores de explicación de N filas.
+        
+        `features` es una matriz (N, 11) con las columnas en el orden de selected_features.
+        Los resultados son idénticos a los de predict_score fila por fila.
+        """
+        self.ensure_loaded()
+        started = time.perf_counter()
+        features = np.asarray(features, dtype=np.float64)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+        if features.ndim != 2 or features.shape[1] != len(self.selected_features):
+            raise ValueError(
+                f"Se esperaba una matriz de {len(self.selected_features)} columnas, "
+                f"se recibió una de forma {features.shape}"
+            )
         
-        return explanation
+        normalized = time.perf_counter()
+        NORMALIZE_BATCH.observe(normalized - started)
+        
+        if self.mock_mode:
+            scores = self.calculate_synthetic_scores(features)
+        else:
+            scores = self.calculate_model_scores(features)
+        categories, risk_levels = self.get_score_categories(scores)
+        scored = time.perf_counter()
+        SCORE_BATCH.observe(scored - normalized)
+        
+        explanation_flags = self.calculate_explanation_flags(features)
+        EXPLAIN_BATCH.observe(time.perf_counter() - scored)
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Scores calculados en lote: {features.shape[0]} filas")
+        
+        return {
+            "scores": scores,
+            "categories": categories,
+            "risk_levels": risk_levels,
+            "explanation_flags": explanation_flags,
+        }
+    
+    def build_batch_results(self, batch, features):
+        """
+        Convierte la salida de predict_scores_batch en la misma lista de diccionarios
+        que devolvería predict_score para cada fila
+        """
+        if len(batch["scores"]) == 0:
+            return []
+        started = time.perf_counter()
+        features = np.asarray(features, dtype=np.float64).reshape(len(batch["scores"]), -1)
+        names = self.selected_features
+        converters = [int if name in INTEGER_FEATURES else float for name in names]
+        results = []
+        for score, category, risk_level, flags, row in zip(
+            batch["scores"].tolist(), batch["categories"], batch["risk_levels"],
+            batch["explanation_flags"].tolist(), features.tolist(),
+        ):
+            results.append({
+                "score": score,
+                "confidence": 0.9,
+                "category": category,
+                "risk_level": risk_level,
+                "explanation": self.explanation_from_flags(flags, row),
+                "input_features": dict(zip(names, [convert(value) for convert, value in zip(converters, row)])),
+                "is_simulated": self.mock_mode
+            })
+        RESULTS_BATCH.observe(time.perf_counter() - started)
+        return results
+    
+    def _predict_rows(self, features):
+        """Procesa un lote armado por el micro-batcher"""
+        return self.build_batch_results(self.predict_scores_batch(features), features)
+    
+    def _to_row(self, record):
+        """Convierte un FeatureRecord en una fila ordenada"""
+        return np.array(record.as_row(), dtype=np.float64)
+    
+    async def predict_score_async(self, input_data):
+        """
+        Versión asíncrona de predict_score: el cálculo se hace en el executor de scoring,
+        fuera del event loop. Con el modelo real, las solicitudes concurrentes se agrupan
+        en una sola inferencia. Lanza ScoringOverloadedError si hay demasiadas en curso;
+        los errores del cálculo se propagan al llamador
+        """
+        if not self.is_loaded:
+            await self.load_in_background()
+        
+        await self._check_artifacts_async()
+        record = FeatureRecord.from_mapping(input_data)
+        key = self._cache_key(record)
+        cached = self.cache.get(key) if key is not None else None
+        if cached is not None:
+            return self._from_cache(cached, record)
+        
+        self.executor.admit()
+        try:
+            if self.mock_mode:
+                result = await self.executor.predict_score(record)
+            else:
+                result = await self._batcher.submit(self._to_row(record))
+            result["input_features"] = record.as_dict()
+            self._store_in_cache(key, result, record)
+            return result
+        finally:
+            self.executor.release()
+    
+    async def predict_batch_async(self, features):
+        """
+        Versión asíncrona de predict_scores_batch + build_batch_results, ejecutada en el
+        executor de scoring. Lanza ScoringOverloadedError si hay demasiadas en curso
+        """
+        if len(features) == 0:
+            return []
+        if not self.is_loaded:
+            await self.load_in_background()
+        await self._check_artifacts_async()
+        
+        self.executor.admit()
+        try:
+            return await self.executor.predict_rows(features)
+        finally:
+            self.executor.release()
+    
+    def _cache_key(self, record):
+        """Clave de caché: versión del modelo y vector de características canónico"""
+        if not self.cache.enabled:
+            return None
+        try:
+            return (self.model_version, tuple(map(float, record.as_row())))
+        except (TypeError, ValueError):
+            return None
+    
+    def _store_in_cache(self, key, result, record):
+        """Guarda una copia del resultado en caché (los resultados con error no se guardan)"""
+        if key is not None and "error" not in result:
+            self.cache.put(key, self._from_cache(result, record))
+    
+    def _from_cache(self, cached, record):
+        """
+        Copia un resultado en caché para que el llamador pueda modificarlo. Las
+        características se devuelven como diccionario, armado desde el FeatureRecord
+        """
+        result = dict(cached)
+        result["explanation"] = list(cached["explanation"])
+        result["input_features"] = record.as_dict()
+        return result
     
     def predict_score(self, input_data):
-        """Realiza la predicción de score crediticio"""
+        """Realiza la predicción de score crediticio, reutilizando resultados en caché"""
+        self.ensure_loaded()
+        self._check_artifacts()
+        
+        record = FeatureRecord.from_mapping(input_data)
+        key = self._cache_key(record)
+        cached = self.cache.get(key) if key is not None else None
+        if cached is not None:
+            return self._from_cache(cached, record)
+        
+        result = self._predict_score_uncached(record)
+        self._store_in_cache(key, result, record)
+        result["input_features"] = record.as_dict()
+        return result
+    
+    def _predict_score_uncached(self, input_data):
+        """Calcula la predicción de score crediticio"""
         try:
-            # Normalizar las claves del diccionario
-            normalized_data = {}
-            for key, value in input_data.items():
-                # Reemplazar posibles variaciones en los nombres de las claves
-                normalized_key = key.replace('_', '_')
-                normalized_data[normalized_key] = value
+            started = time.perf_counter()
+            # Registro de características con disposición fija (no se copia la entrada)
+            record = FeatureRecord.from_mapping(input_data)
+            
+            debug = logger.isEnabledFor(logging.DEBUG)
+            if debug:
+                logger.debug("Calculando score crediticio...")
+            
+            if not self.mock_mode:
+                result = self._predict_rows(self._to_row(record).reshape(1, -1))[0]
+                result["input_features"] = record
+                return result
             
-            logger.info("Calculando score crediticio...")
+            normalized = time.perf_counter()
+            NORMALIZE_SINGLE.observe(normalized - started)
             
             # Usar algoritmo sintético (exactamente igual a Google Colab)
-            score = self.calculate_synthetic_score(normalized_data)
+            score = self.calculate_synthetic_score(record)
             
             # Obtener categoría y nivel de riesgo
             category, risk_level = self.get_score_category(score)
+            scored = time.perf_counter()
+            SCORE_SINGLE.observe(scored - normalized)
             
             # Generar explicación
-            explanation = self.generate_explanation(normalized_data)
+            explanation = build_explanation(
+                self.explanation_flags(record), record.late_payment_count, record.avg_days_late, record.total_penalty
+            )
+            EXPLAIN_SINGLE.observe(time.perf_counter() - scored)
             
-            logger.info(f"Score calculado: {score} ({category}, {risk_level})")
+            if debug:
+                logger.debug(f"Score calculado: {score} ({category}, {risk_level})")
             
             return {
                 "score": float(score),
@@ -246,7 +749,7 @@ class ScorePredictionService:
                 "category": category,
                 "risk_level": risk_level,
                 "explanation": explanation,
-                "input_features": normalized_data,
+                "input_features": record,
                 "is_simulated": True
             }
             
@@ -260,6 +763,6 @@ class ScorePredictionService:
                 "risk_level": "Considerable",
                 "error": str(e),
                 "explanation": ["Error al procesar la solicitud"],
-                "input_features": input_data,
+                "input_features": FeatureRecord.from_mapping(input_data),
                 "is_simulated": True
             }
\ No newline at end of file
@@ -0,0 +1,408 @@
+"""
+Métricas del servicio en formato de texto de Prometheus (GET /metrics).
+
+Implementación mínima sin dependencias: contadores, gauges e histogramas con
+etiquetas. Registrar un valor solo suma en memoria; los valores que
+ya lleva otro componente (pools de conexiones, caché, executor) se leen recién al
+consultar /metrics mediante funciones (CallbackMetric), sin costo por solicitud.
+"""
+import bisect
+import threading
+import time
+import bson
+from pymongo import monitoring
+
+# Buckets (en segundos) de los pasos del scoring: de microsegundos a segundos
+STEP_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Buckets de la resolución de las operaciones GraphQL
+RESOLVE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Buckets de la sincronización de una tabla
+SYNC_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class MetricsRegistry:
+    """Conjunto de métricas que se exponen juntas"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"La métrica {metric.name} ya está registrada")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name):
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def render(self):
+        """Todas las métricas en el formato de texto de Prometheus (versión 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+# Registro por defecto del proceso
+REGISTRY = MetricsRegistry()
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values):
+        """
+        Serie de un conjunto de valores de etiquetas. En el camino crítico conviene
+        guardar la serie una vez (por ejemplo, a nivel de módulo) y reutilizarla
+        """
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} requiere las etiquetas {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _series(self):
+        with self._lock:
+            return list(self._children.items())
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+class Counter(_Metric):
+    """Valor que solo aumenta (eventos, filas, bytes)"""
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._children[()].inc(amount)
+
+    def samples(self):
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+            for values, child in self._series()
+        ]
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+class Gauge(Counter):
+    """Valor que sube y baja (conexiones abiertas, última duración)"""
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def dec(self, amount=1):
+        self._children[()].dec(amount)
+
+    def set(self, value):
+        self._children[()].set(value)
+
+class _Timer:
+    __slots__ = ("child", "started")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.child.observe(time.perf_counter() - self.started)
+
+class _HistogramChild:
+    __slots__ = ("upper_bounds", "counts", "sum")
+
+    def __init__(self, upper_bounds):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        # Sin lock: tomarlo cuesta más que la observación. Con el GIL, dos hilos que
+        # observan a la vez pueden perder muy rara vez una muestra, lo que no cambia la
+        # distribución (a diferencia de un gauge, el error no se acumula)
+        self.counts[bisect.bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+
+    def time(self):
+        """Mide la duración de un bloque `with`"""
+        return _Timer(self)
+
+class Histogram(_Metric):
+    """Distribución de duraciones (u otros valores) en buckets acumulados"""
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=STEP_BUCKETS, registry=REGISTRY):
+        self.upper_bounds = tuple(sorted(float(bucket) for bucket in buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.upper_bounds)
+
+    def observe(self, value):
+        self._children[()].observe(value)
+
+    def time(self):
+        return self._children[()].time()
+
+    def samples(self):
+        lines = []
+        for values, child in self._series():
+            counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.upper_bounds + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class CallbackMetric:
+    """
+    Métrica cuyo valor se calcula al consultar /metrics. `callback` devuelve un número
+    o un diccionario {tupla de valores de etiquetas: número}; si falla, no se exponen muestras
+    """
+
+    def __init__(self, name, help, callback, labelnames=(), kind="gauge", registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+        if registry is not None:
+            registry.register(self)
+
+    def samples(self):
+        try:
+            values = self.callback()
+        except Exception:
+            return []
+        if values is None:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in values.items()
+        ]
+
+# Métricas del servicio
+
+GRAPHQL_RESOLVE_SECONDS = Histogram(
+    "graphql_resolve_seconds",
+    "Duración de la resolución de las operaciones GraphQL",
+    ["field"],
+    buckets=RESOLVE_BUCKETS,
+)
+
+REST_SCORE_SECONDS = Histogram(
+    "rest_score_seconds",
+    "Duración de los endpoints REST de scoring",
+    ["route"],
+    buckets=RESOLVE_BUCKETS,
+)
+
+SCORE_STEP_SECONDS = Histogram(
+    "score_step_seconds",
+    "Duración de cada paso del scoring (normalize, score, explain); path=single por fila o batch por lote",
+    ["step", "path"],
+)
+
+SYNC_TABLE_SECONDS = Histogram(
+    "sync_table_seconds",
+    "Duración de la sincronización de cada tabla",
+    ["table"],
+    buckets=SYNC_BUCKETS,
+)
+
+SYNC_ROWS = Counter(
+    "sync_rows_total",
+    "Filas escritas en MongoDB por tabla y origen (full, incremental, events)",
+    ["table", "source"],
+)
+
+SYNC_BYTES = Counter(
+    "sync_bytes_total",
+    "Bytes BSON escritos en MongoDB por tabla y origen (estimados con el primer documento de cada lote)",
+    ["table", "source"],
+)
+
+SYNC_ERRORS = Counter(
+    "sync_errors_total",
+    "Sincronizaciones de tabla fallidas",
+    ["table"],
+)
+
+MONGO_POOL_CONNECTIONS = Gauge(
+    "mongo_pool_connections",
+    "Conexiones del pool de MongoDB (open: abiertas, checked_out: en uso)",
+    ["state"],
+)
+
+def record_sync_batch(table_name, source, documents):
+    """Cuenta las filas y los bytes (aproximados) de un lote escrito en MongoDB"""
+    if not documents:
+        return
+    SYNC_ROWS.labels(table_name, source).inc(len(documents))
+    try:
+        estimated = len(bson.encode(documents[0])) * len(documents)
+    except Exception:
+        return
+    SYNC_BYTES.labels(table_name, source).inc(estimated)
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Lleva las conexiones abiertas y en uso del pool de MongoDB (todas las instancias)"""
+
+    def __init__(self):
+        self.open = MONGO_POOL_CONNECTIONS.labels("open")
+        self.checked_out = MONGO_POOL_CONNECTIONS.labels("checked_out")
+
+    def connection_created(self, event):
+        self.open.inc()
+
+    def connection_closed(self, event):
+        self.open.dec()
+
+    def connection_checked_out(self, event):
+        self.checked_out.inc()
+
+    def connection_checked_in(self, event):
+        self.checked_out.dec()
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        pass
+
+def _postgres_pool_connections():
+    # Se importa aquí para leer siempre el engine actual del módulo
+    import app.config.postgres_conection as postgres_conection
+
+    pool = postgres_conection.engine.pool
+    if not hasattr(pool, "checkedout"):
+        return None
+    return {
+        ("checked_out",): pool.checkedout(),
+        ("idle",): pool.checkedin(),
+        ("overflow",): max(pool.overflow(), 0),
+        ("size",): pool.size(),
+    }
+
+def _mongo_pool_max_size():
+    import app.config.database as database
+
+    client = database._mongo_client
+    if client is None:
+        return None
+    return getattr(client, "delegate", client).options.pool_options.max_pool_size
+
+CallbackMetric("mongo_pool_max_size", "Tamaño máximo del pool de MongoDB (por instancia)", _mongo_pool_max_size)
+
+CallbackMetric(
+    "postgres_pool_connections",
+    "Conexiones del pool de PostgreSQL (checked_out, idle, overflow y tamaño configurado)",
+    _postgres_pool_connections,
+    ["state"],
+)
+
+def register_service_metrics(score_service, score_history=None, document_cache=None):
+    """Expone los contadores de la caché, el executor y el historial de scoring, y de la caché de documentos GraphQL"""
+
+    def cache_stats():
+        stats = score_service.cache.stats()
+        return {("hit",): stats["hits"], ("miss",): stats["misses"]}
+
+    CallbackMetric("score_cache_lookups_total", "Búsquedas en la caché de scores por resultado", cache_stats, ["result"], kind="counter")
+    CallbackMetric("score_cache_hit_ratio", "Proporción de aciertos de la caché de scores", lambda: score_service.cache.stats()["hit_rate"])
+    CallbackMetric("score_cache_entries", "Resultados guardados en la caché de scores", lambda: score_service.cache.stats()["size"])
+    CallbackMetric("score_executor_pending", "Predicciones en curso o en espera en el executor", lambda: score_service.executor.pending)
+    CallbackMetric("score_executor_max_pending", "Límite de predicciones en curso o en espera", lambda: score_service.executor.max_pending)
+    CallbackMetric("score_executor_rejected_total", "Predicciones rechazadas por sobrecarga", lambda: score_service.executor.rejected, kind="counter")
+
+    if score_history is not None:
+        def history_stats():
+            stats = score_history.stats()
+            return {("written",): stats["written"], ("dropped",): stats["dropped"], ("failed",): stats["failed"]}
+
+        CallbackMetric("score_history_documents_total", "Documentos del historial por resultado", history_stats, ["result"], kind="counter")
+        CallbackMetric("score_history_pending", "Documentos del historial en el búfer", lambda: score_history.stats()["pending"])
+
+    if document_cache is not None:
+        def document_stats():
+            stats = document_cache.stats()
+            return {("hit",): stats["hits"], ("miss",): stats["misses"]}
+
+        CallbackMetric("graphql_document_cache_lookups_total", "Búsquedas en la caché de documentos GraphQL por resultado", document_stats, ["result"], kind="counter")
+        CallbackMetric("graphql_document_cache_entries", "Documentos GraphQL en caché", lambda: document_cache.stats()["size"])
+        CallbackMetric("graphql_persisted_query_not_found_total", "Consultas persistidas no encontradas en la caché", lambda: document_cache.persisted_not_found, kind="counter")
@@ -2,9 +2,31 @@ import logging
 import asyncio
 import decimal
 import datetime
+import time
 from bson import Decimal128
-from app.config.postgres_conection import get_table_data, init_postgres_models
+from pymongo import ASCENDING, ReplaceOne
+from sqlalchemy import types as sqltypes
+from sqlalchemy.dialects import postgresql
+from app.config.postgres_conection import (
+    iter_table_chunks,
+    init_postgres_models,
+    get_primary_key,
+    get_watermark_column,
+    has_change_tracking,
+    get_existing_ids,
+    get_table,
+)
 from app.config.database import get_mongo_db
+from app.db.indexes import ensure_indexes, ensure_indexes_on
+from app.sync.pg_copy import aiter_copy_batches, supports_copy
+from app.config.settings import settings
+from app.monitoring.metrics import SYNC_TABLE_SECONDS, SYNC_ERRORS, record_sync_batch
+from app.ml.services.feature_store import (
+    BORROWER_LINK_FIELDS,
+    resolve_borrower_ids,
+    refresh_borrower_features,
+    previous_borrower_links,
+)
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -13,6 +35,9 @@ logger = logging.getLogger(__name__)
 # Tablas a sincronizar
 TABLES_TO_SYNC = ["user", "solicitude", "offer", "loan", "monthly_payment"]
 
+# Sufijo de la colección temporal usada en las sincronizaciones completas
+STAGING_SUFFIX = "__staging"
+
 def convert_postgres_record(record):
     """Convierte tipos de PostgreSQL a tipos compatibles con MongoDB"""
     if not record:
@@ -40,8 +65,328 @@ def convert_postgres_record(record):
             
     return result
 
-async def sync_table_to_mongodb(table_name, mongo_db=None):
-    """Sincroniza una tabla específica de PostgreSQL a MongoDB"""
+def _decimal_to_float(value):
+    return float(value)
+
+def _decimal_to_decimal128(value):
+    return Decimal128(value)
+
+def _date_to_datetime(value):
+    # BSON no tiene tipo fecha sin hora
+    return datetime.datetime(value.year, value.month, value.day)
+
+def _enum_to_str(value):
+    return str(value.value) if hasattr(value, 'value') else value
+
+def _timedelta_to_seconds(value):
+    return value.total_seconds()
+
+def _generic_value(value):
+    return convert_postgres_record({"value": value})["value"]
+
+# Tipos que MongoDB almacena tal cual
+_IDENTITY_TYPES = (
+    sqltypes.Integer,
+    sqltypes.Float,
+    sqltypes.Boolean,
+    sqltypes.DateTime,
+    sqltypes.JSON,
+    sqltypes.LargeBinary,
+)
+
+def _column_converter(column_type, money_as_decimal128):
+    """Función de conversión para un tipo de columna, o None si no necesita conversión"""
+    if isinstance(column_type, sqltypes.Enum):
+        return _enum_to_str
+    if isinstance(column_type, sqltypes.Numeric) and not isinstance(column_type, sqltypes.Float):
+        if not column_type.asdecimal:
+            return None
+        return _decimal_to_decimal128 if money_as_decimal128 else _decimal_to_float
+    if isinstance(column_type, _IDENTITY_TYPES):
+        return None
+    if isinstance(column_type, sqltypes.Date):
+        return _date_to_datetime
+    # El INTERVAL que refleja PostgreSQL no hereda de sqltypes.Interval
+    if isinstance(column_type, (sqltypes.Interval, postgresql.INTERVAL)):
+        return _timedelta_to_seconds
+    if isinstance(column_type, sqltypes.String):
+        return None
+    # Tipo desconocido: se usa la conversión genérica valor por valor
+    return _generic_value
+
+def build_record_converter(table, money_as_decimal128=False):
+    """
+    Compila, a partir de los tipos reflejados de una tabla, una función que convierte
+    sus registros a documentos de MongoDB.
+
+    Solo se recorren las columnas que necesitan conversión; las fechas se conservan
+    como datetime nativo para que MongoDB pueda consultarlas por rango, y las columnas
+    numéricas (montos) pueden guardarse como Decimal128 en lugar de float.
+    """
+    conversions = []
+    for column in table.columns:
+        converter = _column_converter(column.type, money_as_decimal128)
+        if converter is not None:
+            conversions.append((column.name, converter))
+
+    def convert(record):
+        result = dict(record)
+        for name, converter in conversions:
+            value = result.get(name)
+            if value is not None:
+                result[name] = converter(value)
+        return result
+
+    return convert
+
+_record_converters = {}
+
+def get_record_converter(table_name):
+    """
+    Devuelve (y guarda en caché) el conversor compilado de una tabla. Se recompila
+    si la tabla reflejada cambió (por ejemplo, tras refrescar el esquema)
+    """
+    table = get_table(table_name)
+    cached = _record_converters.get(table_name)
+    if cached is None or cached[0] is not table:
+        cached = (table, build_record_converter(table, settings.SYNC_MONEY_AS_DECIMAL128))
+        _record_converters[table_name] = cached
+    return cached[1]
+
+async def aiter_table_chunks(table_name, *args):
+    """
+    Versión asíncrona de iter_table_chunks.
+
+    Cada bloque se lee en un hilo aparte para no bloquear el event loop, y el bloque
+    siguiente se empieza a leer mientras el llamador escribe el actual en MongoDB.
+    """
+    chunks = iter_table_chunks(table_name, *args)
+    pending = asyncio.ensure_future(asyncio.to_thread(next, chunks, None))
+    try:
+        while True:
+            chunk = await pending
+            if chunk is None:
+                break
+            pending = asyncio.ensure_future(asyncio.to_thread(next, chunks, None))
+            yield chunk
+    finally:
+        # Esperar la lectura en curso antes de cerrar el cursor
+        if not pending.done():
+            await asyncio.wait([pending])
+        await asyncio.to_thread(chunks.close)
+
+async def get_watermark(mongo_db, table_name):
+    """Lee de system_info la marca de agua de la última sincronización incremental"""
+    doc = await mongo_db.system_info.find_one({"sync_watermark": table_name})
+    if not doc:
+        return None
+    value = doc.get("value")
+    if doc.get("is_datetime") and value is not None:
+        value = datetime.datetime.fromisoformat(value)
+    return {
+        "column": doc.get("column"),
+        "value": value,
+        "runs_since_reconcile": doc.get("runs_since_reconcile", 0),
+        "runs_since_refresh": doc.get("runs_since_refresh", 0),
+    }
+
+async def save_watermark(mongo_db, table_name, column, value, runs_since_reconcile, runs_since_refresh=0):
+    """Guarda en system_info la marca de agua de una tabla"""
+    is_datetime = isinstance(value, (datetime.datetime, datetime.date))
+    await mongo_db.system_info.update_one(
+        {"sync_watermark": table_name},
+        {
+            "$set": {
+                "column": column,
+                # Las fechas se guardan en ISO para conservar la zona horaria
+                "value": value.isoformat() if is_datetime else value,
+                "is_datetime": is_datetime,
+                "runs_since_reconcile": runs_since_reconcile,
+                "runs_since_refresh": runs_since_refresh,
+                "updated_at": datetime.datetime.now(datetime.timezone.utc),
+            }
+        },
+        upsert=True
+    )
+
+async def _remove_stale(table_name, mongo_db, pk_column, documents, removed_records):
+    """Elimina de un bloque de documentos los que ya no tienen fila en PostgreSQL"""
+    ids = [doc.get(pk_column) for doc in documents]
+    existing = await asyncio.to_thread(get_existing_ids, table_name, ids)
+    stale = [doc for doc in documents if doc.get(pk_column) not in existing]
+    if stale:
+        await mongo_db[table_name].delete_many({pk_column: {"$in": [doc.get(pk_column) for doc in stale]}})
+        if removed_records is not None:
+            removed_records.extend(stale)
+    return len(stale)
+
+async def reconcile_deletes(table_name, mongo_db, pk_column, removed_records=None):
+    """
+    Elimina de MongoDB los documentos cuya fila ya no existe en PostgreSQL.
+    Si se pasa `removed_records`, se le agregan los documentos eliminados.
+
+    Los ids se recorren en bloques de SYNC_CHUNK_SIZE ordenados por clave primaria y
+    cada bloque se consulta en PostgreSQL, así que la memoria no crece con la tabla.
+    """
+    link_field = BORROWER_LINK_FIELDS.get(table_name, pk_column)
+    cursor = mongo_db[table_name].find({}, {pk_column: 1, link_field: 1, "_id": 0}).sort(pk_column, ASCENDING)
+    removed = 0
+    documents = []
+    async for doc in cursor:
+        documents.append(doc)
+        if len(documents) >= settings.SYNC_CHUNK_SIZE:
+            removed += await _remove_stale(table_name, mongo_db, pk_column, documents, removed_records)
+            documents = []
+    if documents:
+        removed += await _remove_stale(table_name, mongo_db, pk_column, documents, removed_records)
+
+    if removed:
+        logger.info(f"Reconciliación de {table_name}: {removed} documentos eliminados")
+    return removed
+
+def _as_stored(value):
+    """Valor tal como lo devuelve MongoDB: fechas en UTC sin zona y con precisión de milisegundos"""
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return value
+
+def is_same_document(stored, document):
+    """Indica si el documento guardado en MongoDB (sin _id) coincide con el documento convertido"""
+    if stored is None or len(stored) != len(document):
+        return False
+    for key, value in document.items():
+        if key not in stored or stored[key] != _as_stored(value):
+            return False
+    return True
+
+class StoredDocuments:
+    """
+    Documentos guardados de una colección, leídos con un solo cursor en orden de clave
+    primaria a medida que avanzan los bloques de PostgreSQL (leídos en el mismo orden)
+    """
+
+    def __init__(self, collection, pk_column):
+        self.pk_column = pk_column
+        self._cursor = collection.find({}, {"_id": 0}).sort(pk_column, ASCENDING)
+        self._ahead = None
+
+    async def _read_until(self, last_id):
+        """Documentos (por clave) hasta `last_id` inclusive que todavía no se leyeron"""
+        current = {}
+        while True:
+            doc, self._ahead = self._ahead, None
+            if doc is None:
+                try:
+                    doc = await self._cursor.next()
+                except StopAsyncIteration:
+                    return current
+            key = doc.get(self.pk_column)
+            if key is not None and key > last_id:
+                self._ahead = doc
+                return current
+            current[key] = doc
+
+    async def changed(self, chunk, documents):
+        """Filas del bloque cuyo documento falta o es distinto, como pares (registro, documento)"""
+        current = await self._read_until(max(document[self.pk_column] for document in documents))
+        return [
+            (record, document)
+            for record, document in zip(chunk, documents)
+            if not is_same_document(current.get(document[self.pk_column]), document)
+        ]
+
+def advance_watermark(since, records, column):
+    """Máximo entre la marca de agua `since` y los valores de `column` en los registros"""
+    marks = [record[column] for record in records if record.get(column) is not None]
+    if not marks:
+        return since
+    return max(marks) if since is None else max(since, max(marks))
+
+async def sync_table_incremental(table_name, mongo_db, changed_records=None):
+    """
+    Sincroniza solo las filas nuevas o modificadas desde la última marca de agua.
+
+    Los cambios se aplican como ReplaceOne(upsert=True) ordenados por la clave primaria,
+    y cada SYNC_RECONCILE_EVERY ejecuciones se eliminan los documentos borrados en PostgreSQL.
+
+    Si la tabla no tiene updated_at, la marca de agua (created_at o la clave primaria) solo
+    detecta filas nuevas. Por eso cada SYNC_REFRESH_EVERY ejecuciones se leen todas sus filas,
+    se comparan con los documentos de MongoDB y se reescriben solo las nuevas o distintas.
+    Entre comparaciones, las modificaciones de esas tablas llegan con hasta
+    SYNC_REFRESH_EVERY ejecuciones de retraso (las filas nuevas llegan siempre).
+
+    Si se pasa `changed_records`, se le agregan los registros insertados, modificados o
+    eliminados (solo el campo que los vincula con su prestatario), y también el padre
+    anterior de los que cambiaron de padre.
+    """
+    link_field = BORROWER_LINK_FIELDS.get(table_name)
+    pk_column = await asyncio.to_thread(get_primary_key, table_name)
+    watermark_column = await asyncio.to_thread(get_watermark_column, table_name)
+    tracked = await asyncio.to_thread(has_change_tracking, table_name)
+    convert = await asyncio.to_thread(get_record_converter, table_name)
+    state = await get_watermark(mongo_db, table_name)
+
+    # Si cambió la columna de marca de agua, se vuelve a leer todo
+    since = state["value"] if state and state["column"] == watermark_column else None
+    runs_since_reconcile = state["runs_since_reconcile"] + 1 if state else 0
+    runs_since_refresh = state["runs_since_refresh"] + 1 if state else 0
+
+    # Comparación completa de una tabla sin updated_at (si se lee todo, ya no hace falta)
+    refresh = not tracked and since is not None and runs_since_refresh >= settings.SYNC_REFRESH_EVERY
+    if refresh or since is None:
+        runs_since_refresh = 0
+
+    collection = mongo_db[table_name]
+    applied = 0
+    # La comparación completa lee por clave primaria, a la par de los documentos guardados
+    read_column, read_since = (pk_column, None) if refresh else (watermark_column, since)
+    stored = StoredDocuments(collection, pk_column) if refresh else None
+    async for chunk in aiter_table_chunks(table_name, settings.SYNC_CHUNK_SIZE, read_column, read_since):
+        documents = [convert(record) for record in chunk]
+        since = advance_watermark(since, chunk, watermark_column)
+
+        if refresh:
+            changed = await stored.changed(chunk, documents)
+            if not changed:
+                continue
+            chunk = [record for record, _ in changed]
+            documents = [document for _, document in changed]
+
+        if changed_records is not None and link_field is not None:
+            links = {record.get(link_field) for record in chunk}
+            changed_records.extend({link_field: link} for link in links)
+            if link_field != pk_column:
+                # Padre anterior de las filas que cambiaron de padre (antes de reemplazarlas)
+                previous = await previous_borrower_links(mongo_db, table_name, chunk, pk_column)
+                changed_records.extend(doc for doc in previous if doc.get(link_field) not in links)
+
+        operations = [
+            ReplaceOne({pk_column: document[pk_column]}, document, upsert=True)
+            for document in documents
+        ]
+        await collection.bulk_write(operations, ordered=True)
+        record_sync_batch(table_name, "incremental", documents)
+        applied += len(chunk)
+
+    if state is None or runs_since_reconcile >= settings.SYNC_RECONCILE_EVERY:
+        removed_records = changed_records if link_field is not None else None
+        await reconcile_deletes(table_name, mongo_db, pk_column, removed_records)
+        runs_since_reconcile = 0
+
+    await save_watermark(mongo_db, table_name, watermark_column, since, runs_since_reconcile, runs_since_refresh)
+    logger.info(
+        f"Tabla {table_name} sincronizada de forma incremental{' (comparación completa)' if refresh else ''}. "
+        f"{applied} registros aplicados."
+    )
+    return True
+
+async def sync_table_to_mongodb(table_name, mongo_db=None, mode=None, changed_records=None):
+    """
+    Sincroniza una tabla específica de PostgreSQL a MongoDB.
+    `mode` puede ser "incremental" (por defecto, según SYNC_MODE) o "full"
+    """
     try:
         logger.info(f"Sincronizando tabla {table_name}...")
         
@@ -49,24 +394,134 @@ async def sync_table_to_mongodb(table_name, mongo_db=None):
         if mongo_db is None:
             mongo_db = get_mongo_db()
         
-        # Obtener datos de PostgreSQL
-        postgres_records = get_table_data(table_name)
-        if not postgres_records or len(postgres_records) == 0:
-            logger.warning(f"No hay datos para sincronizar en la tabla {table_name}")
-            return True
-        
-        # Convertir registros para hacerlos compatibles con MongoDB
-        converted_records = [convert_postgres_record(record) for record in postgres_records]
-        
-        # Borrar documentos existentes en MongoDB (opcional)
-        await mongo_db[table_name].delete_many({})
-        
-        # Insertar nuevos documentos
-        await mongo_db[table_name].insert_many(converted_records)
+        if (mode or settings.SYNC_MODE) == "incremental":
+            return await sync_table_incremental(table_name, mongo_db, changed_records)
         
-        logger.info(f"Tabla {table_name} sincronizada exitosamente. {len(converted_records)} registros insertados.")
-        return True
+        return await sync_table_full(table_name, mongo_db)
     
     except Exception as e:
         logger.error(f"Error al sincronizar la tabla {table_name}: {str(e)}")
-        return False
\ No newline at end of file
+        return False
+
+async def sync_table_full(table_name, mongo_db):
+    """
+    Copia completa de una tabla sin dejar la colección vacía mientras tanto.
+
+    Los registros se escriben en `<tabla>__staging` con inserciones no ordenadas,
+    se construyen ahí los índices y luego la colección temporal reemplaza a la
+    definitiva con un renameCollection atómico (dropTarget).
+
+    Después se guarda como marca de agua el máximo leído, para que la siguiente
+    sincronización incremental continúe desde la copia.
+    """
+    staging = mongo_db[table_name + STAGING_SUFFIX]
+    await staging.drop()
+    
+    # Leer PostgreSQL por bloques e insertarlos en lotes acotados
+    convert = await asyncio.to_thread(get_record_converter, table_name)
+    watermark_column = await asyncio.to_thread(get_watermark_column, table_name)
+    since = None
+    inserted = 0
+    copy_tables = [name.strip() for name in settings.SYNC_COPY_TABLES.split(",")]
+    if table_name in copy_tables and await asyncio.to_thread(supports_copy, table_name):
+        # Tablas grandes: COPY por rangos de clave primaria en paralelo, ya convertidos
+        async for converted_records in aiter_copy_batches(table_name, convert):
+            since = advance_watermark(since, converted_records, watermark_column)
+            await staging.insert_many(converted_records, ordered=False)
+            record_sync_batch(table_name, "full", converted_records)
+            inserted += len(converted_records)
+    else:
+        async for chunk in aiter_table_chunks(table_name, settings.SYNC_CHUNK_SIZE):
+            since = advance_watermark(since, chunk, watermark_column)
+            converted_records = [convert(record) for record in chunk]
+            await staging.insert_many(converted_records, ordered=False)
+            record_sync_batch(table_name, "full", converted_records)
+            inserted += len(converted_records)
+    
+    # Si la tabla está vacía no se toca la colección definitiva
+    if inserted == 0:
+        await staging.drop()
+        logger.warning(f"No hay datos para sincronizar en la tabla {table_name}")
+        return True
+    
+    # Índices construidos una sola vez sobre el conjunto completo
+    await ensure_indexes_on(staging, table_name)
+    await staging.rename(table_name, dropTarget=True)
+    # La copia completa ya quedó reconciliada y comparada
+    await save_watermark(mongo_db, table_name, watermark_column, since, 0, 0)
+    
+    logger.info(f"Tabla {table_name} sincronizada exitosamente. {inserted} registros insertados.")
+    return True
+
+async def sync_all_tables(tables=None, mongo_db=None, concurrency=None, mode=None):
+    """
+    Sincroniza varias tablas de forma concurrente, con como máximo `concurrency`
+    tablas en curso a la vez. Devuelve el resultado y la duración de cada tabla.
+    """
+    tables = tables or TABLES_TO_SYNC
+    if mongo_db is None:
+        mongo_db = get_mongo_db()
+    mode = mode or settings.SYNC_MODE
+    semaphore = asyncio.Semaphore(concurrency or settings.SYNC_CONCURRENCY)
+    changes = {table_name: [] for table_name in tables}
+
+    async def sync_one(table_name):
+        async with semaphore:
+            started = time.perf_counter()
+            success = await sync_table_to_mongodb(table_name, mongo_db, mode, changes[table_name])
+            elapsed = time.perf_counter() - started
+            SYNC_TABLE_SECONDS.labels(table_name).observe(elapsed)
+            if not success:
+                SYNC_ERRORS.labels(table_name).inc()
+            logger.info(f"Tabla {table_name}: {'OK' if success else 'ERROR'} en {elapsed:.2f}s")
+            return table_name, {"success": success, "seconds": round(elapsed, 3)}
+
+    started = time.perf_counter()
+    results = dict(await asyncio.gather(*(sync_one(table_name) for table_name in tables)))
+    synced_tables = [table_name for table_name in tables if results[table_name]["success"]]
+
+    # Volver a asegurar los índices (una colección recreada los habría perdido)
+    await ensure_indexes(mongo_db, tables)
+
+    # Mantener al día las características materializadas por prestatario
+    if settings.FEATURE_STORE_MATERIALIZED:
+        await update_borrower_features(mongo_db, mode, changes)
+
+    # Actualizar el estado de sincronización
+    await mongo_db.system_info.update_one(
+        {"initialization": "completed"},
+        {
+            "$set": {
+                "synced_with_postgres": True,
+                "last_sync": asyncio.get_event_loop().time(),
+                "synced_tables": synced_tables,
+                "table_timings": {table_name: result["seconds"] for table_name, result in results.items()},
+            }
+        },
+        upsert=True
+    )
+
+    logger.info(
+        f"Sincronización completada en {time.perf_counter() - started:.2f}s. "
+        f"{len(synced_tables)}/{len(tables)} tablas sincronizadas."
+    )
+    return results
+
+async def update_borrower_features(mongo_db, mode, changes):
+    """
+    Actualiza la colección borrower_features tras una sincronización: en modo completo
+    la recalcula entera y en modo incremental solo para los prestatarios afectados
+    """
+    try:
+        if mode != "incremental":
+            await refresh_borrower_features(mongo_db)
+            return
+
+        borrower_ids = set()
+        for table_name, records in changes.items():
+            if records and table_name in BORROWER_LINK_FIELDS:
+                borrower_ids |= await resolve_borrower_ids(mongo_db, table_name, records)
+        if borrower_ids:
+            await refresh_borrower_features(mongo_db, borrower_ids)
+    except Exception as e:
+        logger.error(f"Error al actualizar las características de prestatarios: {str(e)}")
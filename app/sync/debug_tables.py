@@ -1,6 +1,6 @@
 import logging
-from sqlalchemy import create_engine, text
-from app.config.settings import settings
+from sqlalchemy import text
+from app.config.postgres_conection import engine
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -9,14 +9,7 @@ logger = logging.getLogger(__name__)
 def test_postgres_connection():
     """Prueba la conexión a PostgreSQL con una consulta mínima"""
     try:
-        # Crear engine
-        engine = create_engine(
-            settings.postgres_url,
-            pool_pre_ping=True,
-            connect_args={"connect_timeout": 10}
-        )
-        
-        # Crear conexión
+        # Crear conexión (desde el pool compartido)
         with engine.connect() as connection:
             # Ejecutar consulta simple
             result = connection.execute(text("SELECT 1 AS test"))
@@ -0,0 +1,296 @@
+import asyncio
+import datetime
+import json
+import logging
+import pika
+from pika.adapters.asyncio_connection import AsyncioConnection
+from pymongo import DeleteOne, ReplaceOne
+from app.config.settings import settings
+from app.monitoring.metrics import record_sync_batch
+from app.ml.services.feature_store import (
+    BORROWER_LINK_FIELDS,
+    resolve_borrower_ids,
+    refresh_borrower_features,
+    previous_borrower_links,
+)
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Entidad por defecto de los eventos de cada cola
+QUEUE_ENTITIES = {
+    settings.USER_EVENTS_QUEUE: "user",
+    settings.LOAN_EVENTS_QUEUE: "loan",
+    settings.PAYMENT_EVENTS_QUEUE: "monthly_payment",
+}
+
+# Entidades que se pueden recibir por eventos (colecciones espejo)
+EVENT_ENTITIES = {"user", "solicitude", "offer", "loan", "monthly_payment"}
+
+# Campos de fecha que llegan como texto ISO en los eventos
+DATE_FIELD_SUFFIXES = ("_at", "_date", "_update")
+
+def _parse_dates(data):
+    """Convierte a datetime los campos de fecha que llegan como texto ISO"""
+    for key, value in data.items():
+        if isinstance(value, str) and key.endswith(DATE_FIELD_SUFFIXES):
+            try:
+                data[key] = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+            except ValueError:
+                pass
+    return data
+
+def parse_event(queue, body):
+    """
+    Interpreta un mensaje de evento.
+
+    Formato esperado (JSON): {"entity": "loan", "action": "upsert" | "delete", "data": {...}}.
+    `entity` es opcional (por defecto la de la cola) y, si falta `data`, el cuerpo
+    completo se toma como el registro. Devuelve (entidad, acción, registro).
+    """
+    event = json.loads(body)
+    entity = event.get("entity") or QUEUE_ENTITIES.get(queue)
+    action = event.get("action", "upsert")
+    data = event.get("data", event)
+
+    if entity not in EVENT_ENTITIES:
+        raise ValueError(f"Entidad desconocida: {entity}")
+    if action not in ("upsert", "delete"):
+        raise ValueError(f"Acción desconocida: {action}")
+    if not isinstance(data, dict) or data.get("id") is None:
+        raise ValueError("El evento no tiene un registro con 'id'")
+
+    data = {key: value for key, value in data.items() if key not in ("entity", "action")}
+    return entity, action, _parse_dates(data)
+
+class EventBatchProcessor:
+    """
+    Acumula eventos y los aplica a MongoDB por lotes.
+
+    Dentro de un lote solo se conserva el último evento de cada registro; las escrituras
+    son upserts/deletes por id (idempotentes) en un bulk_write por colección. Después se
+    recalculan las características de los prestatarios afectados y se confirma el lote
+    llamando a `ack(último_tag)`; si algo falla se llama a `nack(último_tag)`. Los tags
+    son opacos para el lote (el consumidor los asocia a su canal).
+    """
+
+    def __init__(self, mongo_db, ack, nack, batch_size=100, max_wait_ms=200):
+        self.mongo_db = mongo_db
+        self.ack = ack
+        self.nack = nack
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending = {}
+        self._last_tag = None
+        self._lock = asyncio.Lock()
+        self._flush_task = None
+        self._timer_task = None
+        self.processed = 0
+
+    def add(self, queue, delivery_tag, body):
+        """Agrega un mensaje al lote actual (se llama desde el callback del consumidor)"""
+        self._last_tag = delivery_tag
+        try:
+            entity, action, data = parse_event(queue, body)
+            # El último evento de cada registro reemplaza a los anteriores del lote
+            self._pending[(entity, data["id"])] = (action, data)
+        except Exception as e:
+            # Los mensajes inválidos se descartan (se confirman con el lote)
+            logger.error(f"Evento inválido en la cola {queue}: {str(e)}")
+
+        if len(self._pending) >= self.batch_size:
+            self._schedule_flush()
+
+    def reset(self):
+        """
+        Descarta el lote sin confirmar (al cerrarse el canal RabbitMQ reentrega esos
+        mensajes) y devuelve cuántos eventos se descartaron
+        """
+        dropped = len(self._pending)
+        self._pending, self._last_tag = {}, None
+        return dropped
+
+    def start(self):
+        """Arranca el vaciado periódico del lote"""
+        if self._timer_task is None:
+            self._timer_task = asyncio.get_running_loop().create_task(self._flush_periodically())
+
+    async def stop(self):
+        """Detiene el vaciado periódico y aplica lo pendiente"""
+        if self._timer_task is not None:
+            self._timer_task.cancel()
+            self._timer_task = None
+        await self.flush()
+
+    def _schedule_flush(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.max_wait)
+            await self.flush()
+
+    async def flush(self):
+        """Aplica el lote actual a MongoDB y lo confirma"""
+        async with self._lock:
+            if self._last_tag is None:
+                return
+            pending, last_tag = self._pending, self._last_tag
+            self._pending, self._last_tag = {}, None
+
+            try:
+                await self._apply(pending)
+            except Exception as e:
+                logger.error(f"Error aplicando lote de {len(pending)} eventos: {str(e)}")
+                self.nack(last_tag)
+                return
+
+            self.ack(last_tag)
+            self.processed += len(pending)
+
+    async def _apply(self, pending):
+        """Escribe los eventos en las colecciones espejo y refresca las características"""
+        operations = {}
+        changed = {}
+        for (entity, record_id), (action, data) in pending.items():
+            if action == "delete":
+                operations.setdefault(entity, []).append(DeleteOne({"id": record_id}))
+            else:
+                operations.setdefault(entity, []).append(ReplaceOne({"id": record_id}, data, upsert=True))
+            changed.setdefault(entity, []).append(data)
+
+        # Los prestatarios se resuelven antes de escribir para no perder los registros
+        # eliminados ni el padre anterior de los que cambiaron de padre
+        borrower_ids = set()
+        if settings.FEATURE_STORE_MATERIALIZED:
+            for entity, records in changed.items():
+                link_field = BORROWER_LINK_FIELDS[entity]
+                records = [record for record in records if link_field in record]
+                records += await previous_borrower_links(self.mongo_db, entity, changed[entity])
+                borrower_ids |= await resolve_borrower_ids(self.mongo_db, entity, records)
+
+        for entity, entity_operations in operations.items():
+            await self.mongo_db[entity].bulk_write(entity_operations, ordered=True)
+            record_sync_batch(entity, "events", changed[entity])
+
+        if borrower_ids:
+            await refresh_borrower_features(self.mongo_db, borrower_ids)
+
+class RabbitMQEventConsumer:
+    """
+    Consumidor de las colas de eventos de usuarios, préstamos y pagos.
+
+    Usa el adaptador asyncio de pika sobre el event loop de la aplicación, limita los
+    mensajes sin confirmar con basic_qos(prefetch_count) y confirma por lotes con
+    basic_ack(multiple=True). Si se cierra el canal se descarta el lote sin confirmar y
+    se abre otro; si se pierde la conexión, se reintenta. Los tags de entrega solo valen
+    en su canal, así que se guardan como (canal, tag) y nunca se confirman en otro.
+    """
+
+    def __init__(self, mongo_db, queues=None):
+        self.queues = queues or list(QUEUE_ENTITIES)
+        self.processor = EventBatchProcessor(
+            mongo_db,
+            ack=self._ack,
+            nack=self._nack,
+            batch_size=settings.EVENT_BATCH_SIZE,
+            max_wait_ms=settings.EVENT_BATCH_MAX_WAIT_MS,
+        )
+        self._connection = None
+        self._channel = None
+        self._stopping = False
+
+    async def start(self):
+        """Abre la conexión y empieza a consumir"""
+        self._stopping = False
+        self.processor.start()
+        self._connect()
+
+    async def stop(self):
+        """Aplica lo pendiente y cierra la conexión"""
+        self._stopping = True
+        await self.processor.stop()
+        if self._connection is not None and not self._connection.is_closed:
+            self._connection.close()
+
+    def _connect(self):
+        logger.info(f"Conectando a RabbitMQ en {settings.RABBITMQ_HOST}:{settings.RABBITMQ_PORT}")
+        self._connection = AsyncioConnection(
+            pika.URLParameters(settings.rabbitmq_url),
+            on_open_callback=self._on_connection_open,
+            on_open_error_callback=self._on_connection_error,
+            on_close_callback=self._on_connection_closed,
+            custom_ioloop=asyncio.get_running_loop(),
+        )
+
+    def _reconnect_later(self):
+        if not self._stopping:
+            asyncio.get_running_loop().call_later(settings.EVENT_RECONNECT_SECONDS, self._connect)
+
+    def _on_connection_error(self, connection, error):
+        logger.error(f"No se pudo conectar a RabbitMQ: {error}")
+        self._reconnect_later()
+
+    def _on_connection_closed(self, connection, reason):
+        self._channel = None
+        self.processor.reset()
+        if not self._stopping:
+            logger.warning(f"Conexión a RabbitMQ cerrada: {reason}. Reintentando...")
+            self._reconnect_later()
+
+    def _on_connection_open(self, connection):
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _open_channel(self):
+        if self._stopping or self._channel is not None:
+            return
+        if self._connection is not None and self._connection.is_open:
+            self._connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_channel_open(self, channel):
+        self._channel = channel
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.basic_qos(prefetch_count=settings.RABBITMQ_PREFETCH, callback=lambda _: self._start_consuming())
+
+    def _on_channel_closed(self, channel, reason):
+        if channel is not self._channel:
+            return
+        self._channel = None
+        dropped = self.processor.reset()
+        if not self._stopping:
+            logger.warning(
+                f"Canal de RabbitMQ cerrado: {reason}. Se descartan {dropped} eventos sin confirmar "
+                f"(RabbitMQ los reentrega). Reabriendo el canal..."
+            )
+            # Si se cerró toda la conexión, la reconexión la hace _on_connection_closed
+            asyncio.get_running_loop().call_later(settings.EVENT_RECONNECT_SECONDS, self._open_channel)
+
+    def _start_consuming(self):
+        for queue in self.queues:
+            self._channel.queue_declare(queue=queue, durable=True)
+            self._channel.basic_consume(
+                queue=queue,
+                on_message_callback=lambda channel, method, properties, body, queue=queue: (
+                    self.processor.add(queue, (channel, method.delivery_tag), body)
+                ),
+            )
+        logger.info(f"Consumiendo eventos de: {', '.join(self.queues)}")
+
+    def _delivery_channel(self, tag):
+        """Canal del tag si sigue siendo el actual y está abierto (si no, no se confirma)"""
+        channel, _ = tag
+        if channel is self._channel and channel.is_open:
+            return channel
+        logger.warning("Se omite la confirmación de un lote de un canal ya cerrado")
+        return None
+
+    def _ack(self, tag):
+        channel = self._delivery_channel(tag)
+        if channel is not None:
+            channel.basic_ack(delivery_tag=tag[1], multiple=True)
+
+    def _nack(self, tag):
+        channel = self._delivery_channel(tag)
+        if channel is not None:
+            channel.basic_nack(delivery_tag=tag[1], multiple=True, requeue=True)
@@ -0,0 +1,239 @@
+import asyncio
+import datetime
+import logging
+import re
+import threading
+from bson import Decimal128
+from sqlalchemy import select, func
+from sqlalchemy import types as sqltypes
+from sqlalchemy.dialects import postgresql
+import app.config.postgres_conection as postgres_conection
+from app.config.postgres_conection import get_table, get_primary_key
+from app.config.settings import settings
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Marca de nulo del formato texto de COPY
+COPY_NULL = "\\N"
+
+# Secuencias de escape que emite COPY TO en formato texto
+_COPY_ESCAPES = {"b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t", "v": "\v", "\\": "\\"}
+_COPY_ESCAPE_PATTERN = re.compile(r"\\(.)")
+
+# Tipos de intervalo (el INTERVAL que refleja PostgreSQL no hereda de sqltypes.Interval)
+_INTERVAL_TYPES = (sqltypes.Interval, postgresql.INTERVAL)
+
+def _copy_text(value):
+    if "\\" not in value:
+        return value
+    return _COPY_ESCAPE_PATTERN.sub(lambda match: _COPY_ESCAPES.get(match.group(1), match.group(1)), value)
+
+def _copy_bool(value):
+    return value == "t"
+
+def _copy_decimal128(value):
+    return Decimal128(value)
+
+# datetime.fromisoformat acepta fechas ("2025-01-01" → medianoche), fechas con hora
+# y zonas horarias ("+00"), que es lo que COPY emite con DateStyle ISO
+_copy_datetime = datetime.datetime.fromisoformat
+
+def _copy_parser(column_type, money_as_decimal128):
+    """
+    Función que convierte el texto de COPY de un tipo de columna al valor que se guarda
+    en MongoDB (el mismo que produce build_record_converter), o None si no está soportado
+    """
+    if isinstance(column_type, (sqltypes.Enum, sqltypes.String)):
+        return _copy_text
+    if isinstance(column_type, sqltypes.Boolean):
+        return _copy_bool
+    if isinstance(column_type, sqltypes.Integer):
+        return int
+    if isinstance(column_type, sqltypes.Float):
+        return float
+    if isinstance(column_type, sqltypes.Numeric):
+        if money_as_decimal128 and column_type.asdecimal:
+            return _copy_decimal128
+        return float
+    if isinstance(column_type, (sqltypes.DateTime, sqltypes.Date)):
+        return _copy_datetime
+    if isinstance(column_type, _INTERVAL_TYPES):
+        # Se extraen los segundos en la consulta (EXTRACT(EPOCH ...))
+        return float
+    return None
+
+def build_copy_decoder(table, money_as_decimal128=False):
+    """
+    Compila una función que convierte una línea de COPY (formato texto) en un documento
+    de MongoDB, o devuelve None si la tabla tiene columnas de tipos no soportados
+    """
+    names = [column.name for column in table.columns]
+    parsers = [_copy_parser(column.type, money_as_decimal128) for column in table.columns]
+    if None in parsers:
+        return None
+    fields = list(zip(names, parsers))
+
+    def decode(line):
+        return {
+            name: None if value == COPY_NULL else parse(value)
+            for (name, parse), value in zip(fields, line.split("\t"))
+        }
+
+    return decode
+
+def copy_query(table, pk_column, low, high):
+    """Consulta SELECT de un rango [low, high) de la clave primaria, lista para COPY"""
+    columns = [
+        func.extract("epoch", column).label(column.name) if isinstance(column.type, _INTERVAL_TYPES) else column
+        for column in table.columns
+    ]
+    query = select(*columns).where(pk_column >= low, pk_column < high)
+    return str(query.compile(postgres_conection.engine, compile_kwargs={"literal_binds": True}))
+
+def supports_copy(table_name):
+    """La extracción por rangos requiere una clave primaria entera y tipos soportados"""
+    table = get_table(table_name)
+    pk_column = table.columns[get_primary_key(table_name)]
+    if not isinstance(pk_column.type, sqltypes.Integer):
+        return False
+    return build_copy_decoder(table) is not None
+
+def split_pk_ranges(table_name, parts, min_range_size=1):
+    """Divide la clave primaria de una tabla en hasta `parts` rangos [low, high) contiguos"""
+    table = get_table(table_name)
+    pk_column = table.columns[get_primary_key(table_name)]
+    with postgres_conection.engine.connect() as connection:
+        low, high = connection.execute(select(func.min(pk_column), func.max(pk_column))).one()
+    if low is None:
+        return []
+
+    span = high - low + 1
+    parts = max(1, min(parts, span // max(min_range_size, 1)))
+    step = -(-span // parts)
+    return [(start, min(start + step, high + 1)) for start in range(low, high + 1, step)]
+
+class CopyAborted(Exception):
+    """La lectura se canceló porque el consumidor dejó de recibir bloques"""
+
+class _CopyBatchWriter:
+    """
+    Destino de COPY TO STDOUT: recibe los bloques de bytes de psycopg2, los separa en
+    líneas completas, las decodifica y entrega lotes de `chunk_size` documentos
+    """
+
+    def __init__(self, decode, chunk_size, emit):
+        self.decode = decode
+        self.chunk_size = chunk_size
+        self.emit = emit
+        self._partial = b""
+        self._batch = []
+
+    def write(self, data):
+        data = self._partial + data
+        end = data.rfind(b"\n")
+        if end < 0:
+            self._partial = data
+            return
+        self._partial = data[end + 1:]
+        decode = self.decode
+        batch = self._batch
+        for line in data[:end].decode("utf-8").split("\n"):
+            batch.append(decode(line))
+        while len(batch) >= self.chunk_size:
+            self.emit(batch[:self.chunk_size])
+            del batch[:self.chunk_size]
+
+    def finish(self):
+        if self._partial:
+            self._batch.append(self.decode(self._partial.decode("utf-8")))
+            self._partial = b""
+        if self._batch:
+            self.emit(self._batch)
+            self._batch = []
+
+def _copy_range(table, pk_column, low, high, decode, chunk_size, emit):
+    """Lee un rango con COPY (SELECT ...) TO STDOUT por una conexión propia del pool"""
+    sql = f"COPY ({copy_query(table, pk_column, low, high)}) TO STDOUT"
+    writer = _CopyBatchWriter(decode, chunk_size, emit)
+    connection = postgres_conection.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SET LOCAL DateStyle TO 'ISO'")
+        cursor.copy_expert(sql, writer, size=1 << 20)
+        writer.finish()
+    finally:
+        connection.rollback()
+        connection.close()
+
+def _select_range(table, pk_column, low, high, convert, chunk_size, emit):
+    """
+    Alternativa para motores sin COPY (por ejemplo SQLite en pruebas locales): SELECT
+    del rango con una conexión propia, por particiones de tuplas
+    """
+    names = [column.name for column in table.columns]
+    query = select(*table.columns).where(pk_column >= low, pk_column < high)
+    with postgres_conection.engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+        for rows in result.tuples().partitions():
+            emit([convert(dict(zip(names, row))) for row in rows])
+
+async def aiter_copy_batches(table_name, convert, chunk_size=None, workers=None):
+    """
+    Lee una tabla completa en paralelo, dividida en rangos de clave primaria leídos en
+    hilos con conexiones separadas, y entrega lotes de documentos ya convertidos.
+
+    En PostgreSQL cada rango se extrae con COPY TO STDOUT y se decodifica directamente
+    del texto; `convert` (el conversor compilado) solo se usa con otros motores. La cola
+    de lotes está acotada, así que los lectores esperan si MongoDB va más lento.
+    """
+    chunk_size = chunk_size or settings.SYNC_CHUNK_SIZE
+    workers = workers or settings.SYNC_COPY_WORKERS
+    loop = asyncio.get_running_loop()
+
+    table = await asyncio.to_thread(get_table, table_name)
+    pk_column = table.columns[get_primary_key(table_name)]
+    ranges = await asyncio.to_thread(split_pk_ranges, table_name, workers, chunk_size)
+    if postgres_conection.engine.dialect.name == "postgresql":
+        read_range, decode = _copy_range, build_copy_decoder(table, settings.SYNC_MONEY_AS_DECIMAL128)
+    else:
+        read_range, decode = _select_range, convert
+
+    queue = asyncio.Queue(maxsize=workers * 2)
+    cancelled = threading.Event()
+
+    def emit(batch):
+        if cancelled.is_set():
+            raise CopyAborted()
+        asyncio.run_coroutine_threadsafe(queue.put(batch), loop).result()
+
+    def read(low, high):
+        try:
+            read_range(table, pk_column, low, high, decode, chunk_size, emit)
+        except Exception:
+            # Si un rango falla, los demás se detienen en su próximo lote
+            cancelled.set()
+            raise
+
+    readers = asyncio.gather(*(asyncio.to_thread(read, low, high) for low, high in ranges), return_exceptions=True)
+    readers.add_done_callback(lambda _: loop.create_task(queue.put(None)))
+    try:
+        while True:
+            batch = await queue.get()
+            if batch is None:
+                break
+            yield batch
+    finally:
+        if not readers.done():
+            # El consumidor terminó antes: desbloquear a los lectores que esperan en la cola
+            cancelled.set()
+            while not readers.done():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    await asyncio.sleep(0.01)
+
+    # Propagar el error de lectura original (no las cancelaciones que provocó)
+    for result in readers.result():
+        if isinstance(result, Exception) and not isinstance(result, CopyAborted):
+            raise result
@@ -0,0 +1,121 @@
+import asyncio
+import datetime
+import logging
+import os
+import socket
+import uuid
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Colección con los documentos de arrendamiento (un documento por tarea)
+LEASES_COLLECTION = "sync_leases"
+
+class LeaseLostError(RuntimeError):
+    """El lease dejó de ser nuestro mientras se ejecutaba la tarea protegida"""
+
+class SyncLease:
+    """
+    Arrendamiento (lease) en MongoDB para que una sola réplica ejecute una tarea a la vez.
+
+    El documento {_id: nombre} guarda el dueño y la hora de expiración. Se adquiere si no
+    existe, si expiró o si ya es nuestro; mientras se tiene se renueva periódicamente, de
+    modo que si el proceso muere otra réplica puede tomarlo al vencer `ttl_seconds`.
+
+    Si la renovación falla (otra réplica tomó el lease o no se pudo renovar antes de que
+    venciera) se cancela la tarea que lo adquirió y el bloque `async with` termina con
+    LeaseLostError, para que nunca escriban dos réplicas a la vez.
+
+    Uso:
+        async with SyncLease(mongo_db) as acquired:
+            if acquired:
+                ...
+    """
+
+    def __init__(self, mongo_db, name="data_sync", ttl_seconds=300):
+        self.collection = mongo_db[LEASES_COLLECTION]
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._renew_task = None
+        self._holder_task = None
+        self._expires_at = None
+        self.acquired = False
+        self.lost = False
+
+    async def acquire(self):
+        """Intenta tomar el lease; devuelve True si lo consiguió"""
+        now = datetime.datetime.utcnow()
+        try:
+            document = await self.collection.find_one_and_update(
+                {"_id": self.name, "$or": [{"expires_at": {"$lte": now}}, {"owner": self.owner}]},
+                {"$set": {
+                    "owner": self.owner,
+                    "acquired_at": now,
+                    "expires_at": now + datetime.timedelta(seconds=self.ttl_seconds),
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # El documento existe, no expiró y pertenece a otra réplica
+            return False
+        acquired = document is not None and document.get("owner") == self.owner
+        if acquired:
+            self._expires_at = document["expires_at"]
+            self._holder_task = asyncio.current_task()
+            self._renew_task = asyncio.get_running_loop().create_task(self._renew_periodically())
+        return acquired
+
+    async def release(self):
+        """Libera el lease si sigue siendo nuestro"""
+        if self._renew_task is not None:
+            self._renew_task.cancel()
+            self._renew_task = None
+        await self.collection.delete_one({"_id": self.name, "owner": self.owner})
+
+    async def holder(self):
+        """Dueño actual del lease vigente, o None"""
+        document = await self.collection.find_one({"_id": self.name, "expires_at": {"$gt": datetime.datetime.utcnow()}})
+        return document.get("owner") if document else None
+
+    async def renew(self):
+        """Extiende la expiración del lease; devuelve False si ya no es nuestro"""
+        expires_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=self.ttl_seconds)
+        result = await self.collection.update_one(
+            {"_id": self.name, "owner": self.owner},
+            {"$set": {"expires_at": expires_at}},
+        )
+        if result.matched_count == 0:
+            return False
+        self._expires_at = expires_at
+        return True
+
+    async def _renew_periodically(self):
+        while True:
+            await asyncio.sleep(self.ttl_seconds / 3)
+            try:
+                renewed = await self.renew()
+            except Exception as e:
+                logger.error(f"Error al renovar el lease '{self.name}': {str(e)}")
+                # Mientras no venza se reintenta; vencido, otra réplica puede tomarlo
+                renewed = datetime.datetime.utcnow() < self._expires_at
+            if not renewed:
+                logger.warning(f"Se perdió el lease '{self.name}', se cancela la tarea en curso")
+                self.lost = True
+                self._holder_task.cancel()
+                return
+
+    async def __aenter__(self):
+        self.acquired = await self.acquire()
+        return self.acquired
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        if self.acquired:
+            await self.release()
+        if self.lost and exc_type is asyncio.CancelledError:
+            # La cancelación la pidió el lease, no el llamador: se informa como error
+            self._holder_task.uncancel()
+            raise LeaseLostError(f"Se perdió el lease '{self.name}' durante la ejecución") from exc
@@ -1,11 +1,15 @@
 import asyncio
-import time
 import signal
-import os
+import random
+import time
 from datetime import datetime
 import logging
 from dotenv import load_dotenv
-from sync.data_sync import scheduled_sync, run_initial_sync
+from app.config.database import init_mongodb
+from app.config.postgres_conection import init_postgres_models
+from app.config.settings import settings
+from app.sync.data_sync import sync_all_tables
+from app.sync.sync_lease import SyncLease
 
 # Cargar variables de entorno
 load_dotenv()
@@ -14,57 +18,103 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Tiempo entre sincronizaciones (en segundos)
-SYNC_INTERVAL = int(os.getenv("SYNC_INTERVAL_MINUTES", "60")) * 60
+def seconds_until_next_run(now=None):
+    """
+    Segundos hasta la próxima sincronización programada.
 
-# Control de ejecución
-running = True
+    Con SYNC_CRON (requiere croniter) se usa la expresión cron; si no, el intervalo
+    SYNC_INTERVAL_MINUTES. En ambos casos se suma un retardo aleatorio de hasta
+    SYNC_JITTER_SECONDS para que las réplicas no disparen a la vez.
+    """
+    now = now or datetime.now()
+    delay = settings.SYNC_INTERVAL_MINUTES * 60
+    if settings.SYNC_CRON:
+        try:
+            from croniter import croniter
+            delay = (croniter(settings.SYNC_CRON, now).get_next(datetime) - now).total_seconds()
+        except ImportError:
+            logger.warning("SYNC_CRON requiere el paquete croniter; se usa SYNC_INTERVAL_MINUTES")
+    return max(delay, 0) + random.uniform(0, settings.SYNC_JITTER_SECONDS)
 
-def signal_handler(sig, frame):
-    """Manejador de señales para detener el servicio limpiamente"""
-    global running
-    logger.info("Señal de detención recibida. Deteniendo servicio...")
-    running = False
+class SyncScheduler:
+    """
+    Programador de la sincronización continua PostgreSQL → MongoDB.
 
-async def continuous_sync():
-    """Servicio de sincronización continua"""
-    try:
-        # Realizar sincronización inicial
+    - Solo una réplica sincroniza a la vez (SyncLease); las demás omiten la ejecución.
+    - Las ejecuciones son secuenciales: la espera hasta la siguiente empieza al terminar
+      la anterior. Si se pierde el lease, la ejecución en curso se cancela y cuenta como fallo.
+    - Tras un fallo se reintenta con espera exponencial (SYNC_RETRY_SECONDS, duplicando
+      hasta el intervalo normal).
+    """
+
+    def __init__(self, mongo_db):
+        self.mongo_db = mongo_db
+        self.stop_event = asyncio.Event()
+        self.failures = 0
+
+    def stop(self):
+        """Pide la detención del servicio (desde un manejador de señales)"""
+        logger.info("Señal de detención recibida. Deteniendo servicio...")
+        self.stop_event.set()
+
+    async def run_once(self):
+        """Ejecuta una sincronización; devuelve True si tuvo éxito o si otra réplica la tiene"""
+        try:
+            async with SyncLease(self.mongo_db, ttl_seconds=settings.SYNC_LEASE_SECONDS) as acquired:
+                if not acquired:
+                    logger.info("Otra réplica está sincronizando, se omite esta ejecución")
+                    return True
+                started = time.perf_counter()
+                await asyncio.to_thread(init_postgres_models)
+                results = await sync_all_tables(mongo_db=self.mongo_db)
+                success = all(result["success"] for result in results.values())
+                logger.info(f"Sincronización {'completada' if success else 'con errores'} en {time.perf_counter() - started:.2f}s")
+                return success
+        except Exception as e:
+            logger.error(f"Error en la sincronización: {str(e)}")
+            return False
+
+    def next_delay(self, success):
+        """Espera hasta la próxima ejecución según el resultado de la anterior"""
+        if success:
+            self.failures = 0
+            return seconds_until_next_run()
+        self.failures += 1
+        backoff = settings.SYNC_RETRY_SECONDS * 2 ** (self.failures - 1)
+        return min(backoff, seconds_until_next_run())
+
+    async def run(self):
+        """Bucle principal: sincroniza, espera y repite hasta recibir la señal de detención"""
         logger.info("Realizando sincronización inicial...")
-        await scheduled_sync()
-        
-        # Bucle principal de sincronización
-        while running:
-            logger.info(f"Esperando {SYNC_INTERVAL} segundos para la próxima sincronización...")
-            for _ in range(SYNC_INTERVAL):
-                if not running:
+        success = await self.run_once()
+        while not self.stop_event.is_set():
+            delay = self.next_delay(success)
+            logger.info(f"Próxima sincronización en {delay:.0f} segundos")
+            try:
+                await asyncio.wait_for(self.stop_event.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                if self.stop_event.is_set():
                     break
-                await asyncio.sleep(1)
-            
-            if running:
                 logger.info("Ejecutando sincronización programada...")
-                await scheduled_sync()
-    
-    except Exception as e:
-        logger.error(f"Error en el servicio de sincronización: {str(e)}")
-    
-    finally:
+                success = await self.run_once()
         logger.info("Servicio de sincronización detenido.")
 
+async def continuous_sync():
+    """Servicio de sincronización continua"""
+    mongo_db = await init_mongodb()
+    scheduler = SyncScheduler(mongo_db)
+
+    # Detener limpiamente con SIGINT/SIGTERM (la sincronización en curso termina antes)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, scheduler.stop)
+
+    await scheduler.run()
+
 def start_sync_service():
     """Inicia el servicio de sincronización"""
-    # Registrar manejadores de señales
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
-    
     logger.info("Iniciando servicio de sincronización...")
-    
-    # Ejecutar el servicio en un bucle de eventos
-    loop = asyncio.get_event_loop()
-    try:
-        loop.run_until_complete(continuous_sync())
-    finally:
-        loop.close()
+    asyncio.run(continuous_sync())
 
 if __name__ == "__main__":
-    start_sync_service()
\ No newline at end of file
+    start_sync_service()
@@ -0,0 +1,123 @@
+"""
+Benchmark: mutaciones GraphQL de punta a punta (HTTP → FastAPI → Strawberry →
+servicio de scoring) con el cliente de pruebas ASGI, sin servidor ni bases de datos.
+También mide la misma mutación como consulta persistida (solo el hash) y los
+endpoints REST /score y /score/batch.
+
+No se ejecutan los eventos de inicio de la aplicación: el modelo se carga de forma
+diferida en la primera predicción y el historial queda deshabilitado.
+
+Uso:
+    python -m benchmarks.bench_graphql [--requests 2000] [--batch-size 100]
+"""
+import argparse
+import hashlib
+import logging
+import time
+from fastapi.testclient import TestClient
+from app.main import app
+from benchmarks.common import FEATURE_NAMES, measurement, latency_measurements, synthetic_features
+
+PREDICT_SCORE_MUTATION = """
+mutation PredictScore($input: ScorePredictionInput!) {
+  predictScore(inputData: $input) { score category riskLevel explanation }
+}
+"""
+
+PREDICT_SCORE_BATCH_MUTATION = """
+mutation PredictScoreBatch($columns: ScoreBatchColumnsInput!) {
+  predictScoreBatch(columns: $columns) { score category riskLevel explanation }
+}
+"""
+
+def _camel_case(name):
+    first, *rest = name.split("_")
+    return first + "".join(part.capitalize() for part in rest)
+
+def _post(client, query, variables, extensions=None):
+    payload = {"query": query, "variables": variables}
+    if extensions is not None:
+        payload["extensions"] = extensions
+    response = client.post("/graphql", json=payload)
+    body = response.json()
+    if response.status_code != 200 or body.get("errors"):
+        raise RuntimeError(f"La mutación falló: {response.status_code} {body.get('errors')}")
+    return body
+
+def _post_rest(client, path, values):
+    response = client.post(path, json=values)
+    if response.status_code != 200:
+        raise RuntimeError(f"La solicitud a {path} falló: {response.status_code} {response.text}")
+    return response.json()
+
+def run(requests=2000, batch_size=100, batches=50):
+    """Ejecuta el benchmark y devuelve las mediciones"""
+    # El cliente HTTP registra cada solicitud en INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    client = TestClient(app)
+
+    records = synthetic_features(requests)
+    inputs = [{_camel_case(name): value for name, value in record.items()} for record in records]
+    batch_records = synthetic_features(batch_size, seed=7)
+    columns = {_camel_case(name): [record[name] for record in batch_records] for name in FEATURE_NAMES}
+
+    # Calentamiento (carga del modelo, primer esquema)
+    _post(client, PREDICT_SCORE_MUTATION, {"input": inputs[0]})
+    _post(client, PREDICT_SCORE_BATCH_MUTATION, {"columns": columns})
+
+    samples = []
+    for input_data in inputs:
+        started = time.perf_counter()
+        _post(client, PREDICT_SCORE_MUTATION, {"input": input_data})
+        samples.append(time.perf_counter() - started)
+    results = latency_measurements("graphql.predict_score", samples)
+    results["graphql.predict_score.requests_per_s"] = measurement(len(samples) / sum(samples), "req/s", "higher")
+
+    samples = []
+    for _ in range(batches):
+        started = time.perf_counter()
+        _post(client, PREDICT_SCORE_BATCH_MUTATION, {"columns": columns})
+        samples.append(time.perf_counter() - started)
+    results.update(latency_measurements("graphql.predict_score_batch", samples))
+    results["graphql.predict_score_batch.rows_per_s"] = measurement(batch_size * len(samples) / sum(samples), "rows/s", "higher")
+
+    # Consulta persistida: se registra una vez y después se envía solo el hash
+    persisted = {"persistedQuery": {"version": 1, "sha256Hash": hashlib.sha256(PREDICT_SCORE_MUTATION.encode("utf-8")).hexdigest()}}
+    _post(client, PREDICT_SCORE_MUTATION, {"input": inputs[0]}, persisted)
+    samples = []
+    for input_data in inputs:
+        started = time.perf_counter()
+        _post(client, None, {"input": input_data}, persisted)
+        samples.append(time.perf_counter() - started)
+    results.update(latency_measurements("graphql.predict_score_persisted", samples))
+
+    # REST: arreglos planos de características
+    rows = [[record[name] for name in FEATURE_NAMES] for record in records]
+    flat_batch = [record[name] for record in batch_records for name in FEATURE_NAMES]
+    _post_rest(client, "/score", rows[0])
+    samples = []
+    for row in rows:
+        started = time.perf_counter()
+        _post_rest(client, "/score", row)
+        samples.append(time.perf_counter() - started)
+    results.update(latency_measurements("rest.score", samples))
+    results["rest.score.requests_per_s"] = measurement(len(samples) / sum(samples), "req/s", "higher")
+
+    samples = []
+    for _ in range(batches):
+        started = time.perf_counter()
+        _post_rest(client, "/score/batch", flat_batch)
+        samples.append(time.perf_counter() - started)
+    results.update(latency_measurements("rest.score_batch", samples))
+    results["rest.score_batch.rows_per_s"] = measurement(batch_size * len(samples) / sum(samples), "rows/s", "higher")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--batches", type=int, default=50)
+    args = parser.parse_args()
+
+    for name, result in run(args.requests, args.batch_size, args.batches).items():
+        print(f"{name:45s} {result['value']:14,.1f} {result['unit']}")
@@ -0,0 +1,98 @@
+"""
+Microbenchmark: conversión de registros PostgreSQL → documentos MongoDB.
+
+Compara convert_postgres_record (isinstance por celda) con el conversor
+compilado por tabla (build_record_converter) sobre filas sintéticas con la
+forma de las tablas loan y monthly_payment.
+
+Uso:
+    python -m benchmarks.bench_record_converter [--rows 200000] [--repeat 5]
+"""
+import argparse
+import datetime
+import decimal
+import random
+import time
+from sqlalchemy import MetaData, Table, Column, Integer, String, Numeric, DateTime, Date, Boolean
+from app.sync.data_sync import convert_postgres_record, build_record_converter
+
+def build_tables():
+    """Tablas con los tipos de columna de loan y monthly_payment"""
+    metadata = MetaData()
+    loan = Table(
+        "loan", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("id_offer", Integer),
+        Column("loan_amount", Numeric(12, 2)),
+        Column("start_date", DateTime),
+        Column("end_date", DateTime),
+        Column("hash_blockchain", String),
+        Column("current_status", String),
+        Column("late_payment_count", Integer),
+        Column("last_status_update", DateTime),
+        Column("created_at", DateTime),
+        Column("updated_at", DateTime),
+    )
+    monthly_payment = Table(
+        "monthly_payment", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("id_loan", Integer),
+        Column("due_date", Date),
+        Column("borrow_verified", Boolean),
+        Column("partner_verified", Boolean),
+        Column("days_late", Integer),
+        Column("penalty_amount", Numeric(12, 2)),
+        Column("payment_status", String),
+    )
+    return loan, monthly_payment
+
+def synthetic_records(table, rows, seed=42):
+    """Genera filas con valores del tipo que devuelve psycopg2 para cada columna"""
+    rng = random.Random(seed)
+    now = datetime.datetime(2025, 5, 19, 22, 39)
+    generators = {
+        Integer: lambda: rng.randint(0, 100000),
+        Numeric: lambda: decimal.Decimal(rng.randint(0, 10000000)) / 100,
+        DateTime: lambda: now - datetime.timedelta(minutes=rng.randint(0, 500000)),
+        Date: lambda: (now - datetime.timedelta(days=rng.randint(0, 1000))).date(),
+        Boolean: lambda: rng.random() < 0.5,
+        String: lambda: rng.choice(["al_dia", "en_mora", "mora_grave", "pagado", "pendiente"]),
+    }
+    columns = [(column.name, generators[type(column.type)]) for column in table.columns]
+    return [{name: generate() for name, generate in columns} for _ in range(rows)]
+
+def best_rate(function, records, repeat):
+    """Mejor tasa (filas/s) de `repeat` pasadas de `function` sobre `records`"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for record in records:
+            function(record)
+        best = min(best, time.perf_counter() - started)
+    return len(records) / best
+
+def run(rows=200000, repeat=5):
+    """Ejecuta el benchmark y devuelve filas/s por tabla y conversor"""
+    results = {}
+    for table in build_tables():
+        records = synthetic_records(table, rows)
+        compiled = build_record_converter(table)
+        results[table.name] = {
+            "convert_postgres_record": best_rate(convert_postgres_record, records, repeat),
+            "build_record_converter": best_rate(compiled, records, repeat),
+        }
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for table_name, rates in run(args.rows, args.repeat).items():
+        baseline = rates["convert_postgres_record"]
+        compiled = rates["build_record_converter"]
+        print(
+            f"{table_name:16s} convert_postgres_record: {baseline:12,.0f} filas/s | "
+            f"compilado: {compiled:12,.0f} filas/s | x{compiled / baseline:.2f}"
+        )
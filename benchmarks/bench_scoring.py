@@ -0,0 +1,71 @@
+"""
+Benchmark: latencia de ScorePredictionService.predict_score por llamada y
+throughput de la ruta vectorizada (predict_scores_batch y build_batch_results).
+
+Uso:
+    python -m benchmarks.bench_scoring [--calls 5000] [--rows 100000] [--mode synthetic]
+"""
+import argparse
+import time
+import numpy as np
+from app.ml.services.score_cache import ScoreCache
+from app.ml.services.score_service import ScorePredictionService
+from benchmarks.common import FEATURE_NAMES, measurement, latency_measurements, synthetic_features
+
+def time_calls(function, inputs):
+    """Duración (s) de cada llamada a `function` con cada entrada"""
+    samples = []
+    for input_data in inputs:
+        started = time.perf_counter()
+        function(input_data)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+def best_rows_per_second(function, features, repeat):
+    """Mejor tasa (filas/s) de `repeat` llamadas a `function` con la matriz completa"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(features)
+        best = min(best, time.perf_counter() - started)
+    return features.shape[0] / best
+
+def run(calls=5000, rows=100000, repeat=3, mode="synthetic"):
+    """Ejecuta el benchmark y devuelve las mediciones"""
+    service = ScorePredictionService(mode=mode)
+    service.ensure_loaded()
+    inputs = synthetic_features(calls)
+    features = np.array([[record[name] for name in FEATURE_NAMES] for record in synthetic_features(rows, seed=7)])
+
+    # Calentamiento (primera inferencia, cachés de NumPy)
+    service.predict_score(inputs[0])
+    service.predict_scores_batch(features[:100])
+
+    results = {}
+    # Sin caché: cada llamada calcula el score
+    cache = service.cache
+    service.cache = ScoreCache(max_size=0)
+    results.update(latency_measurements("scoring.predict_score", time_calls(service.predict_score, inputs)))
+    # Con caché: la misma entrada repetida
+    service.cache = cache
+    results.update(latency_measurements("scoring.predict_score_cached", time_calls(service.predict_score, [inputs[0]] * calls)))
+
+    results["scoring.predict_scores_batch.rows_per_s"] = measurement(
+        best_rows_per_second(service.predict_scores_batch, features, repeat), "rows/s", "higher"
+    )
+    results["scoring.batch_results.rows_per_s"] = measurement(
+        best_rows_per_second(service._predict_rows, features, repeat), "rows/s", "higher"
+    )
+    service.executor.shutdown()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mode", choices=["synthetic", "model"], default="synthetic")
+    args = parser.parse_args()
+
+    for name, result in run(args.calls, args.rows, args.repeat, args.mode).items():
+        print(f"{name:45s} {result['value']:14,.1f} {result['unit']}")
@@ -0,0 +1,284 @@
+"""
+Benchmark: sincronización completa e incremental (sync_table_to_mongodb) de las
+cinco tablas, sobre tablas sintéticas del tamaño indicado.
+
+La incremental se mide sobre ~1% de filas modificadas (más otras tantas nuevas en las
+tablas sin updated_at), partiendo de la marca de agua que deja la sincronización
+completa (el caso habitual en producción). Después se mide una incremental con la
+comparación completa de las tablas sin updated_at (la que se hace cada
+SYNC_REFRESH_EVERY ejecuciones) y se verifica que todas las modificaciones llegaron.
+
+Por defecto el origen es una base SQLite temporal y el destino mongomock (paquete
+opcional mongomock-motor). Con --database-url se usa otra base de pruebas (por ejemplo
+un PostgreSQL local; las tablas se crean y se llenan, así que NO debe ser una base real)
+y con --mongo-uri un mongod local (se usa y se elimina la base benchmark_sync).
+Con mongomock buena parte del tiempo es del propio mongomock (filtra sin índices), así
+que los números solo son comparables entre ejecuciones con el mismo destino.
+
+Uso:
+    python -m benchmarks.bench_sync [--rows 20000] [--payments-per-loan 6]
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import random
+import tempfile
+import time
+from sqlalchemy import create_engine, select, func, MetaData, Table, Column, Integer, String, Numeric, DateTime, Date, Boolean
+import app.config.postgres_conection as postgres_conection
+from app.config.postgres_conection import get_primary_key, get_watermark_column, has_change_tracking
+from app.config.settings import settings
+from app.sync.data_sync import TABLES_TO_SYNC, sync_table_to_mongodb
+from benchmarks.common import measurement
+
+# Base de MongoDB usada con --mongo-uri
+BENCHMARK_DATABASE = "benchmark_sync"
+
+def build_tables(metadata):
+    """Tablas con las columnas que usa el servicio"""
+    Table(
+        "user", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("name", String(100)),
+        Column("last_name", String(100)),
+        Column("user_type", String(20)),
+        Column("email", String(200)),
+        Column("adress_verified", Boolean),
+        Column("identity_verified", Boolean),
+        Column("created_at", DateTime),
+    )
+    Table(
+        "solicitude", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("borrower_id", Integer),
+        Column("loan_amount", Numeric(12, 2)),
+        Column("status", String(20)),
+        Column("created_at", DateTime),
+    )
+    Table(
+        "offer", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("id_solicitude", Integer),
+        Column("partner_id", Integer),
+        Column("interest", Numeric(5, 2)),
+        Column("status", String(20)),
+        Column("created_at", DateTime),
+    )
+    Table(
+        "loan", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("id_offer", Integer),
+        Column("loan_amount", Numeric(12, 2)),
+        Column("start_date", DateTime),
+        Column("end_date", DateTime),
+        Column("current_status", String(20)),
+        Column("late_payment_count", Integer),
+        Column("created_at", DateTime),
+        Column("updated_at", DateTime),
+    )
+    Table(
+        "monthly_payment", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("id_loan", Integer),
+        Column("due_date", Date),
+        Column("borrow_verified", Boolean),
+        Column("partner_verified", Boolean),
+        Column("days_late", Integer),
+        Column("penalty_amount", Numeric(12, 2)),
+        Column("payment_status", String(20)),
+    )
+    return metadata
+
+def populate(engine, rows, payments_per_loan, seed=42):
+    """Crea las tablas y las llena: `rows` filas por tabla y `payments_per_loan` pagos por préstamo"""
+    rng = random.Random(seed)
+    metadata = build_tables(MetaData())
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    tables = metadata.tables
+    now = datetime.datetime(2025, 5, 19, 22, 39)
+
+    def moment():
+        return now - datetime.timedelta(minutes=rng.randint(0, 500000))
+
+    with engine.begin() as connection:
+        connection.execute(tables["user"].insert(), [
+            {"id": i, "name": f"nombre{i}", "last_name": f"apellido{i}", "user_type": "prestatario",
+             "email": f"user{i}@example.com", "adress_verified": rng.random() < 0.7,
+             "identity_verified": rng.random() < 0.6, "created_at": moment()}
+            for i in range(1, rows + 1)
+        ])
+        connection.execute(tables["solicitude"].insert(), [
+            {"id": i, "borrower_id": i, "loan_amount": rng.randint(1000, 500000) / 100,
+             "status": "aceptada", "created_at": moment()}
+            for i in range(1, rows + 1)
+        ])
+        connection.execute(tables["offer"].insert(), [
+            {"id": i, "id_solicitude": i, "partner_id": rng.randint(1, 50), "interest": rng.randint(100, 3000) / 100,
+             "status": "aceptada", "created_at": moment()}
+            for i in range(1, rows + 1)
+        ])
+        connection.execute(tables["loan"].insert(), [
+            {"id": i, "id_offer": i, "loan_amount": rng.randint(1000, 500000) / 100, "start_date": moment(),
+             "end_date": moment(), "current_status": rng.choice(["al_dia", "al_dia", "en_mora"]),
+             "late_payment_count": rng.choice([0, 0, 1, 3]), "created_at": moment(), "updated_at": moment()}
+            for i in range(1, rows + 1)
+        ])
+        connection.execute(tables["monthly_payment"].insert(), [
+            {"id": (i - 1) * payments_per_loan + j + 1, "id_loan": i, "due_date": moment().date(),
+             "borrow_verified": True, "partner_verified": rng.random() < 0.9, "days_late": rng.choice([0, 0, 0, 3, 15]),
+             "penalty_amount": rng.choice([0, 0, 2550]) / 100, "payment_status": rng.choice(["pagado", "pendiente"])}
+            for i in range(1, rows + 1) for j in range(payments_per_loan)
+        ])
+    return {table_name: table for table_name, table in tables.items()}
+
+def use_source_database(engine):
+    """Apunta el módulo de conexión de PostgreSQL a la base del benchmark"""
+    postgres_conection.engine = engine
+    postgres_conection.SessionLocal.configure(bind=engine)
+    postgres_conection.metadata.clear()
+    postgres_conection._schema_fingerprint = None
+
+def open_mongo_database(mongo_uri=None):
+    """Base de destino: un mongod (--mongo-uri) o mongomock; None si no hay ninguno disponible"""
+    if mongo_uri:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        return AsyncIOMotorClient(mongo_uri)[BENCHMARK_DATABASE]
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        return None
+    return AsyncMongoMockClient()[BENCHMARK_DATABASE]
+
+async def _sync_tables(mongo_db, mode):
+    """Sincroniza cada tabla por separado y devuelve los segundos de cada una"""
+    seconds = {}
+    for table_name in TABLES_TO_SYNC:
+        started = time.perf_counter()
+        if not await sync_table_to_mongodb(table_name, mongo_db, mode=mode):
+            raise RuntimeError(f"Falló la sincronización de la tabla {table_name}")
+        seconds[table_name] = time.perf_counter() - started
+    return seconds
+
+# Valores que apply_changes escribe en las filas existentes de cada tabla
+UPDATED_VALUES = {
+    "user": {"identity_verified": True, "user_type": "actualizado"},
+    "solicitude": {"status": "actualizada"},
+    "offer": {"status": "actualizada"},
+    "loan": {"current_status": "actualizado"},
+    "monthly_payment": {"days_late": 99},
+}
+
+def apply_changes(engine, tables, changes):
+    """
+    Modifica las primeras `changes` filas de cada tabla con UPDATED_VALUES (adelantando
+    updated_at donde existe) y, en las tablas sin updated_at, inserta además `changes`
+    copias con claves nuevas. Devuelve las filas modificadas o nuevas por tabla.
+    """
+    affected = {}
+    with engine.begin() as connection:
+        for table_name in TABLES_TO_SYNC:
+            table = tables[table_name]
+            pk_column = table.columns[get_primary_key(table_name)]
+            column = table.columns[get_watermark_column(table_name)]
+            values = dict(UPDATED_VALUES[table_name])
+            later = connection.execute(select(func.max(column))).scalar()
+            later = later + (changes if column is pk_column else datetime.timedelta(days=1))
+            if has_change_tracking(table_name):
+                values[column.name] = later
+            connection.execute(table.update().where(pk_column <= changes).values(values))
+            affected[table_name] = changes
+            if has_change_tracking(table_name):
+                continue
+
+            last_id = connection.execute(select(func.max(pk_column))).scalar()
+            rows = [dict(row._mapping) for row in connection.execute(select(table).order_by(pk_column).limit(changes))]
+            for offset, row in enumerate(rows, start=1):
+                row[pk_column.name] = last_id + offset
+                if column is not pk_column:
+                    row[column.name] = later
+            connection.execute(table.insert(), rows)
+            affected[table_name] += len(rows)
+    return affected
+
+async def verify_changes(mongo_db, changes, table_names):
+    """Comprueba que las filas modificadas por apply_changes en esas tablas llegaron a MongoDB"""
+    for table_name in table_names:
+        values = UPDATED_VALUES[table_name]
+        pk_column = get_primary_key(table_name)
+        query = {pk_column: {"$lte": changes}, **values}
+        found = await mongo_db[table_name].count_documents(query)
+        if found != changes:
+            raise RuntimeError(
+                f"La sincronización incremental de {table_name} copió {found} de {changes} filas modificadas"
+            )
+
+async def _run(mongo_db, engine, tables, counts, changes):
+    await mongo_db.client.drop_database(BENCHMARK_DATABASE)
+    results = {}
+
+    full = await _sync_tables(mongo_db, "full")
+    for table_name, seconds in full.items():
+        results[f"sync.full.{table_name}.rows_per_s"] = measurement(counts[table_name] / seconds, "rows/s", "higher")
+    results["sync.full.total_s"] = measurement(sum(full.values()), "s", "lower")
+
+    # Incremental sin cambios: costo fijo de cada ejecución
+    idle = await _sync_tables(mongo_db, "incremental")
+    results["sync.incremental_unchanged.total_ms"] = measurement(sum(idle.values()) * 1000, "ms", "lower")
+
+    # Incremental con `changes` filas modificadas (y otras tantas nuevas) por tabla
+    affected = await asyncio.to_thread(apply_changes, engine, tables, changes)
+    incremental = await _sync_tables(mongo_db, "incremental")
+    tracked = [table_name for table_name in TABLES_TO_SYNC if has_change_tracking(table_name)]
+    await verify_changes(mongo_db, changes, tracked)
+    results["sync.incremental_changed.rows_per_s"] = measurement(
+        sum(affected.values()) / sum(incremental.values()), "rows/s", "higher"
+    )
+
+    # Incremental con la comparación completa de las tablas sin updated_at
+    refresh_every = settings.SYNC_REFRESH_EVERY
+    settings.SYNC_REFRESH_EVERY = 1
+    try:
+        refresh = await _sync_tables(mongo_db, "incremental")
+    finally:
+        settings.SYNC_REFRESH_EVERY = refresh_every
+    await verify_changes(mongo_db, changes, TABLES_TO_SYNC)
+    results["sync.incremental_refresh.total_ms"] = measurement(sum(refresh.values()) * 1000, "ms", "lower")
+
+    await mongo_db.client.drop_database(BENCHMARK_DATABASE)
+    return results
+
+def run(rows=20000, payments_per_loan=6, database_url=None, mongo_uri=None):
+    """Ejecuta el benchmark y devuelve las mediciones (vacías si no hay destino MongoDB)"""
+    mongo_db = open_mongo_database(mongo_uri)
+    if mongo_db is None:
+        print("bench_sync: se omite (instalar mongomock-motor o indicar --mongo-uri)")
+        return {}
+
+    original = (postgres_conection.engine, settings.SCHEMA_SNAPSHOT_PATH)
+    with tempfile.TemporaryDirectory() as directory:
+        # La instantánea del esquema del benchmark no debe pisar la del servicio
+        settings.SCHEMA_SNAPSHOT_PATH = os.path.join(directory, "schema.pickle")
+        engine = create_engine(database_url or f"sqlite:///{os.path.join(directory, 'source.db')}")
+        try:
+            tables = populate(engine, rows, payments_per_loan)
+            counts = {table_name: rows for table_name in tables}
+            counts["monthly_payment"] = rows * payments_per_loan
+            use_source_database(engine)
+            return asyncio.run(_run(mongo_db, engine, tables, counts, max(1, rows // 100)))
+        finally:
+            use_source_database(original[0])
+            settings.SCHEMA_SNAPSHOT_PATH = original[1]
+            engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--payments-per-loan", type=int, default=6)
+    parser.add_argument("--database-url", default=None, help="Base SQL de pruebas (por defecto SQLite temporal)")
+    parser.add_argument("--mongo-uri", default=None, help="mongod local (por defecto mongomock)")
+    args = parser.parse_args()
+
+    for name, result in run(args.rows, args.payments_per_loan, args.database_url, args.mongo_uri).items():
+        print(f"{name:45s} {result['value']:14,.1f} {result['unit']}")
@@ -0,0 +1,59 @@
+"""
+Utilidades compartidas por los benchmarks: mediciones con unidad y sentido,
+percentiles de latencia y datos sintéticos de prestatarios.
+"""
+import random
+import statistics
+
+# Características del modelo en el orden de ScorePredictionService.selected_features
+FEATURE_NAMES = [
+    "adress_verified",
+    "identity_verified",
+    "loan_count",
+    "late_payment_count",
+    "avg_days_late",
+    "total_penalty",
+    "payment_completion_ratio",
+    "has_no_late_payments",
+    "has_penalty",
+    "loans_al_dia_ratio",
+    "days_late_per_loan",
+]
+
+def measurement(value, unit, better):
+    """Resultado de un benchmark; `better` es "higher" o "lower" """
+    return {"value": float(value), "unit": unit, "better": better}
+
+def latency_measurements(prefix, samples):
+    """p50, p99 y media (en microsegundos) de una lista de duraciones en segundos"""
+    ordered = sorted(samples)
+    p99_index = min(len(ordered) - 1, int(len(ordered) * 0.99))
+    return {
+        f"{prefix}.p50_us": measurement(statistics.median(ordered) * 1e6, "us", "lower"),
+        f"{prefix}.p99_us": measurement(ordered[p99_index] * 1e6, "us", "lower"),
+        f"{prefix}.mean_us": measurement(statistics.fmean(ordered) * 1e6, "us", "lower"),
+    }
+
+def synthetic_features(rows, seed=42):
+    """Características de `rows` prestatarios con rangos realistas (lista de diccionarios)"""
+    rng = random.Random(seed)
+    records = []
+    for _ in range(rows):
+        loan_count = rng.randint(0, 6)
+        late_payment_count = rng.choice([0, 0, 0, 1, 2, 5])
+        avg_days_late = round(rng.uniform(0, 20), 2) if late_payment_count else 0.0
+        total_penalty = round(rng.choice([0, 0, rng.uniform(0, 1500)]), 2)
+        records.append({
+            "adress_verified": rng.randint(0, 1),
+            "identity_verified": rng.randint(0, 1),
+            "loan_count": loan_count,
+            "late_payment_count": late_payment_count,
+            "avg_days_late": avg_days_late,
+            "total_penalty": total_penalty,
+            "payment_completion_ratio": round(rng.random(), 4),
+            "has_no_late_payments": int(late_payment_count == 0),
+            "has_penalty": int(total_penalty > 0),
+            "loans_al_dia_ratio": round(rng.random(), 4) if loan_count else 0.0,
+            "days_late_per_loan": round(avg_days_late / loan_count, 4) if loan_count else 0.0,
+        })
+    return records
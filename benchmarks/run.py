@@ -0,0 +1,163 @@
+"""
+Ejecuta los benchmarks, guarda los resultados en JSON y los compara con una línea base.
+
+Cada medición tiene valor, unidad y sentido ("higher" o "lower" es mejor). Una
+medición es una regresión si empeora más que la tolerancia respecto de la línea base.
+
+Uso:
+    python -m benchmarks.run [--quick] [--only scoring,graphql,converter,sync]
+                             [--output .cache/benchmarks/latest.json]
+                             [--baseline benchmarks/baseline.json] [--save-baseline]
+                             [--tolerance 0.10] [--fail-on-regression]
+
+Línea base (benchmarks/baseline.json, versionada):
+    La guarda --save-baseline junto con el entorno en que se midió (commit, versiones,
+    máquina, CPUs y tamaños). Solo es comparable en la misma máquina y con los mismos
+    tamaños: al cambiar de máquina, o cuando un cambio mejora o empeora a propósito una
+    medición, se regenera con la suite completa (sin --quick) sobre un árbol limpio y se
+    versiona en el mismo commit que el cambio:
+        python -m benchmarks.run --save-baseline
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+from benchmarks.common import measurement
+
+# Benchmarks disponibles, en orden de ejecución
+SUITES = ["scoring", "graphql", "converter", "sync"]
+
+# Tamaños por benchmark: (normal, --quick)
+SIZES = {
+    "scoring": ({"calls": 5000, "rows": 100000}, {"calls": 1000, "rows": 20000}),
+    "graphql": ({"requests": 1000, "batches": 50}, {"requests": 200, "batches": 10}),
+    "converter": ({"rows": 200000, "repeat": 5}, {"rows": 20000, "repeat": 3}),
+    "sync": ({"rows": 5000}, {"rows": 1000}),
+}
+
+DEFAULT_OUTPUT = os.path.join(".cache", "benchmarks", "latest.json")
+DEFAULT_BASELINE = os.path.join("benchmarks", "baseline.json")
+
+def run_converter(rows, repeat):
+    from benchmarks.bench_record_converter import run
+
+    return {
+        f"converter.{table_name}.{converter}.rows_per_s": measurement(rate, "rows/s", "higher")
+        for table_name, rates in run(rows, repeat).items()
+        for converter, rate in rates.items()
+    }
+
+def run_suite(name, sizes):
+    """Ejecuta un benchmark (los módulos se importan solo si se usan)"""
+    if name == "scoring":
+        from benchmarks.bench_scoring import run
+    elif name == "graphql":
+        from benchmarks.bench_graphql import run
+    elif name == "converter":
+        run = run_converter
+    else:
+        from benchmarks.bench_sync import run
+    return run(**sizes)
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def environment(quick, suites):
+    import numpy
+
+    return {
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "quick": quick,
+        "suites": suites,
+        "sizes": {name: SIZES[name][1 if quick else 0] for name in suites},
+        # bench_sync sin --mongo-uri: origen SQLite temporal y destino mongomock
+        "sync_target": "sqlite+mongomock",
+    }
+
+def compare(results, baseline, tolerance):
+    """Filas (nombre, base, actual, cambio relativo, regresión) de las mediciones comunes"""
+    rows = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None or not previous["value"]:
+            rows.append((name, None, current, None, False))
+            continue
+        change = (current["value"] - previous["value"]) / previous["value"]
+        worse = -change if current["better"] == "higher" else change
+        rows.append((name, previous, current, change, worse > tolerance))
+    return rows
+
+def print_report(rows, tolerance):
+    print(f"{'benchmark':62s} {'base':>14s} {'actual':>14s} {'cambio':>9s}")
+    for name, previous, current, change, regression in rows:
+        base = f"{previous['value']:14,.1f}" if previous else f"{'-':>14s}"
+        delta = f"{change:+9.1%}" if change is not None else f"{'nuevo':>9s}"
+        marker = "  REGRESIÓN" if regression else ""
+        print(f"{name:62s} {base} {current['value']:14,.1f} {delta} {current['unit']}{marker}")
+    regressions = sum(1 for row in rows if row[4])
+    print(f"\n{regressions} regresiones (tolerancia {tolerance:.0%})")
+    return regressions
+
+def write_json(path, document):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as output_file:
+        json.dump(document, output_file, indent=2, ensure_ascii=False, sort_keys=True)
+        output_file.write("\n")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del servicio de scoring y de la sincronización")
+    parser.add_argument("--quick", action="store_true", help="Tamaños reducidos (verificación rápida)")
+    parser.add_argument("--only", default=",".join(SUITES), help=f"Benchmarks a ejecutar ({','.join(SUITES)})")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Archivo JSON de resultados")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Archivo JSON de la línea base")
+    parser.add_argument("--save-baseline", action="store_true", help="Guardar los resultados como nueva línea base")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Empeoramiento relativo tolerado")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Salir con código 1 si hay regresiones")
+    args = parser.parse_args(argv)
+
+    suites = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"Benchmarks desconocidos: {', '.join(sorted(unknown))}")
+
+    results = {}
+    for name in suites:
+        print(f"Ejecutando benchmark {name}...", flush=True)
+        results.update(run_suite(name, SIZES[name][1 if args.quick else 0]))
+
+    document = {"environment": environment(args.quick, suites), "results": results}
+    write_json(args.output, document)
+    print(f"Resultados guardados en {args.output}\n")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline_document = json.load(baseline_file)
+        baseline = baseline_document["results"]
+        if baseline_document["environment"].get("quick") != args.quick:
+            print("Aviso: la línea base se generó con otros tamaños (--quick)")
+    regressions = print_report(compare(results, baseline, args.tolerance), args.tolerance)
+
+    if args.save_baseline:
+        write_json(args.baseline, document)
+        print(f"Línea base guardada en {args.baseline}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import asyncio
+import datetime
+import pytest
+from app.config.settings import settings
+from app.sync.data_sync import TABLES_TO_SYNC, get_watermark, sync_table_to_mongodb
+from conftest import BASE_TIME
+
+@pytest.fixture
+def source(source_database):
+    engine, tables = source_database
+    # Fechas con microsegundos: MongoDB las guarda con precisión de milisegundos
+    with engine.begin() as connection:
+        connection.execute(
+            tables["user"].update().where(tables["user"].c.id == 2)
+            .values(created_at=datetime.datetime(2025, 5, 1, 12, 0, 0, 123456))
+        )
+    return engine, tables
+
+async def _sync(mongo_db):
+    changed = {}
+    for table_name in TABLES_TO_SYNC:
+        changed[table_name] = []
+        assert await sync_table_to_mongodb(table_name, mongo_db, mode="incremental", changed_records=changed[table_name])
+    return changed
+
+def test_incremental_sync_copies_updates_to_existing_rows(source, mongo_db, monkeypatch):
+    engine, tables = source
+    monkeypatch.setattr(settings, "SYNC_REFRESH_EVERY", 1)
+
+    async def scenario():
+        await _sync(mongo_db)
+        with engine.begin() as connection:
+            connection.execute(tables["monthly_payment"].update().where(tables["monthly_payment"].c.id == 1).values(days_late=99))
+            connection.execute(tables["user"].update().where(tables["user"].c.id == 1).values(user_type="actualizado"))
+        changed = await _sync(mongo_db)
+        payment = await mongo_db["monthly_payment"].find_one({"id": 1})
+        user = await mongo_db["user"].find_one({"id": 1})
+        return changed, payment, user
+
+    changed, payment, user = asyncio.run(scenario())
+    assert payment["days_late"] == 99
+    assert user["user_type"] == "actualizado"
+    # Solo se reescriben las filas modificadas
+    assert len(changed["monthly_payment"]) == 1
+    assert changed["user"] == [{"id": 1}]
+    assert changed["solicitude"] == [] and changed["offer"] == []
+
+def test_refresh_waits_for_sync_refresh_every(source, mongo_db, monkeypatch):
+    engine, tables = source
+    monkeypatch.setattr(settings, "SYNC_REFRESH_EVERY", 2)
+
+    async def scenario():
+        await _sync(mongo_db)
+        with engine.begin() as connection:
+            connection.execute(tables["monthly_payment"].update().where(tables["monthly_payment"].c.id == 1).values(days_late=99))
+        await _sync(mongo_db)
+        stale = await mongo_db["monthly_payment"].find_one({"id": 1})
+        await _sync(mongo_db)
+        refreshed = await mongo_db["monthly_payment"].find_one({"id": 1})
+        return stale, refreshed
+
+    stale, refreshed = asyncio.run(scenario())
+    assert stale["days_late"] != 99
+    assert refreshed["days_late"] == 99
+
+def test_reconcile_removes_deleted_rows_in_chunks(source, mongo_db, monkeypatch):
+    engine, tables = source
+    monkeypatch.setattr(settings, "SYNC_RECONCILE_EVERY", 1)
+    monkeypatch.setattr(settings, "SYNC_CHUNK_SIZE", 7)
+
+    async def scenario():
+        await _sync(mongo_db)
+        with engine.begin() as connection:
+            connection.execute(tables["monthly_payment"].delete().where(tables["monthly_payment"].c.id.in_([2, 9, 60])))
+        changed = await _sync(mongo_db)
+        ids = [doc["id"] async for doc in mongo_db["monthly_payment"].find({})]
+        return changed, ids
+
+    changed, ids = asyncio.run(scenario())
+    assert sorted(ids) == [i for i in range(1, 61) if i not in (2, 9, 60)]
+    assert len(changed["monthly_payment"]) == 3
+
+def test_full_sync_saves_watermark_for_next_incremental(source, mongo_db):
+    async def scenario():
+        for table_name in TABLES_TO_SYNC:
+            assert await sync_table_to_mongodb(table_name, mongo_db, mode="full")
+        watermarks = {table_name: await get_watermark(mongo_db, table_name) for table_name in TABLES_TO_SYNC}
+        return watermarks, await _sync(mongo_db)
+
+    watermarks, changed = asyncio.run(scenario())
+    assert watermarks["loan"]["column"] == "updated_at"
+    assert watermarks["loan"]["value"] == BASE_TIME - datetime.timedelta(minutes=1)
+    assert watermarks["monthly_payment"] == {"column": "id", "value": 60, "runs_since_reconcile": 0, "runs_since_refresh": 0}
+    # La incremental siguiente continúa desde la copia: solo repite la fila del borde de
+    # las marcas de agua por fecha (se leen con >=)
+    assert changed["monthly_payment"] == []
+    assert all(len(changed[table_name]) == 1 for table_name in ("user", "solicitude", "offer", "loan"))
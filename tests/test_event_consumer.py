@@ -0,0 +1,100 @@
+import asyncio
+import json
+import types
+import pytest
+from app.config.settings import settings
+from app.sync.event_consumer import RabbitMQEventConsumer
+
+class FakeChannel:
+    """Canal de pika mínimo: registra las confirmaciones y permite simular el cierre"""
+
+    def __init__(self):
+        self.is_open = True
+        self.acks = []
+        self.nacks = []
+        self.consumers = {}
+        self._close_callbacks = []
+
+    def add_on_close_callback(self, callback):
+        self._close_callbacks.append(callback)
+
+    def basic_qos(self, prefetch_count, callback):
+        callback(None)
+
+    def queue_declare(self, queue, durable):
+        pass
+
+    def basic_consume(self, queue, on_message_callback):
+        self.consumers[queue] = on_message_callback
+
+    def basic_ack(self, delivery_tag, multiple):
+        self.acks.append(delivery_tag)
+
+    def basic_nack(self, delivery_tag, multiple, requeue):
+        self.nacks.append(delivery_tag)
+
+    def deliver(self, queue, delivery_tag, event):
+        method = types.SimpleNamespace(delivery_tag=delivery_tag)
+        self.consumers[queue](self, method, None, json.dumps(event).encode())
+
+    def close(self, reason="canal cerrado por el broker"):
+        self.is_open = False
+        for callback in self._close_callbacks:
+            callback(self, reason)
+
+class FakeConnection:
+    def __init__(self):
+        self.is_open = True
+        self.channels = []
+
+    def channel(self, on_open_callback):
+        channel = FakeChannel()
+        self.channels.append(channel)
+        on_open_callback(channel)
+
+@pytest.fixture
+def consumer(mongo_db, monkeypatch):
+    monkeypatch.setattr(settings, "EVENT_RECONNECT_SECONDS", 0)
+    monkeypatch.setattr(settings, "FEATURE_STORE_MATERIALIZED", False)
+    consumer = RabbitMQEventConsumer(mongo_db, queues=[settings.USER_EVENTS_QUEUE])
+    consumer._connection = FakeConnection()
+    return consumer
+
+def test_channel_close_reopens_and_never_acks_old_tags(consumer):
+    queue = settings.USER_EVENTS_QUEUE
+
+    async def scenario():
+        connection = consumer._connection
+        consumer._on_connection_open(connection)
+        first = connection.channels[0]
+        first.deliver(queue, 1, {"id": 1, "name": "a"})
+        first.deliver(queue, 2, {"id": 2, "name": "b"})
+
+        # El canal se cierra con el lote sin confirmar: se descarta y se abre otro
+        first.close()
+        await asyncio.sleep(0.01)
+        assert len(connection.channels) == 2
+        second = connection.channels[1]
+        second.deliver(queue, 1, {"id": 3, "name": "c"})
+        await consumer.processor.flush()
+
+        # Un lote en curso cuyo canal se cierra antes de confirmarse no se confirma en el nuevo
+        second.deliver(queue, 2, {"id": 4, "name": "d"})
+        apply = consumer.processor._apply
+
+        async def apply_and_close(pending):
+            await apply(pending)
+            second.close()
+
+        consumer.processor._apply = apply_and_close
+        await consumer.processor.flush()
+        await asyncio.sleep(0.01)
+        third = connection.channels[2]
+        ids = sorted([doc["id"] async for doc in consumer.processor.mongo_db.user.find({})])
+        return first, second, third, ids
+
+    first, second, third, ids = asyncio.run(scenario())
+    assert first.acks == []
+    assert second.acks == [1]
+    assert third.acks == [] and third.is_open
+    assert ids == [3, 4]
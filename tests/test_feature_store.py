@@ -0,0 +1,180 @@
+import asyncio
+import datetime
+import json
+import pytest
+from bson import Decimal128
+from app.config.settings import settings
+from app.ml.services.feature_store import (
+    BorrowerFeatureStore,
+    FEATURES_COLLECTION,
+    PAID_PAYMENT_STATUSES,
+    LOAN_STATUS_AL_DIA,
+    borrower_features_pipeline,
+    resolve_borrower_ids,
+)
+from app.sync import event_consumer
+from app.sync.data_sync import TABLES_TO_SYNC, sync_all_tables, sync_table_to_mongodb
+from conftest import BASE_TIME
+
+# Espejo pequeño: banderas guardadas con distintos tipos, montos float y Decimal128,
+# un prestatario sin préstamos y una solicitud sin oferta
+MIRROR = {
+    "user": [
+        {"id": 1, "adress_verified": True, "identity_verified": 1},
+        {"id": 2, "adress_verified": "true", "identity_verified": False},
+        {"id": 3, "adress_verified": 0, "identity_verified": None},
+        {"id": 4},
+    ],
+    "solicitude": [
+        {"id": 10, "borrower_id": 1},
+        {"id": 11, "borrower_id": 1},
+        {"id": 12, "borrower_id": 2},
+        {"id": 13, "borrower_id": 3},
+    ],
+    "offer": [
+        {"id": 20, "id_solicitude": 10},
+        {"id": 21, "id_solicitude": 11},
+        {"id": 22, "id_solicitude": 12},
+    ],
+    "loan": [
+        {"id": 30, "id_offer": 20, "current_status": "al_dia"},
+        {"id": 31, "id_offer": 21, "current_status": "en_mora"},
+        {"id": 32, "id_offer": 21, "current_status": "al_dia"},
+        {"id": 33, "id_offer": 22, "current_status": "al_dia"},
+    ],
+    "monthly_payment": [
+        {"id": 40, "id_loan": 30, "days_late": 0, "penalty_amount": 0.0, "payment_status": "pagado"},
+        {"id": 41, "id_loan": 30, "days_late": 5, "penalty_amount": 12.5, "payment_status": "pagado"},
+        {"id": 42, "id_loan": 31, "days_late": 30, "penalty_amount": Decimal128("40.25"), "payment_status": "pendiente"},
+        {"id": 43, "id_loan": 32, "days_late": 0, "penalty_amount": None, "payment_status": "completado"},
+        {"id": 44, "id_loan": 33, "days_late": 0, "penalty_amount": 0.0, "payment_status": "pendiente"},
+    ],
+}
+
+def _amount(value):
+    if value is None:
+        return 0.0
+    return float(value.to_decimal()) if isinstance(value, Decimal128) else float(value)
+
+def _ratio(numerator, denominator):
+    return numerator / denominator if denominator > 0 else 0
+
+def python_features(mirror, borrower_id):
+    """Características calculadas tabla por tabla en Python (referencia de la agregación)"""
+    user = next(row for row in mirror["user"] if row["id"] == borrower_id)
+    solicitude_ids = {row["id"] for row in mirror["solicitude"] if row["borrower_id"] == borrower_id}
+    offer_ids = {row["id"] for row in mirror["offer"] if row["id_solicitude"] in solicitude_ids}
+    loans = [row for row in mirror["loan"] if row["id_offer"] in offer_ids]
+    loan_ids = {row["id"] for row in loans}
+    payments = [row for row in mirror["monthly_payment"] if row["id_loan"] in loan_ids]
+
+    late = [row for row in payments if (row.get("days_late") or 0) > 0]
+    total_days_late = float(sum(row.get("days_late") or 0 for row in payments))
+    total_penalty = sum(_amount(row.get("penalty_amount")) for row in payments)
+    paid = [row for row in payments if row.get("payment_status") in PAID_PAYMENT_STATUSES]
+    al_dia = [row for row in loans if row.get("current_status") == LOAN_STATUS_AL_DIA]
+    return {
+        "borrower_id": borrower_id,
+        "adress_verified": 1 if user.get("adress_verified") else 0,
+        "identity_verified": 1 if user.get("identity_verified") else 0,
+        "loan_count": len(loans),
+        "late_payment_count": len(late),
+        "avg_days_late": _ratio(float(sum(row["days_late"] for row in late)), len(late)),
+        "total_penalty": total_penalty,
+        "payment_completion_ratio": _ratio(len(paid), len(payments)),
+        "has_no_late_payments": 1 if not late else 0,
+        "has_penalty": 1 if total_penalty > 0 else 0,
+        "loans_al_dia_ratio": _ratio(len(al_dia), len(loans)),
+        "days_late_per_loan": _ratio(total_days_late, len(loans)),
+    }
+
+async def load_mirror(mongo_db, mirror):
+    for collection_name, rows in mirror.items():
+        await mongo_db[collection_name].insert_many([dict(row) for row in rows])
+
+def test_pipeline_matches_python_features(real_mongo, monkeypatch):
+    monkeypatch.setattr(settings, "FEATURE_STORE_MATERIALIZED", False)
+
+    async def scenario():
+        mongo_db = real_mongo()
+        await load_mirror(mongo_db, MIRROR)
+        all_features = await mongo_db.user.aggregate(borrower_features_pipeline({})).to_list(length=None)
+        store = BorrowerFeatureStore(mongo_db)
+        single = [await store.get_features(row["id"]) for row in MIRROR["user"]]
+        missing = await store.get_features(999)
+        return all_features, single, missing
+
+    all_features, single, missing = asyncio.run(scenario())
+    expected = [python_features(MIRROR, row["id"]) for row in MIRROR["user"]]
+    all_features = sorted(all_features, key=lambda features: features["borrower_id"])
+    assert len(all_features) == len(single) == len(expected)
+    for aggregated, fetched, reference in zip(all_features, single, expected):
+        assert aggregated == pytest.approx(reference)
+        assert fetched == pytest.approx(reference)
+    assert missing is None
+
+def _move_loan_and_delete_another(engine, tables):
+    """Pasa el préstamo 1 (prestatario 1) a la oferta 2 (prestatario 2) y borra el préstamo 3"""
+    loan, payment = tables["loan"], tables["monthly_payment"]
+    with engine.begin() as connection:
+        connection.execute(loan.update().where(loan.c.id == 1).values(id_offer=2, updated_at=BASE_TIME + datetime.timedelta(days=1)))
+        connection.execute(payment.delete().where(payment.c.id_loan == 3))
+        connection.execute(loan.delete().where(loan.c.id == 3))
+
+def test_incremental_sync_reports_previous_and_removed_parents(source_database, mongo_db, monkeypatch):
+    engine, tables = source_database
+    monkeypatch.setattr(settings, "SYNC_RECONCILE_EVERY", 1)
+
+    async def scenario():
+        for table_name in TABLES_TO_SYNC:
+            await sync_table_to_mongodb(table_name, mongo_db, mode="incremental")
+        _move_loan_and_delete_another(engine, tables)
+        changed = []
+        await sync_table_to_mongodb("loan", mongo_db, mode="incremental", changed_records=changed)
+        return changed, await resolve_borrower_ids(mongo_db, "loan", changed)
+
+    changed, borrower_ids = asyncio.run(scenario())
+    assert {record["id_offer"] for record in changed} == {1, 2, 3}
+    assert borrower_ids == {1, 2, 3}
+
+def test_events_refresh_previous_and_removed_parents(mongo_db, monkeypatch):
+    monkeypatch.setattr(settings, "FEATURE_STORE_MATERIALIZED", True)
+    refreshed = []
+
+    async def record_refresh(mongo_db, borrower_ids=None):
+        refreshed.append(set(borrower_ids))
+
+    monkeypatch.setattr(event_consumer, "refresh_borrower_features", record_refresh)
+
+    async def scenario():
+        await load_mirror(mongo_db, MIRROR)
+        processor = event_consumer.EventBatchProcessor(mongo_db, ack=lambda tag: None, nack=lambda tag: None)
+        # El préstamo 33 (prestatario 2) pasa a la oferta 20 (prestatario 1)
+        processor.add("loan_events", 1, json.dumps({"entity": "loan", "data": {"id": 33, "id_offer": 20}}))
+        await processor.flush()
+        # Un pago eliminado que solo trae su id
+        processor.add("payment_events", 2, json.dumps({"entity": "monthly_payment", "action": "delete", "data": {"id": 42}}))
+        await processor.flush()
+
+    asyncio.run(scenario())
+    assert refreshed == [{1, 2}, {1}]
+
+def test_materialized_features_follow_reassignments_and_deletes(source_database, real_mongo, monkeypatch):
+    engine, tables = source_database
+    monkeypatch.setattr(settings, "FEATURE_STORE_MATERIALIZED", True)
+    monkeypatch.setattr(settings, "SYNC_RECONCILE_EVERY", 1)
+
+    async def loan_counts(mongo_db):
+        return {doc["borrower_id"]: doc["loan_count"] async for doc in mongo_db[FEATURES_COLLECTION].find({})}
+
+    async def scenario():
+        mongo_db = real_mongo()
+        await sync_all_tables(mongo_db=mongo_db, mode="incremental")
+        before = await loan_counts(mongo_db)
+        _move_loan_and_delete_another(engine, tables)
+        await sync_all_tables(mongo_db=mongo_db, mode="incremental")
+        return before, await loan_counts(mongo_db)
+
+    before, after = asyncio.run(scenario())
+    assert before[1] == before[2] == before[3] == 1
+    assert (after[1], after[2], after[3]) == (0, 2, 0)
@@ -0,0 +1,49 @@
+import asyncio
+import pytest
+import app.main as main
+from app.ml.services.score_service import ScorePredictionService
+
+ROW = {
+    "adressVerified": 1, "identityVerified": 1, "loanCount": 3, "latePaymentCount": 1,
+    "avgDaysLate": 2.5, "totalPenalty": 10.0, "paymentCompletionRatio": 0.8,
+    "hasNoLatePayments": 0, "hasPenalty": 1, "loansAlDiaRatio": 0.66, "daysLatePerLoan": 0.8,
+}
+
+BATCH_MUTATION = """
+mutation ($inputs: [ScorePredictionInput!], $columns: ScoreBatchColumnsInput) {
+  predictScoreBatch(inputs: $inputs, columns: $columns) { score category error }
+}
+"""
+
+@pytest.fixture
+def service(monkeypatch):
+    service = ScorePredictionService(mode="synthetic")
+    service.ensure_loaded()
+    monkeypatch.setattr(main, "score_service", service)
+    yield service
+    service.executor.shutdown()
+
+def predict_batch(variables):
+    result = asyncio.run(main.schema.execute(BATCH_MUTATION, variable_values=variables))
+    assert result.errors is None
+    return result.data["predictScoreBatch"]
+
+def test_overloaded_batch_gets_overloaded_results(service, monkeypatch):
+    monkeypatch.setattr(service.executor, "max_pending", 0)
+    results = predict_batch({"inputs": [ROW, ROW, ROW]})
+    assert [result["category"] for result in results] == ["Sobrecargado"] * 3
+    assert all("sobrecargado" in result["error"] for result in results)
+
+    columns = {name: [value, value] for name, value in ROW.items()}
+    assert [result["category"] for result in predict_batch({"columns": columns})] == ["Sobrecargado"] * 2
+
+@pytest.mark.parametrize("variables", [
+    {},
+    {"inputs": [ROW], "columns": {name: [value] for name, value in ROW.items()}},
+    {"columns": {**{name: [value] for name, value in ROW.items()}, "loanCount": [1, 2]}},
+])
+def test_invalid_batch_gets_error_result(service, variables):
+    results = predict_batch(variables)
+    assert len(results) == 1
+    assert results[0]["category"] == "Error"
+    assert results[0]["error"].startswith("Error en el servicio:")
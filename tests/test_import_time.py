@@ -0,0 +1,30 @@
+import json
+import os
+import subprocess
+import sys
+
+# Presupuesto de `import app.main` en un proceso nuevo (TensorFlow solo ya tarda más)
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "5"))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _import_in_subprocess(module):
+    code = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(json.dumps({'seconds': time.perf_counter() - started, "
+        "'tensorflow': 'tensorflow' in sys.modules}))\n"
+    )
+    env = dict(os.environ, SCORE_MODEL_PRELOAD="false", PYTHONPATH=ROOT)
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True, timeout=120
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def test_importing_app_does_not_load_tensorflow():
+    result = _import_in_subprocess("app.main")
+    assert not result["tensorflow"], "import app.main cargó TensorFlow antes de la primera predicción"
+    assert result["seconds"] < IMPORT_BUDGET_SECONDS, (
+        f"import app.main tardó {result['seconds']:.2f}s (presupuesto {IMPORT_BUDGET_SECONDS}s)"
+    )
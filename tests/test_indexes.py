@@ -0,0 +1,56 @@
+import asyncio
+from app.db.indexes import ensure_indexes
+
+# Consultas frecuentes del servicio: colección y filtro. Las claves foráneas son las que
+# recorren los $lookup del feature store
+HOT_QUERIES = [
+    ("user", {"id": 7}),
+    ("solicitude", {"borrower_id": 7}),
+    ("offer", {"id_solicitude": 7}),
+    ("loan", {"id_offer": 7}),
+    ("monthly_payment", {"id_loan": 7}),
+    ("borrower_features", {"borrower_id": 7}),
+    ("system_info", {"sync_watermark": "monthly_payment"}),
+]
+
+# Documentos de cada colección antes de crear los índices
+DOCUMENTS = {
+    "user": [{"id": i} for i in range(1, 51)],
+    "solicitude": [{"id": i, "borrower_id": i} for i in range(1, 51)],
+    "offer": [{"id": i, "id_solicitude": i} for i in range(1, 51)],
+    "loan": [{"id": i, "id_offer": i} for i in range(1, 51)],
+    "monthly_payment": [{"id": i, "id_loan": i // 3} for i in range(1, 151)],
+    "borrower_features": [{"borrower_id": i} for i in range(1, 51)],
+    "system_info": [{"sync_watermark": name} for name in ("user", "loan", "monthly_payment")],
+}
+
+def _plan_stages(plan):
+    """Etapas de un plan de ejecución (incluidas las anidadas)"""
+    if isinstance(plan, dict):
+        stages = [plan["stage"]] if "stage" in plan else []
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+        return stages
+    if isinstance(plan, list):
+        return [stage for item in plan for stage in _plan_stages(item)]
+    return []
+
+def test_hot_queries_use_indexes(real_mongo):
+    async def explain_hot_queries():
+        mongo_db = real_mongo()
+        for collection_name, documents in DOCUMENTS.items():
+            await mongo_db[collection_name].insert_many(documents)
+        await ensure_indexes(mongo_db)
+
+        plans = {}
+        for collection_name, query in HOT_QUERIES:
+            explain = await mongo_db[collection_name].find(query).explain()
+            plans[collection_name] = _plan_stages(explain["queryPlanner"]["winningPlan"])
+        return plans
+
+    plans = asyncio.run(explain_hot_queries())
+    assert set(plans) == {collection_name for collection_name, _ in HOT_QUERIES}
+    for collection_name, stages in plans.items():
+        # MongoDB 8 informa las búsquedas por igualdad en índices únicos como EXPRESS_IXSCAN
+        assert any(stage.endswith("IXSCAN") for stage in stages), f"{collection_name}: {stages}"
+        assert "COLLSCAN" not in stages, f"{collection_name}: {stages}"
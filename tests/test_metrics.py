@@ -0,0 +1,83 @@
+import re
+from fastapi.testclient import TestClient
+import app.main as main
+from app.monitoring.metrics import CallbackMetric, Counter, Gauge, Histogram, MetricsRegistry
+
+# Línea de muestra del formato de texto de Prometheus: nombre, etiquetas opcionales y valor
+SAMPLE = re.compile(
+    r'^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)'
+    r'(?:\{(?P<labels>[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\[\\"n])*"(?:,[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\[\\"n])*")*)\})?'
+    r' (?P<value>[-+]?(?:\d+(?:\.\d*)?(?:e[-+]?\d+)?|Inf|NaN))$'
+)
+HISTOGRAM_SUFFIXES = ("_bucket", "_sum", "_count")
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    rows = Counter("rows_total", "Filas", ["table"], registry=registry)
+    open_connections = Gauge("open_connections", "Conexiones abiertas", registry=registry)
+    seconds = Histogram("step_seconds", "Duración", ["step"], buckets=(0.1, 1.0), registry=registry)
+    CallbackMetric("cache_entries", "Entradas", lambda: 3, registry=registry)
+    CallbackMetric("broken", "Sin muestras si falla", lambda: 1 / 0, registry=registry)
+
+    rows.labels('pago "mensual"\\\n').inc(2)
+    open_connections.inc(5)
+    open_connections.dec()
+    for value in (0.05, 0.5, 7):
+        seconds.labels("score").observe(value)
+
+    assert registry.render() == "\n".join([
+        "# HELP rows_total Filas",
+        "# TYPE rows_total counter",
+        'rows_total{table="pago \\"mensual\\"\\\\\\n"} 2',
+        "# HELP open_connections Conexiones abiertas",
+        "# TYPE open_connections gauge",
+        "open_connections 4",
+        "# HELP step_seconds Duración",
+        "# TYPE step_seconds histogram",
+        'step_seconds_bucket{step="score",le="0.1"} 1',
+        'step_seconds_bucket{step="score",le="1.0"} 2',
+        'step_seconds_bucket{step="score",le="+Inf"} 3',
+        'step_seconds_sum{step="score"} 7.55',
+        'step_seconds_count{step="score"} 3',
+        "# HELP cache_entries Entradas",
+        "# TYPE cache_entries gauge",
+        "cache_entries 3",
+        "# HELP broken Sin muestras si falla",
+        "# TYPE broken gauge",
+    ]) + "\n"
+
+def test_metrics_endpoint_is_valid_exposition_format():
+    response = TestClient(main.app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+    types = {}
+    buckets = {}
+    for line in response.text.splitlines():
+        if line.startswith("# HELP "):
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert name not in types, f"TYPE repetido: {name}"
+            types[name] = kind
+            continue
+        match = SAMPLE.match(line)
+        assert match, f"Línea inválida: {line!r}"
+        name = match["name"]
+        family = name
+        if name not in types:
+            family = next(name[:-len(suffix)] for suffix in HISTOGRAM_SUFFIXES if name.endswith(suffix))
+            assert types[family] == "histogram", line
+        if name.endswith("_bucket"):
+            series = re.sub(r',?le="[^"]*"', "", match["labels"])
+            buckets.setdefault((family, series), []).append((line, float(match["value"])))
+
+    for name in ("graphql_resolve_seconds", "score_step_seconds", "sync_table_seconds", "score_cache_hit_ratio",
+                 "score_executor_pending"):
+        assert name in types, name
+    # Los buckets de cada serie son acumulados y terminan en +Inf
+    assert buckets
+    for series, values in buckets.items():
+        counts = [value for _, value in values]
+        assert counts == sorted(counts), series
+        assert 'le="+Inf"' in values[-1][0], series
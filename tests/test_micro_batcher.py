@@ -0,0 +1,35 @@
+import asyncio
+import numpy as np
+from app.ml.services.micro_batcher import MicroBatcher
+
+def test_short_batch_result_fails_every_request():
+    async def drop_last_row(matrix):
+        return [float(row.sum()) for row in matrix[:-1]]
+
+    async def scenario():
+        batcher = MicroBatcher(drop_last_row, max_batch_size=3, max_wait_ms=50)
+        try:
+            return await asyncio.wait_for(
+                asyncio.gather(*(batcher.submit(np.full(2, i, dtype=np.float64)) for i in range(3)), return_exceptions=True),
+                timeout=2,
+            )
+        finally:
+            await batcher.close()
+
+    results = asyncio.run(scenario())
+    assert len(results) == 3
+    assert all(isinstance(result, ValueError) for result in results)
+    assert "2 resultados para 3 filas" in str(results[0])
+
+def test_batch_results_follow_submission_order():
+    async def double(matrix):
+        return [row * 2 for row in matrix]
+
+    async def scenario():
+        batcher = MicroBatcher(double, max_batch_size=4, max_wait_ms=50)
+        try:
+            return await asyncio.gather(*(batcher.submit(np.array([float(i)])) for i in range(6)))
+        finally:
+            await batcher.close()
+
+    assert [float(result[0]) for result in asyncio.run(scenario())] == [0.0, 2.0, 4.0, 6.0, 8.0, 10.0]
@@ -0,0 +1,75 @@
+import asyncio
+import numpy as np
+import pytest
+from app.ml.services.score_service import ScorePredictionService
+
+tf = pytest.importorskip("tensorflow")
+pytest.importorskip("sklearn")
+
+def random_rows(service, count, seed=7):
+    """Filas con rangos realistas, en el orden de selected_features"""
+    rng = np.random.default_rng(seed)
+    loans = rng.integers(0, 8, count)
+    late = rng.integers(0, 12, count)
+    columns = {
+        "adress_verified": rng.integers(0, 2, count),
+        "identity_verified": rng.integers(0, 2, count),
+        "loan_count": loans,
+        "late_payment_count": late,
+        "avg_days_late": np.where(late > 0, rng.uniform(1, 60, count), 0.0),
+        "total_penalty": rng.uniform(0, 1500, count) * (late > 0),
+        "payment_completion_ratio": rng.uniform(0, 1, count),
+        "has_no_late_payments": (late == 0).astype(int),
+        "has_penalty": (late > 0).astype(int),
+        "loans_al_dia_ratio": rng.uniform(0, 1, count) * (loans > 0),
+        "days_late_per_loan": rng.uniform(0, 30, count) * (loans > 0),
+    }
+    return np.column_stack([columns[name] for name in service.selected_features]).astype(np.float64)
+
+@pytest.fixture(scope="module")
+def tf_service():
+    service = ScorePredictionService(mode="model")
+    # Sin el artefacto NumPy el servicio usa el grafo de TensorFlow
+    service._load_numpy_model = lambda export_path, model_path: False
+    service.ensure_loaded()
+    yield service
+    service.executor.shutdown()
+
+def test_model_runs_in_a_fixed_signature_graph(tf_service):
+    assert not tf_service.mock_mode
+    assert tf_service.backend == "tensorflow"
+    spec = tf_service._predict_fn.input_signature[0]
+    assert spec.shape.as_list() == [None, len(tf_service.selected_features)]
+    assert spec.dtype == tf.float32
+
+    # El grafo se trazó al cargar; ningún tamaño de lote lo vuelve a trazar
+    traced = tf_service._predict_fn.experimental_get_tracing_count()
+    for count in (1, 7, 64, 300):
+        scores = tf_service.predict_scores_batch(random_rows(tf_service, count))["scores"]
+        assert scores.shape == (count,)
+        assert ((scores >= 0) & (scores <= 100) & (scores == np.round(scores))).all()
+    assert tf_service._predict_fn.experimental_get_tracing_count() == traced
+
+def test_concurrent_requests_share_one_forward_pass(tf_service, monkeypatch):
+    rows = random_rows(tf_service, 8, seed=11)
+    expected = tf_service.predict_scores_batch(rows)["scores"]
+    batcher = tf_service._batcher
+    process_batch = batcher.process_batch
+    batch_sizes = []
+
+    async def recording_process_batch(matrix):
+        batch_sizes.append(len(matrix))
+        return await process_batch(matrix)
+
+    monkeypatch.setattr(batcher, "process_batch", recording_process_batch)
+    monkeypatch.setattr(batcher, "max_wait", 0.5)
+    tf_service.cache.clear()
+
+    async def scenario():
+        records = [dict(zip(tf_service.selected_features, row)) for row in rows]
+        return await asyncio.gather(*(tf_service.predict_score_async(record) for record in records))
+
+    results = asyncio.run(scenario())
+    assert batch_sizes == [8]
+    assert [result["score"] for result in results] == expected.tolist()
+    assert all(not result["is_simulated"] for result in results)
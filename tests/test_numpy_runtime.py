@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from app.ml.services.numpy_runtime import NumpyScoringModel, file_sha256
+from app.ml.services.score_service import MODEL_DIR, ScorePredictionService
+
+tf = pytest.importorskip("tensorflow")
+joblib = pytest.importorskip("joblib")
+pytest.importorskip("sklearn")
+
+ROWS = 500
+
+def random_rows(features, count, seed=2024):
+    """Filas con rangos realistas, con las columnas en el orden de `features`"""
+    rng = np.random.default_rng(seed)
+    late = rng.integers(0, 12, count)
+    loans = rng.integers(0, 8, count)
+    columns = {
+        "adress_verified": rng.integers(0, 2, count),
+        "identity_verified": rng.integers(0, 2, count),
+        "loan_count": loans,
+        "late_payment_count": late,
+        "avg_days_late": np.where(late > 0, rng.uniform(1, 60, count), 0.0),
+        "total_penalty": rng.uniform(0, 1500, count) * (late > 0),
+        "payment_completion_ratio": rng.uniform(0, 1, count),
+        "has_no_late_payments": (late == 0).astype(int),
+        "has_penalty": (late > 0).astype(int),
+        "loans_al_dia_ratio": rng.uniform(0, 1, count) * (loans > 0),
+        "days_late_per_loan": rng.uniform(0, 30, count) * (loans > 0),
+    }
+    return np.column_stack([columns[name] for name in features]).astype(np.float64)
+
+@pytest.fixture(scope="module")
+def runtime():
+    return NumpyScoringModel.load(MODEL_DIR / "modelo_scoring_crediticio.npz")
+
+def test_artifact_matches_current_model(runtime):
+    assert runtime.source_sha256 == file_sha256(MODEL_DIR / "modelo_scoring_crediticio.h5")
+    assert sorted(runtime.features) == sorted(ScorePredictionService().selected_features)
+
+def test_numpy_runtime_matches_keras(runtime):
+    model = tf.keras.models.load_model(MODEL_DIR / "modelo_scoring_crediticio.h5", compile=False)
+    scaler = joblib.load(MODEL_DIR / "scaler_scoring_crediticio.pkl")
+    rows = random_rows(runtime.features, ROWS)
+
+    expected = model(scaler.transform(rows).astype(np.float32), training=False).numpy().reshape(-1)
+    np.testing.assert_allclose(runtime.predict(rows), expected, rtol=0, atol=1e-4)
+
+def test_numpy_and_tensorflow_backends_give_the_same_scores():
+    numpy_service = ScorePredictionService(mode="model")
+    tf_service = ScorePredictionService(mode="model")
+    tf_service._load_numpy_model = lambda export_path, model_path: False
+    try:
+        numpy_service.ensure_loaded()
+        tf_service.ensure_loaded()
+        assert (numpy_service.backend, tf_service.backend) == ("numpy", "tensorflow")
+
+        rows = random_rows(numpy_service.selected_features, ROWS)
+        numpy_batch = numpy_service.predict_scores_batch(rows)
+        tf_batch = tf_service.predict_scores_batch(rows)
+        np.testing.assert_array_equal(numpy_batch["scores"], tf_batch["scores"])
+        assert list(numpy_batch["categories"]) == list(tf_batch["categories"])
+    finally:
+        numpy_service.executor.shutdown()
+        tf_service.executor.shutdown()
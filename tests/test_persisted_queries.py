@@ -0,0 +1,58 @@
+import hashlib
+import json
+import pytest
+from fastapi.testclient import TestClient
+import app.main as main
+from app.api import persisted_queries
+from app.api.persisted_queries import GraphQLDocumentCache
+
+QUERY = "query PersistedVersion { version hello }"
+QUERY_HASH = hashlib.sha256(QUERY.encode("utf-8")).hexdigest()
+
+def persisted(query_hash=QUERY_HASH, version=1):
+    return {"persistedQuery": {"version": version, "sha256Hash": query_hash}}
+
+@pytest.fixture
+def document_cache(monkeypatch):
+    cache = GraphQLDocumentCache(max_size=8)
+    monkeypatch.setattr(persisted_queries, "document_cache", cache)
+    return cache
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+def test_persisted_query_miss_register_hit(client, document_cache):
+    # 1. Solo el hash: la consulta todavía no está registrada
+    miss = client.post("/graphql", json={"extensions": persisted()})
+    assert miss.status_code == 200
+    error = miss.json()["errors"][0]
+    assert error["message"] == "PersistedQueryNotFound"
+    assert error["extensions"]["code"] == "PERSISTED_QUERY_NOT_FOUND"
+    assert document_cache.persisted_not_found == 1
+
+    # 2. El cliente reenvía la consulta con el hash: se verifica, se registra y se ejecuta
+    registered = client.post("/graphql", json={"query": QUERY, "extensions": persisted()})
+    assert registered.json() == {"data": {"version": "1.0.0", "hello": "Hello World"}}
+    assert document_cache.stats()["size"] == 1
+
+    # 3. Desde ahora basta el hash, por POST o por GET, y el documento no se vuelve a parsear
+    hits = document_cache.hits
+    hit = client.post("/graphql", json={"extensions": persisted()})
+    assert hit.json() == registered.json()
+    get_hit = client.get("/graphql", params={"extensions": json.dumps(persisted())})
+    assert get_hit.json() == registered.json()
+    assert document_cache.hits == hits + 2
+    assert document_cache.persisted_not_found == 1
+
+def test_persisted_query_hash_is_verified(client, document_cache):
+    response = client.post("/graphql", json={"query": QUERY, "extensions": persisted("0" * 64)})
+    assert response.status_code == 400
+    assert document_cache.stats()["size"] == 0
+
+    # Una consulta registrada con un hash falso no queda disponible con ese hash
+    assert client.post("/graphql", json={"extensions": persisted("0" * 64)}).json()["errors"][0]["message"] == "PersistedQueryNotFound"
+
+def test_unsupported_persisted_query_version(client, document_cache):
+    response = client.post("/graphql", json={"query": QUERY, "extensions": persisted(version=2)})
+    assert response.status_code == 400
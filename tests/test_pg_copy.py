@@ -0,0 +1,171 @@
+import asyncio
+import datetime
+import decimal
+import pytest
+from sqlalchemy import MetaData, Table, Column, Integer, String, Numeric, DateTime, Date, Boolean, select
+from sqlalchemy.dialects import postgresql
+from app.config.postgres_conection import get_table, get_primary_key
+from app.sync import pg_copy
+from app.sync.data_sync import TABLES_TO_SYNC, build_record_converter, get_record_converter
+from app.sync.pg_copy import CopyAborted, _CopyBatchWriter, aiter_copy_batches, build_copy_decoder, copy_query
+
+TABLE = Table(
+    "payment", MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("note", String(50)),
+    Column("literal", String(50)),
+    Column("missing", String(50)),
+    Column("grace", postgresql.INTERVAL()),
+    Column("penalty_amount", Numeric(12, 2)),
+    Column("verified", Boolean),
+    Column("paid_at", DateTime),
+    Column("due_date", Date),
+)
+
+RECORD = {
+    "id": 1,
+    "note": "a\tb\nc\\d",
+    "literal": "\\N",
+    "missing": None,
+    "grace": datetime.timedelta(hours=1, seconds=30),
+    "penalty_amount": decimal.Decimal("25.50"),
+    "verified": True,
+    "paid_at": datetime.datetime(2025, 5, 20, 10, 30, 15, 123456),
+    "due_date": datetime.date(2025, 5, 19),
+}
+
+def copy_value(value):
+    """Texto con el que COPY TO (formato texto, DateStyle ISO) emite un valor"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime.timedelta):
+        # La consulta de COPY extrae los segundos del intervalo
+        return f"{value.total_seconds():.6f}"
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, str):
+        return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    return str(value)
+
+def copy_line(record):
+    return "\t".join(copy_value(value) for value in record.values())
+
+def test_decoder_unescapes_text_and_tells_null_from_literal():
+    line = copy_line(RECORD)
+    assert "\\\\N\t\\N\t" in line
+    document = build_copy_decoder(TABLE)(line)
+    assert document["note"] == "a\tb\nc\\d"
+    assert document["literal"] == "\\N"
+    assert document["missing"] is None
+    # Mismo documento que el conversor de la ruta SELECT
+    assert document == build_record_converter(TABLE)(RECORD)
+
+def test_writer_joins_multibyte_characters_split_across_chunks():
+    table = Table("user", MetaData(), Column("id", Integer, primary_key=True), Column("name", String(50)))
+    names = ["Peña", "José ñandú", "€ 10", "日本"]
+    payload = "".join(f"{i}\t{name}\n" for i, name in enumerate(names, 1)).encode("utf-8")
+    batches = []
+    writer = _CopyBatchWriter(build_copy_decoder(table), chunk_size=3, emit=batches.append)
+    # psycopg2 entrega bloques de tamaño fijo: aquí de un byte, cortando cada carácter
+    for position in range(len(payload)):
+        writer.write(payload[position:position + 1])
+    writer.finish()
+    assert [len(batch) for batch in batches] == [3, 1]
+    assert [document["name"] for batch in batches for document in batch] == names
+
+def test_writer_decodes_last_line_without_newline():
+    table = Table("user", MetaData(), Column("id", Integer, primary_key=True), Column("name", String(50)))
+    batches = []
+    writer = _CopyBatchWriter(build_copy_decoder(table), chunk_size=10, emit=batches.append)
+    writer.write("1\tPeña\n2\tÑu".encode("utf-8"))
+    writer.finish()
+    assert batches == [[{"id": 1, "name": "Peña"}, {"id": 2, "name": "Ñu"}]]
+
+def test_interval_is_read_as_seconds_and_bytea_falls_back_to_select():
+    query = copy_query(TABLE, TABLE.c.id, 1, 100)
+    assert "EXTRACT(epoch FROM payment.grace) AS grace" in query
+    assert build_copy_decoder(TABLE)(copy_line(RECORD))["grace"] == 3630.0
+
+    # bytea no tiene decodificador de COPY: la tabla se lee con SELECT
+    binary = Table("document", MetaData(), Column("id", Integer, primary_key=True), Column("content", postgresql.BYTEA()))
+    assert build_copy_decoder(binary) is None
+
+def read_all_batches(table_name, **kwargs):
+    async def collect():
+        return [batch async for batch in aiter_copy_batches(table_name, get_record_converter(table_name), **kwargs)]
+    return asyncio.run(collect())
+
+def select_documents(table_name):
+    """Documentos de la tabla completa leídos con la ruta SELECT (_select_range)"""
+    table = get_table(table_name)
+    pk_column = table.columns[get_primary_key(table_name)]
+    batches = []
+    pg_copy._select_range(table, pk_column, 0, 10 ** 9, get_record_converter(table_name), 1000, batches.append)
+    return [document for batch in batches for document in batch]
+
+def track_range_readers(monkeypatch, fail_low=None):
+    """Registra cómo termina cada hilo lector; el rango que empieza en `fail_low` falla"""
+    outcomes = []
+    read_range = pg_copy._select_range
+
+    def tracked(table, pk_column, low, high, *args):
+        try:
+            if low == fail_low:
+                raise ValueError("fallo de lectura")
+            read_range(table, pk_column, low, high, *args)
+        except CopyAborted:
+            outcomes.append("cancelado")
+            raise
+        except ValueError:
+            outcomes.append("fallido")
+            raise
+        outcomes.append("completo")
+
+    monkeypatch.setattr(pg_copy, "_select_range", tracked)
+    return outcomes
+
+def test_closing_early_stops_range_readers(source_database, monkeypatch):
+    outcomes = track_range_readers(monkeypatch)
+
+    async def read_first_batch():
+        batches = aiter_copy_batches("monthly_payment", get_record_converter("monthly_payment"), chunk_size=2, workers=3)
+        first = await batches.__anext__()
+        await batches.aclose()
+        return first
+
+    first = asyncio.run(read_first_batch())
+    assert len(first) == 2
+    # Los tres rangos (20 cuotas cada uno) no caben en la cola: todos se detienen
+    assert outcomes == ["cancelado"] * 3
+
+def test_range_error_stops_other_readers_and_propagates(source_database, monkeypatch):
+    outcomes = track_range_readers(monkeypatch, fail_low=1)
+    with pytest.raises(ValueError, match="fallo de lectura"):
+        read_all_batches("monthly_payment", chunk_size=2, workers=3)
+    assert sorted(outcomes) == ["cancelado", "cancelado", "fallido"]
+
+def test_copy_decoder_matches_select_path(source_database):
+    engine, tables = source_database
+    with engine.begin() as connection:
+        connection.execute(tables["user"].update().where(tables["user"].c.id == 1).values(name="tab\there \\N ñ"))
+        connection.execute(tables["user"].update().where(tables["user"].c.id == 2).values(name="\\N", user_type=None))
+
+    for table_name in TABLES_TO_SYNC:
+        table = get_table(table_name)
+        decode = build_copy_decoder(table)
+        with engine.connect() as connection:
+            rows = [row._asdict() for row in connection.execute(select(table).order_by(table.c.id))]
+        assert [decode(copy_line(row)) for row in rows] == select_documents(table_name), table_name
+
+def test_copy_matches_select_on_postgres(postgres_database):
+    engine, tables = postgres_database
+    with engine.begin() as connection:
+        connection.execute(tables["user"].update().where(tables["user"].c.id == 1).values(name="tab\there \\N ñ"))
+        connection.execute(tables["user"].update().where(tables["user"].c.id == 2).values(name="\\N", user_type=None))
+
+    for table_name in TABLES_TO_SYNC:
+        copied = [document for batch in read_all_batches(table_name, chunk_size=7, workers=3) for document in batch]
+        copied.sort(key=lambda document: document["id"])
+        assert copied == select_documents(table_name), table_name
@@ -0,0 +1,64 @@
+import datetime
+import decimal
+import enum
+from bson import Decimal128
+from sqlalchemy import MetaData, Table, Column, Integer, String, Numeric, DateTime, Date, Boolean, Enum, Interval
+from sqlalchemy.dialects import postgresql
+from app.sync.data_sync import build_record_converter
+
+class Status(enum.Enum):
+    PAGADO = "pagado"
+    PENDIENTE = "pendiente"
+
+TABLE = Table(
+    "payment", MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("due_date", Date),
+    Column("paid_at", DateTime),
+    Column("penalty_amount", Numeric(12, 2)),
+    Column("status", Enum(Status)),
+    Column("grace", Interval),
+    Column("note", String(50)),
+    Column("verified", Boolean),
+)
+
+RECORD = {
+    "id": 1,
+    "due_date": datetime.date(2025, 5, 19),
+    "paid_at": datetime.datetime(2025, 5, 20, 10, 30, 15, 123456),
+    "penalty_amount": decimal.Decimal("25.50"),
+    "status": Status.PAGADO,
+    "grace": datetime.timedelta(days=2, hours=3),
+    "note": "ok",
+    "verified": True,
+}
+
+def test_converter_maps_column_types():
+    document = build_record_converter(TABLE)(RECORD)
+    assert document == {
+        "id": 1,
+        "due_date": datetime.datetime(2025, 5, 19),
+        "paid_at": RECORD["paid_at"],
+        "penalty_amount": 25.5,
+        "status": "pagado",
+        "grace": 183600.0,
+        "note": "ok",
+        "verified": True,
+    }
+    # Las fechas sin hora pasan a datetime (BSON no tiene tipo fecha) y el registro no cambia
+    assert type(document["due_date"]) is datetime.datetime
+    assert RECORD["due_date"] == datetime.date(2025, 5, 19)
+
+def test_converter_keeps_money_as_decimal128():
+    document = build_record_converter(TABLE, money_as_decimal128=True)(RECORD)
+    assert document["penalty_amount"] == Decimal128("25.50")
+
+def test_converter_keeps_none_values():
+    record = {column.name: None for column in TABLE.columns}
+    assert build_record_converter(TABLE)(record) == record
+    assert build_record_converter(TABLE, money_as_decimal128=True)(record) == record
+
+def test_converter_maps_reflected_postgres_interval():
+    table = Table("reflected", MetaData(), Column("id", Integer, primary_key=True), Column("grace", postgresql.INTERVAL()))
+    document = build_record_converter(table)({"id": 1, "grace": datetime.timedelta(hours=1, seconds=30)})
+    assert document == {"id": 1, "grace": 3630.0}
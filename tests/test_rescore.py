@@ -0,0 +1,135 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from pymongo import MongoClient
+from app.ml.jobs import rescore
+from app.ml.jobs.rescore import RUNS_COLLECTION, SCORES_COLLECTION, rescore_all
+from app.ml.services.feature_store import FEATURES_COLLECTION, borrower_features_pipeline
+from app.ml.services.score_service import ScorePredictionService
+from conftest import TEST_MONGO_DATABASE, TEST_MONGO_URI
+
+BORROWERS = 40
+
+def borrower_features(borrower_id):
+    """Características deterministas y variadas de un prestatario"""
+    loans = borrower_id % 4
+    late = borrower_id % 3
+    return {
+        "borrower_id": borrower_id,
+        "adress_verified": borrower_id % 2,
+        "identity_verified": int(borrower_id % 5 != 0),
+        "loan_count": loans,
+        "late_payment_count": late,
+        "avg_days_late": 4.5 * late,
+        "total_penalty": 12.5 * (borrower_id % 6),
+        "payment_completion_ratio": (borrower_id % 10) / 10,
+        "has_no_late_payments": int(late == 0),
+        "has_penalty": int(borrower_id % 6 != 0),
+        "loans_al_dia_ratio": 1.0 if loans == 0 else (loans - 1) / loans,
+        "days_late_per_loan": 4.5 * late * late / loans if loans else 0.0,
+    }
+
+def load_borrowers(mongo_db, materialized=range(1, BORROWERS + 1)):
+    mongo_db.user.insert_many([{"id": borrower_id} for borrower_id in range(1, BORROWERS + 1)])
+    mongo_db[FEATURES_COLLECTION].insert_many([borrower_features(borrower_id) for borrower_id in materialized])
+
+def use_database(monkeypatch, mongo_db):
+    """El job usa esta base y un pool de hilos (que comparte la base en memoria)"""
+    monkeypatch.setattr(rescore, "get_mongo_database", lambda: mongo_db)
+    monkeypatch.setattr(rescore, "ProcessPoolExecutor", ThreadPoolExecutor)
+
+@pytest.fixture
+def rescore_db(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    mongo_db = mongomock.MongoClient()["test"]
+    use_database(monkeypatch, mongo_db)
+    yield mongo_db
+    rescore._worker["service"].executor.shutdown()
+    rescore._worker.clear()
+
+@pytest.fixture(scope="module")
+def service():
+    service = ScorePredictionService(mode="synthetic")
+    service.ensure_loaded()
+    yield service
+    service.executor.shutdown()
+
+def assert_scores_match_single_predictions(mongo_db, service, features_by_id):
+    scores = {document["borrower_id"]: document for document in mongo_db[SCORES_COLLECTION].find({})}
+    assert set(scores) == set(features_by_id)
+    for borrower_id, features in features_by_id.items():
+        single = service.predict_score(features)
+        stored = scores[borrower_id]
+        assert (stored["score"], stored["category"], stored["risk_level"]) == (
+            single["score"], single["category"], single["risk_level"]
+        ), borrower_id
+
+def test_scores_match_predict_score(rescore_db, service):
+    load_borrowers(rescore_db)
+    summary = rescore_all(workers=2, chunk_size=7, mode="synthetic")
+    assert summary["rows"] == BORROWERS
+    assert summary["incomplete"] == summary["computed"] == 0
+    expected = {borrower_id: borrower_features(borrower_id) for borrower_id in range(1, BORROWERS + 1)}
+    assert_scores_match_single_predictions(rescore_db, service, expected)
+
+def test_incomplete_features_are_reported_not_scored(rescore_db):
+    load_borrowers(rescore_db)
+    rescore_db[FEATURES_COLLECTION].update_one({"borrower_id": 7}, {"$unset": {"total_penalty": ""}})
+    rescore_db[FEATURES_COLLECTION].update_one({"borrower_id": 23}, {"$set": {"loan_count": None}})
+
+    summary = rescore_all(workers=2, chunk_size=7, mode="synthetic")
+    assert summary["rows"] == BORROWERS - 2
+    assert summary["incomplete"] == 2
+    assert summary["incomplete_ids"] == [7, 23]
+    assert rescore_db[SCORES_COLLECTION].count_documents({"borrower_id": {"$in": [7, 23]}}) == 0
+    run = rescore_db[RUNS_COLLECTION].find_one({"_id": summary["run_id"]})
+    assert run["incomplete_ids"] == [7, 23]
+
+def test_interrupted_run_resumes_from_checkpoints(rescore_db, monkeypatch):
+    load_borrowers(rescore_db)
+    predict = ScorePredictionService.predict_scores_batch
+    scored = []
+
+    def failing_once(self, features):
+        # El quinto bloque (segundo del segundo rango) falla una sola vez
+        if len(scored) == 4 and not failing_once.failed:
+            failing_once.failed = True
+            raise RuntimeError("proceso interrumpido")
+        scored.append(len(features))
+        return predict(self, features)
+
+    failing_once.failed = False
+    monkeypatch.setattr(ScorePredictionService, "predict_scores_batch", failing_once)
+
+    # Un proceso y cuatro rangos de 10 prestatarios, en bloques de 4
+    with pytest.raises(RuntimeError, match="proceso interrumpido"):
+        rescore_all(workers=1, chunk_size=4, mode="synthetic", run_id="interrumpida")
+    run = rescore_db[RUNS_COLLECTION].find_one({"_id": "interrumpida"})
+    assert run["finished_at"] is None
+    assert rescore_db[RUNS_COLLECTION].find_one({"_id": "interrumpida:11"})["last_borrower_id"] == 14
+
+    summary = rescore_all(workers=1, chunk_size=4, mode="synthetic", resume=True)
+    assert summary["run_id"] == "interrumpida"
+    # Solo se puntúa lo que faltaba del rango interrumpido (15 a 20)
+    assert summary["rows"] == 6
+    assert sum(scored) == BORROWERS
+    assert rescore_db[SCORES_COLLECTION].count_documents({"run_id": "interrumpida"}) == BORROWERS
+    assert rescore_db[RUNS_COLLECTION].find_one({"_id": "interrumpida"})["finished_at"] is not None
+
+def test_borrowers_without_materialized_features_are_computed(real_mongo, monkeypatch, service):
+    client = MongoClient(TEST_MONGO_URI)
+    mongo_db = client[TEST_MONGO_DATABASE]
+    use_database(monkeypatch, mongo_db)
+    try:
+        load_borrowers(mongo_db, materialized=range(1, BORROWERS - 4))
+        summary = rescore_all(workers=2, chunk_size=7, mode="synthetic")
+        assert summary["rows"] == BORROWERS
+        assert summary["computed"] == 5
+
+        expected = {borrower_id: borrower_features(borrower_id) for borrower_id in range(1, BORROWERS - 4)}
+        pipeline = borrower_features_pipeline({"id": {"$gte": BORROWERS - 4}})
+        expected.update({document["borrower_id"]: document for document in mongo_db.user.aggregate(pipeline)})
+        assert_scores_match_single_predictions(mongo_db, service, expected)
+    finally:
+        rescore._worker["service"].executor.shutdown()
+        rescore._worker.clear()
+        client.close()
@@ -0,0 +1,44 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.score_routes import build_score_router
+from app.ml.services.score_history import ScoreHistoryWriter
+from app.ml.services.score_service import ScorePredictionService
+
+ROW = [1, 1, 3, 1, 2.5, 10.0, 0.8, 0, 1, 0.66, 0.8]
+
+@pytest.fixture(scope="module")
+def service():
+    service = ScorePredictionService(mode="synthetic")
+    yield service
+    service.executor.shutdown()
+
+@pytest.fixture(scope="module")
+def client(service):
+    app = FastAPI()
+    app.include_router(build_score_router(service, ScoreHistoryWriter()))
+    return TestClient(app)
+
+def test_score_batch_matches_single(client):
+    single = client.post("/score", json=ROW).json()
+    batch = client.post("/score/batch", json=ROW * 2).json()
+    assert batch == [single, single]
+
+def test_empty_score_batch(client):
+    response = client.post("/score/batch", json=[])
+    assert response.status_code == 200
+    assert response.json() == []
+
+@pytest.mark.parametrize("body", [{"a": 1}, ROW[:-1], ROW[:-1] + [None]])
+def test_invalid_score_batch(client, body):
+    assert client.post("/score/batch", json=body).status_code == 400
+
+def test_scoring_error_maps_to_server_error(client, service, monkeypatch):
+    async def failing_predict(record):
+        raise RuntimeError("pool caído")
+
+    monkeypatch.setattr(service.executor, "predict_score", failing_predict)
+    service.cache.clear()
+    response = client.post("/score", json=ROW)
+    assert response.status_code == 500
+    assert "pool caído" in response.json()["detail"]
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+import numpy as np
+import pytest
+from app.ml.services.score_service import ScorePredictionService
+
+ROWS = [
+    {"adress_verified": 1, "identity_verified": 1, "loan_count": 3, "late_payment_count": 0,
+     "avg_days_late": 0.0, "total_penalty": 0.0, "payment_completion_ratio": 1.0,
+     "has_no_late_payments": 1, "has_penalty": 0, "loans_al_dia_ratio": 1.0, "days_late_per_loan": 0.0},
+    {"adress_verified": 0, "identity_verified": 1, "loan_count": 2, "late_payment_count": 3,
+     "avg_days_late": 12.5, "total_penalty": 250.0, "payment_completion_ratio": 0.4,
+     "has_no_late_payments": 0, "has_penalty": 1, "loans_al_dia_ratio": 0.5, "days_late_per_loan": 6.25},
+    {"adress_verified": 0, "identity_verified": 0, "loan_count": 0, "late_payment_count": 0,
+     "avg_days_late": 0.0, "total_penalty": 0.0, "payment_completion_ratio": 0.0,
+     "has_no_late_payments": 1, "has_penalty": 0, "loans_al_dia_ratio": 0.0, "days_late_per_loan": 0.0},
+]
+
+@pytest.fixture(scope="module")
+def service():
+    service = ScorePredictionService(mode="synthetic")
+    service.ensure_loaded()
+    yield service
+    service.executor.shutdown()
+
+def _matrix(service, rows):
+    return np.array([[row[name] for name in service.selected_features] for row in rows], dtype=np.float64)
+
+def test_batch_matches_single_predictions(service):
+    features = _matrix(service, ROWS)
+    batch = service.build_batch_results(service.predict_scores_batch(features), features)
+    for row, result in zip(ROWS, batch):
+        single = service.predict_score(row)
+        for key in ("score", "category", "risk_level", "explanation", "input_features"):
+            assert result[key] == single[key]
+
+def test_empty_batch_returns_no_results(service):
+    features = np.empty((0, len(service.selected_features)), dtype=np.float64)
+    assert service.build_batch_results(service.predict_scores_batch(features), features) == []
+    assert asyncio.run(service.predict_batch_async(features)) == []
+
+def test_artifact_reload_runs_off_the_event_loop_and_errors_propagate(service, monkeypatch):
+    loop_threads = []
+    calls = []
+
+    def slow_reload():
+        calls.append(("reload", threading.get_ident()))
+        time.sleep(0.2)
+
+    def direct_predict(record):
+        calls.append(("directo", threading.get_ident()))
+        return {"score": 50.0}
+
+    async def failing_predict(record):
+        raise RuntimeError("pool caído")
+
+    monkeypatch.setattr(service, "reload_model", slow_reload)
+    monkeypatch.setattr(service, "predict_score", direct_predict)
+    monkeypatch.setattr(service.executor, "predict_score", failing_predict)
+    monkeypatch.setattr(service, "_artifacts_checked_at", float("-inf"))
+    monkeypatch.setattr(service, "_artifact_stamp", ("artefactos anteriores",))
+    service.cache.clear()
+
+    async def scenario():
+        loop_threads.append(threading.get_ident())
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        try:
+            with pytest.raises(RuntimeError, match="pool caído"):
+                await service.predict_score_async(ROWS[1])
+        finally:
+            ticking.cancel()
+        return ticks
+
+    ticks = asyncio.run(scenario())
+    # El error llega al llamador sin reintentar por fuera del executor y su admisión
+    assert [name for name, _ in calls] == ["reload"]
+    assert all(thread != loop_threads[0] for _, thread in calls)
+    assert service.executor.pending == 0
+    # El event loop siguió atendiendo otras tareas durante la recarga
+    assert ticks >= 5
+
+def test_results_expose_input_features_as_dict(service):
+    service.cache.clear()
+    expected = {name: ROWS[1][name] for name in service.selected_features}
+    first = service.predict_score(ROWS[1])
+    cached = service.predict_score(ROWS[1])
+    async_result = asyncio.run(service.predict_score_async(ROWS[0]))
+    batch = asyncio.run(service.predict_batch_async(_matrix(service, ROWS)))
+
+    assert type(first["input_features"]) is dict and first["input_features"] == expected
+    assert type(cached["input_features"]) is dict and cached["input_features"] == expected
+    assert type(async_result["input_features"]) is dict
+    assert all(type(result["input_features"]) is dict for result in batch)
+    assert [result["input_features"] for result in batch] == ROWS
@@ -0,0 +1,18 @@
+import asyncio
+import datetime
+from fastapi.testclient import TestClient
+import app.main as main
+from app.sync.sync_lease import LEASES_COLLECTION
+
+def test_sync_reports_skipped_when_lease_is_held(mongo_db, monkeypatch):
+    monkeypatch.setattr(main, "get_mongo_db", lambda: mongo_db)
+    asyncio.run(mongo_db[LEASES_COLLECTION].insert_one({
+        "_id": "data_sync",
+        "owner": "otra-replica",
+        "expires_at": datetime.datetime.utcnow() + datetime.timedelta(minutes=5),
+    }))
+
+    # Sin el bloque with no se ejecuta el arranque de la aplicación
+    response = TestClient(main.app).post("/sync")
+    assert response.status_code == 409
+    assert response.json()["status"] == "skipped"
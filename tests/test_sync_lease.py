@@ -0,0 +1,42 @@
+import asyncio
+import pytest
+from app.config.settings import settings
+from app.sync import sync_service
+from app.sync.sync_lease import LEASES_COLLECTION, LeaseLostError, SyncLease
+
+async def steal_lease(mongo_db):
+    """Otra réplica toma el lease (por ejemplo, tras una pausa larga de este proceso)"""
+    await mongo_db[LEASES_COLLECTION].update_one({"_id": "data_sync"}, {"$set": {"owner": "otra-replica"}})
+
+def test_losing_the_lease_cancels_the_running_task(mongo_db):
+    async def scenario():
+        finished = False
+        with pytest.raises(LeaseLostError):
+            async with SyncLease(mongo_db, ttl_seconds=0.3) as acquired:
+                assert acquired
+                await steal_lease(mongo_db)
+                await asyncio.sleep(5)
+                finished = True
+        document = await mongo_db[LEASES_COLLECTION].find_one({"_id": "data_sync"})
+        return finished, document["owner"]
+
+    finished, owner = asyncio.run(scenario())
+    assert not finished
+    # El lease de la otra réplica no se libera
+    assert owner == "otra-replica"
+
+def test_scheduler_run_fails_when_the_lease_is_lost(mongo_db, monkeypatch):
+    monkeypatch.setattr(settings, "SYNC_LEASE_SECONDS", 0.3)
+    monkeypatch.setattr(sync_service, "init_postgres_models", lambda: None)
+    writes = []
+
+    async def slow_sync(mongo_db):
+        await steal_lease(mongo_db)
+        await asyncio.sleep(5)
+        writes.append("escritura tras perder el lease")
+        return {}
+
+    monkeypatch.setattr(sync_service, "sync_all_tables", slow_sync)
+    success = asyncio.run(sync_service.SyncScheduler(mongo_db).run_once())
+    assert success is False
+    assert writes == []